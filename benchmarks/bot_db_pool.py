@@ -0,0 +1,109 @@
+"""
+Бенчмарк пропускной способности ORM-вызовов бота при одновременных чатах.
+
+Сравнивает sync_to_async по умолчанию (thread_sensitive=True: все запросы
+в одном общем потоке) с пулом потоков utils.db.db_async. Каждый «чат»
+выполняет обработчик /cards: поиск пользователя по telegram_id и первая
+страница карточек.
+
+SQLite работает в том же процессе, поэтому без задержки сети запросы
+упираются в GIL и выигрыш небольшой. --latency-ms добавляет к каждому
+запросу задержку, как у базы на другом сервере (PostgreSQL и т. п.):
+
+    python benchmarks/bot_db_pool.py --chats 200 --latency-ms 2
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from common import setup_django, percentile, BASE_DIR
+
+sys.path.insert(0, os.path.join(BASE_DIR, 'telegram_bot'))
+
+
+def load_users(users, cards_per_user):
+    from django.contrib.auth.models import User
+    from users.models import UserProfile
+    from words.models import Card
+
+    User.objects.bulk_create([User(username=f'bench_{i}', email=f'bench_{i}@example.com') for i in range(users)])
+    user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+    UserProfile.objects.bulk_create([
+        UserProfile(user_id=user_id, telegram_id=100000 + n, is_telegram_user=True)
+        for n, user_id in enumerate(user_ids)
+    ])
+    Card.objects.bulk_create([
+        Card(user_id=user_id, word=f'w{user_id}_{i}', translation=f't{i}')
+        for user_id in user_ids for i in range(cards_per_user)
+    ], batch_size=5000)
+    return [100000 + n for n in range(len(user_ids))]
+
+
+def make_handler(latency):
+    from django.db import connection
+    from utils.django_utils import get_user_by_telegram_id, get_user_cards_paginated
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(latency)
+        return execute(sql, params, many, context)
+
+    def cards_command(telegram_id):
+        # Соединение у каждого потока своё, поэтому обёртку ставим на каждый вызов
+        with connection.execute_wrapper(delay):
+            user = get_user_by_telegram_id(telegram_id)
+            return get_user_cards_paginated(user, 1, 10)
+
+    return cards_command
+
+
+async def run_chats(wrap, handler, telegram_ids, requests_per_chat):
+    latencies = []
+
+    async def chat(telegram_id):
+        for _ in range(requests_per_chat):
+            start = time.perf_counter()
+            await wrap(handler)(telegram_id)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(chat(telegram_id) for telegram_id in telegram_ids))
+    return time.perf_counter() - start, latencies
+
+
+def report(name, elapsed, latencies):
+    print(f'{name:<40} {len(latencies) / elapsed:8.0f} запр/с   '
+          f'p50 {percentile(latencies, 50):7.1f} мс   p95 {percentile(latencies, 95):7.1f} мс')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chats', type=int, default=200, help='одновременных чатов')
+    parser.add_argument('--requests', type=int, default=5, help='запросов на чат')
+    parser.add_argument('--cards', type=int, default=50, help='карточек у пользователя')
+    parser.add_argument('--latency-ms', type=float, default=2.0, help='задержка на каждый SQL-запрос')
+    parser.add_argument('--db', default=None, help='путь к файлу базы (по умолчанию временный)')
+    args = parser.parse_args()
+
+    db_path = setup_django(args.db)
+    print(f'База: {db_path}')
+    telegram_ids = load_users(args.chats, args.cards)
+
+    from asgiref.sync import sync_to_async
+    from config import Config
+    from utils.db import db_async
+
+    handler = make_handler(args.latency_ms / 1000)
+    print(f'{args.chats} чатов x {args.requests} запросов, задержка {args.latency_ms} мс на запрос, '
+          f'пул {Config.DB_POOL_SIZE} потоков\n')
+
+    elapsed, latencies = asyncio.run(run_chats(sync_to_async, handler, telegram_ids, args.requests))
+    report('sync_to_async (один общий поток)', elapsed, latencies)
+    elapsed, latencies = asyncio.run(run_chats(db_async, handler, telegram_ids, args.requests))
+    report('db_async (пул потоков)', elapsed, latencies)
+
+
+if __name__ == '__main__':
+    main()
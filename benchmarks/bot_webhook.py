@@ -0,0 +1,216 @@
+"""
+Нагрузочный тест вебхука бота на поддельном сервере Telegram API.
+
+Поднимает локальный сервер, который отвечает на запросы Bot API (sendMessage
+и т. п.) как Telegram, и вебхук бота с настоящими роутерами. Затем
+отправляет в вебхук обновления так, как это делает Telegram (до
+--connections одновременных запросов), и измеряет:
+
+    * обновлений в секунду — от первого запроса до обработки последнего;
+    * p50/p99 времени обработчика — от приёма обновления ботом до конца обработки;
+    * нарушения порядка — обновления одного чата, обработанные не по порядку.
+
+Сравниваются фоновый режим SimpleRequestHandler из aiogram (задача на
+каждое обновление) и ChatOrderedRequestHandler (очереди по чатам):
+
+    python benchmarks/bot_webhook.py --chats 200 --updates-per-chat 10 --workers 16
+
+Записанные обновления (JSON по одному на строку, как их присылает Telegram)
+можно воспроизвести через --replay updates.jsonl; chat.id в них должны
+совпадать с telegram_id пользователей базы (--db).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+from common import setup_django, percentile, BASE_DIR
+
+sys.path.insert(0, os.path.join(BASE_DIR, 'telegram_bot'))
+
+TOKEN = '123456:BENCHMARK'
+COMMANDS = ['/help', '/today', '/progress', '/cards']
+
+
+def load_users(users, cards_per_user):
+    from django.contrib.auth.models import User
+    from users.models import UserProfile
+    from stats.models import UserStats
+    from words.models import Card
+
+    User.objects.bulk_create([User(username=f'hook_{i}', email=f'hook_{i}@example.com') for i in range(users)])
+    user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+    UserProfile.objects.bulk_create([
+        UserProfile(user_id=user_id, telegram_id=200000 + n, is_telegram_user=True)
+        for n, user_id in enumerate(user_ids)
+    ])
+    Card.objects.bulk_create([
+        Card(user_id=user_id, word=f'w{user_id}_{i}', translation=f't{i}')
+        for user_id in user_ids for i in range(cards_per_user)
+    ], batch_size=5000)
+    # Статистику считаем заранее: первый /progress создаёт строку, а SQLite плохо переносит
+    # одновременную запись из многих потоков
+    for user in User.objects.filter(id__in=user_ids):
+        UserStats.rebuild(user)
+    return [200000 + n for n in range(len(user_ids))]
+
+
+def synthetic_updates(telegram_ids, per_chat, burst):
+    """Сообщения с командами, по per_chat на чат; чат присылает по burst сообщений подряд"""
+    updates = []
+    for first in range(0, per_chat, burst):
+        for telegram_id in telegram_ids:
+            for step in range(first, min(first + burst, per_chat)):
+                updates.append({
+                    'update_id': len(updates) + 1,
+                    'message': {
+                        'message_id': step + 1,
+                        'date': int(time.time()),
+                        'chat': {'id': telegram_id, 'type': 'private'},
+                        'from': {'id': telegram_id, 'is_bot': False, 'first_name': 'Bench'},
+                        'text': COMMANDS[step % len(COMMANDS)],
+                    },
+                })
+    return updates
+
+
+async def fake_telegram_api(latency):
+    """Сервер, отвечающий на методы Bot API; latency — задержка ответа, как у api.telegram.org"""
+    from aiohttp import web
+
+    async def method(request):
+        await asyncio.sleep(latency)
+        data = await request.post() if request.content_type != 'application/json' else await request.json()
+        if request.match_info['method'].lower() in ('sendmessage', 'editmessagetext'):
+            chat_id = int(data.get('chat_id', 0))
+            result = {
+                'message_id': 1, 'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'}, 'text': data.get('text', ''),
+            }
+        else:
+            result = True
+        return web.json_response({'ok': True, 'result': result})
+
+    app = web.Application()
+    app.router.add_post('/bot{token}/{method}', method)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', 0).start()
+    return runner, f'http://127.0.0.1:{runner.addresses[0][1]}'
+
+
+def timing_middleware(stats):
+    async def middleware(handler, event, data):
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            stats['latencies'].append((time.perf_counter() - start) * 1000)
+            chat = event.message.chat.id if event.message else event.update_id
+            stats['order'][chat].append(event.update_id)
+            if len(stats['latencies']) == stats['expected']:
+                stats['done'].set()
+    return middleware
+
+
+async def run(handler_factory, dp, updates, api_url, connections):
+    from aiohttp import ClientSession, TCPConnector, web
+    from aiogram import Bot
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+
+    stats = {'latencies': [], 'order': defaultdict(list), 'expected': len(updates), 'done': asyncio.Event()}
+    dp.update.outer_middleware.register(timing_middleware(stats))
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(api_url)))
+
+    app = web.Application()
+    handler = handler_factory(dp, bot)
+    handler.register(app, path='/webhook')
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', 0).start()
+    url = f'http://127.0.0.1:{runner.addresses[0][1]}/webhook'
+
+    # Telegram отправляет обновления по нескольким соединениям, но по порядку update_id
+    queue = asyncio.Queue()
+    for update in updates:
+        queue.put_nowait(update)
+
+    async def sender(session):
+        while not queue.empty():
+            update = queue.get_nowait()
+            async with session.post(url, json=update) as resp:
+                await resp.read()
+
+    start = time.perf_counter()
+    async with ClientSession(connector=TCPConnector(limit=connections)) as session:
+        await asyncio.gather(*(sender(session) for _ in range(connections)))
+    await stats['done'].wait()
+    elapsed = time.perf_counter() - start
+
+    dp.update.outer_middleware._middlewares.clear()
+    await runner.cleanup()
+    reordered = sum(1 for ids in stats['order'].values() for a, b in zip(ids, ids[1:]) if b < a)
+    return elapsed, stats['latencies'], reordered
+
+
+def report(name, elapsed, latencies, reordered):
+    print(f'{name:<36} {len(latencies) / elapsed:8.0f} обн/с   p50 {percentile(latencies, 50):7.1f} мс   '
+          f'p99 {percentile(latencies, 99):7.1f} мс   не по порядку: {reordered}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chats', type=int, default=200, help='чатов')
+    parser.add_argument('--updates-per-chat', type=int, default=10, help='обновлений на чат')
+    parser.add_argument('--burst', type=int, default=2, help='сообщений подряд от одного чата')
+    parser.add_argument('--cards', type=int, default=30, help='карточек у пользователя')
+    parser.add_argument('--workers', type=int, default=16, help='воркеров ChatOrderedRequestHandler')
+    parser.add_argument('--connections', type=int, default=40, help='одновременных запросов от «Telegram»')
+    parser.add_argument('--api-latency-ms', type=float, default=20.0, help='задержка ответа поддельного Bot API')
+    parser.add_argument('--replay', default=None, help='файл с записанными обновлениями (JSON на строку)')
+    parser.add_argument('--db', default=None, help='путь к файлу базы (по умолчанию временный)')
+    args = parser.parse_args()
+
+    db_path = setup_django(args.db)
+    print(f'База: {db_path}')
+    if args.replay:
+        with open(args.replay, encoding='utf-8') as f:
+            updates = [json.loads(line) for line in f if line.strip()]
+    else:
+        updates = synthetic_updates(load_users(args.chats, args.cards), args.updates_per_chat, args.burst)
+
+    from aiogram import Dispatcher
+    from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+    from routers import commands, test_handlers, progress_handlers, cards_handlers, tts_handlers, feedback_handlers
+    from utils.webhook import ChatOrderedRequestHandler
+
+    dp = Dispatcher()
+    for module in (commands, test_handlers, progress_handlers, cards_handlers, tts_handlers, feedback_handlers):
+        dp.include_router(module.router)
+
+    handlers = [
+        ('SimpleRequestHandler (фоновые задачи)', lambda dp, bot: SimpleRequestHandler(dp, bot)),
+        (f'ChatOrderedRequestHandler ({args.workers} воркеров)',
+         lambda dp, bot: ChatOrderedRequestHandler(dp, bot, workers=args.workers)),
+    ]
+
+    async def bench():
+        api_runner, api_url = await fake_telegram_api(args.api_latency_ms / 1000)
+        print(f'{len(updates)} обновлений, {args.connections} соединений, '
+              f'задержка Bot API {args.api_latency_ms} мс\n')
+        try:
+            for name, factory in handlers:
+                report(name, *await run(factory, dp, updates, api_url, args.connections))
+        finally:
+            await api_runner.cleanup()
+
+    asyncio.run(bench())
+
+
+if __name__ == '__main__':
+    main()
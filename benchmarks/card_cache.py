@@ -0,0 +1,64 @@
+"""
+Бенчмарк размера и распаковки закэшированного списка «слова на сегодня».
+
+Сравнивает, что кладётся в кэш Django (pickle): список экземпляров Card,
+как было раньше, и список кортежей (id, word, translation, level), из которых
+get_today_cards собирает CardRecord. Время попадания — pickle.loads плюс
+сборка CardRecord, как при каждом чтении из кэша.
+
+    python benchmarks/card_cache.py --cards 20 200 1000
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import timeit
+
+from common import setup_django, BASE_DIR
+
+sys.path.insert(0, os.path.join(BASE_DIR, 'telegram_bot'))
+
+
+def load_cards(count):
+    from django.contrib.auth.models import User
+    from words.models import Card
+
+    user = User.objects.create(username=f'cache_{count}', email=f'cache_{count}@example.com')
+    Card.objects.bulk_create([
+        Card(user=user, word=f'word{i}', translation=f'перевод {i}', example=f'Example sentence {i}.',
+             level='beginner')
+        for i in range(count)
+    ])
+    return user
+
+
+def per_hit_us(payload, build, number):
+    return timeit.timeit(lambda: build(pickle.loads(payload)), number=number) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cards', type=int, nargs='+', default=[20, 200, 1000], help='размеры списка')
+    parser.add_argument('--number', type=int, default=2000, help='повторов распаковки')
+    args = parser.parse_args()
+
+    setup_django()
+    from words.models import Card
+    from utils.django_utils import CardRecord, CARD_RECORD_FIELDS
+
+    print(f'{"карточек":>9} {"Card, байт":>12} {"кортежи, байт":>14} {"Card, мкс":>10} {"CardRecord, мкс":>16}')
+    for count in args.cards:
+        user = load_cards(count)
+        cards = Card.objects.filter(user=user).order_by('id')
+        models = pickle.dumps(list(cards), pickle.HIGHEST_PROTOCOL)
+        rows = pickle.dumps(list(cards.values_list(*CARD_RECORD_FIELDS)), pickle.HIGHEST_PROTOCOL)
+
+        number = max(10, args.number * 20 // count)
+        models_us = per_hit_us(models, lambda value: value, number)
+        rows_us = per_hit_us(rows, lambda value: [CardRecord._make(row) for row in value], number)
+        print(f'{count:>9} {len(models):>12} {len(rows):>14} {models_us:>10.1f} {rows_us:>16.1f}')
+
+
+if __name__ == '__main__':
+    main()
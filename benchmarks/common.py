@@ -0,0 +1,53 @@
+"""
+Общие утилиты для бенчмарков.
+
+Бенчмарки запускаются отдельно от тестов и работают со своей временной
+базой SQLite, чтобы не трогать db.sqlite3 разработчика:
+
+    python benchmarks/due_queue.py --rows 10000000
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+
+def setup_django(db_path=None):
+    """Настраивает Django на отдельную базу и применяет миграции"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lingua_track.settings')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    import django
+    from django.conf import settings
+
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='lingua_bench_'), 'bench.sqlite3')
+    settings.DATABASES['default']['NAME'] = db_path
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    return db_path
+
+
+def measure(func, repeat=5):
+    """Запускает func repeat раз и возвращает медиану времени в миллисекундах"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def percentile(values, pct):
+    """Перцентиль pct (0–100) по списку значений"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
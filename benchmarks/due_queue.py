@@ -0,0 +1,123 @@
+"""
+Бенчмарк очереди повторений на большой таблице Repetition.
+
+Сравнивает старую форму запроса (values_list + distinct + id__in) без
+индекса repetition_due_idx, как было до миграции 0006, с новой (одно
+соединение по индексу) и печатает планы запросов.
+
+    python benchmarks/due_queue.py --rows 10000000 --users 10000
+
+Для 10M строк нужно около 3 ГБ на диске и несколько минут на загрузку.
+"""
+
+import argparse
+import random
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from common import setup_django, measure
+
+
+def load_rows(rows, users):
+    from django.contrib.auth.models import User
+    from django.db import connection, transaction
+
+    User.objects.bulk_create(
+        [User(username=f'bench_{i}', email=f'bench_{i}@example.com') for i in range(users)],
+        batch_size=5000,
+    )
+    user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+    per_user = rows // users
+    today = date.today()
+    created_at = datetime.now(dt_timezone.utc).isoformat()
+
+    card_id = 0
+    with connection.cursor() as cursor:
+        for user_id in user_ids:
+            cards, reps = [], []
+            for _ in range(per_user):
+                card_id += 1
+                cards.append((card_id, user_id, f'w{card_id}', f't{card_id}', '', '', 'beginner', created_at))
+                next_review = today + timedelta(days=random.randint(-7, 365))
+                reps.append((card_id, user_id, next_review.isoformat(), 1, 0, 2.5, 0, 0, 0, 0, 0))
+            with transaction.atomic():
+                cursor.executemany(
+                    'INSERT INTO words_card (id, user_id, word, translation, example, note, level, created_at) '
+                    'VALUES (%s, %s, %s, %s, %s, %s, %s, %s)',
+                    cards,
+                )
+                cursor.executemany(
+                    'INSERT INTO words_repetition (card_id, user_id, next_review, interval, repetition_count, '
+                    'easiness, total_reviews, successful_reviews, failed_reviews, '
+                    'consecutive_successes, consecutive_failures) '
+                    'VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)',
+                    reps,
+                )
+        cursor.execute('ANALYZE')
+    return user_ids
+
+
+def old_query(user_id, today):
+    from words.models import Card, Repetition
+    card_ids = Repetition.objects.filter(
+        user_id=user_id,
+        next_review__lte=today
+    ).values_list('card_id', flat=True).distinct()
+    return list(Card.objects.filter(id__in=card_ids))
+
+
+def new_query(user_id, today):
+    from words.models import Card
+    return list(Card.objects.filter(
+        repetition__user_id=user_id,
+        repetition__next_review__lte=today
+    ).order_by('repetition__next_review', 'id'))
+
+
+def explain(queryset):
+    return queryset.explain()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--samples', type=int, default=50, help='сколько пользователей опросить')
+    parser.add_argument('--db', default=None, help='путь к файлу базы (по умолчанию временный)')
+    args = parser.parse_args()
+
+    db_path = setup_django(args.db)
+    print(f'База: {db_path}')
+    print(f'Загрузка {args.rows} строк для {args.users} пользователей...')
+    user_ids = load_rows(args.rows, args.users)
+
+    from django.db import connection
+    from words.models import Card, Repetition
+    today = date.today()
+    sample = random.sample(user_ids, min(args.samples, len(user_ids)))
+
+    uid = sample[0]
+    due_index = Repetition._meta.indexes[0]
+
+    # До миграции: индекса по (user, next_review) нет
+    with connection.schema_editor() as editor:
+        editor.remove_index(Repetition, due_index)
+    old_ms = measure(lambda: [old_query(uid, today) for uid in sample], repeat=3) / len(sample)
+    card_ids = Repetition.objects.filter(user_id=uid, next_review__lte=today).values_list('card_id', flat=True).distinct()
+    old_plan = explain(Card.objects.filter(id__in=card_ids))
+
+    with connection.schema_editor() as editor:
+        editor.add_index(Repetition, due_index)
+    new_ms = measure(lambda: [new_query(uid, today) for uid in sample], repeat=3) / len(sample)
+
+    print(f'\nСтарый запрос (distinct + id__in, без индекса): {old_ms:.2f} мс на пользователя')
+    print(f'Новый запрос (join по индексу):                 {new_ms:.2f} мс на пользователя')
+
+    print('\nПлан старого запроса:')
+    print(old_plan)
+    print('\nПлан нового запроса:')
+    print(explain(Card.objects.filter(repetition__user_id=uid, repetition__next_review__lte=today)
+                  .order_by('repetition__next_review', 'id')))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+"""
+Приём отзывов из Telegram
+
+Общий код для API сайта (feedback/views.py) и бота, который работает
+рядом с сайтом и вызывает его напрямую (telegram_bot/services/site_gateway.py).
+"""
+
+from .models import Feedback
+
+
+def submit_telegram_feedback(text, telegram_id):
+    """Сохраняет отзыв из бота; возвращает словарь того же вида, что и ответ API"""
+    text = (text or '').strip()
+    if not text:
+        return {
+            'success': False,
+            'error': 'Текст отзыва не может быть пустым'
+        }
+
+    Feedback.objects.create(
+        text=text,
+        telegram_id=telegram_id
+    )
+    return {
+        'success': True,
+        'message': 'Отзыв успешно отправлен'
+    }
@@ -8,6 +8,7 @@ import json
 
 from .forms import FeedbackForm
 from .models import Feedback
+from .services import submit_telegram_feedback
 
 def feedback_form(request):
     """Представление для отображения формы отзывов"""
@@ -38,25 +39,7 @@ def telegram_feedback(request):
     """API endpoint для получения отзывов из Telegram бота"""
     try:
         data = json.loads(request.body)
-        text = data.get('text', '').strip()
-        telegram_id = data.get('telegram_id')
-        
-        if not text:
-            return JsonResponse({
-                'success': False,
-                'error': 'Текст отзыва не может быть пустым'
-            })
-        
-        # Создаем отзыв
-        feedback = Feedback.objects.create(
-            text=text,
-            telegram_id=telegram_id
-        )
-        
-        return JsonResponse({
-            'success': True,
-            'message': 'Отзыв успешно отправлен'
-        })
+        return JsonResponse(submit_telegram_feedback(data.get('text'), data.get('telegram_id')))
         
     except json.JSONDecodeError:
         return JsonResponse({
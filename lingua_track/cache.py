@@ -0,0 +1,271 @@
+"""
+Кэши: LRU в памяти процесса, версии данных пользователей и защищённое
+от одновременного пересчёта чтение из общего кэша Django
+"""
+
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUTTLCache:
+    """
+    Потокобезопасный словарь с ограничением размера (LRU) и временем жизни
+    записей (TTL). При переполнении вытесняется давно не использованная
+    запись, просроченные записи удаляются при обращении к ним.
+    """
+
+    def __init__(self, max_size=1024, ttl=None, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at is not None and expires_at <= self._clock():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = self._clock() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            if len(self._data) > self.max_size:
+                self._evict()
+
+    def delete(self, key):
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def _evict(self):
+        # Вытесняем давно не использованные записи; просроченные среди них
+        # оказываются первыми, так как к ним давно не обращались
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+
+_MISSING = object()
+
+
+# --- Двухуровневый кэш: LRU процесса перед общим кэшем Django ---
+
+class TwoTierCache:
+    """
+    Небольшой LRU в памяти процесса (короткий TTL) перед общим кэшем Django.
+    Попадание в первый уровень обходится без сетевого запроса к Redis/базе.
+    Запись и удаление идут в оба уровня, но удаление не доходит до LRU других
+    процессов: их записи живут не дольше local_ttl. Поэтому данные, которые
+    меняются, кладутся под версионированными ключами (user_cache_key) —
+    новая версия просто не находит старых записей ни на одном уровне.
+    """
+
+    def __init__(self, local_size=10000, local_ttl=30, alias='default'):
+        self.local = LRUTTLCache(max_size=local_size, ttl=local_ttl)
+        self.alias = alias
+        self._counters = dict.fromkeys(('local_hits', 'local_misses', 'shared_hits', 'shared_misses'), 0)
+        self._counters_lock = threading.Lock()
+
+    @property
+    def shared(self):
+        from django.core.cache import caches
+        return caches[self.alias]
+
+    def _count(self, name):
+        with self._counters_lock:
+            self._counters[name] += 1
+
+    def get(self, key, default=None):
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self._count('local_hits')
+            return value
+        self._count('local_misses')
+        value = self.shared.get(key, _MISSING)
+        if value is _MISSING:
+            self._count('shared_misses')
+            return default
+        self._count('shared_hits')
+        self.local.set(key, value)
+        return value
+
+    def set(self, key, value, timeout):
+        self.shared.set(key, value, timeout)
+        self.local.set(key, value)
+
+    def delete(self, key):
+        self.shared.delete(key)
+        self.local.delete(key)
+
+    def get_or_compute(self, key, compute, ttl, **kwargs):
+        """Как get_or_compute, но сначала смотрит в LRU процесса"""
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self._count('local_hits')
+            return value
+        self._count('local_misses')
+        computed = []
+
+        def tracked():
+            computed.append(True)
+            return compute()
+
+        value = get_or_compute(key, tracked, ttl, cache=self.shared, **kwargs)
+        self._count('shared_misses' if computed else 'shared_hits')
+        self.local.set(key, value)
+        return value
+
+    def stats(self):
+        """Счётчики попаданий и промахов каждого уровня"""
+        with self._counters_lock:
+            return dict(self._counters)
+
+    def clear_local(self):
+        self.local.clear()
+
+
+# --- Версионированные ключи в общем кэше ---
+#
+# У каждого пользователя есть номер версии его данных. Он входит в ключи
+# закэшированных выборок («слова на сегодня», статистика) и меняется
+# при каждой записи карточек, повторений и тестов (см. words/signals.py,
+# stats/signals.py). Старые записи после этого просто не читаются и
+# истекают сами, поэтому TTL выборок может быть долгим. Так же, со своей
+# версией на каждый telegram_id, версионирован кэш users/identity.py.
+#
+# Версия тоже читается через TwoTierCache, но с коротким TTL первого уровня:
+# изменение в этом же процессе видно сразу (bump_versions сбрасывает
+# локальную версию), а в другом процессе — не позже VERSION_LOCAL_TTL секунд.
+
+VERSION_LOCAL_TTL = 2
+
+user_versions = TwoTierCache(local_size=50000, local_ttl=VERSION_LOCAL_TTL)
+
+
+def _version_key(user_id):
+    return f"user_ver:{user_id}"
+
+
+def cache_version(version_key):
+    """Текущее значение версии version_key"""
+    version = user_versions.get(version_key)
+    if version is None:
+        # Начальная версия — время: если запись версии вытеснена из кэша,
+        # новая не совпадёт ни с одной из прежних
+        version = time.time_ns()
+        if not user_versions.shared.add(version_key, version, None):
+            version = user_versions.shared.get(version_key, version)
+        user_versions.local.set(version_key, version)
+    return version
+
+
+def bump_versions(*version_keys):
+    """
+    Меняет версии сразу и ещё раз после фиксации транзакции: запись,
+    сделанная другим процессом до фиксации, сохраняется под промежуточной
+    версией и больше не читается
+    """
+    from django.db import transaction
+    version_keys = set(version_keys)
+    _bump(version_keys)
+    transaction.on_commit(lambda: _bump(version_keys))
+
+
+def user_cache_version(user_id):
+    """Текущая версия данных пользователя"""
+    return cache_version(_version_key(user_id))
+
+
+def user_cache_key(name, user_id, *parts):
+    """Ключ выборки name пользователя для текущей версии его данных"""
+    suffix = ''.join(f":{part}" for part in parts)
+    return f"{name}:{user_id}:v{user_cache_version(user_id)}{suffix}"
+
+
+def bump_user_cache(*user_ids):
+    """Делает недействительными все закэшированные выборки пользователей"""
+    bump_versions(*(_version_key(user_id) for user_id in user_ids))
+
+
+def _bump(version_keys):
+    shared = user_versions.shared
+    for key in version_keys:
+        try:
+            shared.incr(key)
+        except ValueError:
+            shared.set(key, time.time_ns(), None)
+        user_versions.local.delete(key)
+
+
+# --- Один пересчёт на ключ: single-flight, stale-while-revalidate, XFetch ---
+#
+# Запись хранится как (значение, мягкий срок, время вычисления). До мягкого
+# срока значение отдаётся как есть; ключи, которые читают часто, пересчитываются
+# немного раньше срока с вероятностью, растущей к его концу (XFetch). После
+# срока значение ещё grace секунд отдаётся, пока один из читателей пересчитывает
+# его под коротким замком (cache.add). Если значения нет совсем (первое чтение,
+# новая версия данных), пересчитывает тоже один, а остальные ждут его результата.
+
+def get_or_compute(key, compute, ttl, grace=None, lock_timeout=5, beta=1.0, wait_interval=0.02, cache=None):
+    """Значение key из общего кэша; при промахе или истечении compute() вызывается одним читателем"""
+    if cache is None:
+        from django.core.cache import cache
+    grace = ttl if grace is None else grace
+    lock_key = f"{key}:lock"
+
+    entry = cache.get(key)
+    if entry is not None:
+        value, expires_at, delta = entry
+        # XFetch: -log(u) > 0, чем дольше вычисление и ближе срок — тем вероятнее ранний пересчёт
+        if time.time() - delta * beta * math.log(1.0 - random.random()) < expires_at:
+            return value
+        if not cache.add(lock_key, 1, lock_timeout):
+            return value  # пересчитывает другой читатель — отдаём прежнее значение
+        return _recompute(cache, key, lock_key, compute, ttl, grace)
+
+    deadline = time.monotonic() + lock_timeout
+    while not cache.add(lock_key, 1, lock_timeout):
+        time.sleep(wait_interval)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+        if time.monotonic() >= deadline:
+            return compute()  # пересчитывающий не уложился в замок — не ждём дольше
+    # Пока мы ждали замок, значение мог записать предыдущий владелец замка
+    entry = cache.get(key)
+    if entry is not None:
+        cache.delete(lock_key)
+        return entry[0]
+    return _recompute(cache, key, lock_key, compute, ttl, grace)
+
+
+def _recompute(cache, key, lock_key, compute, ttl, grace):
+    try:
+        started = time.time()
+        value = compute()
+        finished = time.time()
+        cache.set(key, (value, finished + ttl, finished - started), ttl + grace)
+        return value
+    finally:
+        cache.delete(lock_key)
@@ -55,6 +55,7 @@ INSTALLED_APPS = [
     'stats',
     'users',
     'feedback',
+    'reminders',
 ]
 
 MIDDLEWARE = [
@@ -95,10 +96,41 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Постоянные соединения: потоки бота (telegram_bot/utils/db.py) не открывают
+        # соединение заново на каждый запрос; сломанные соединения проверяются перед использованием
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
 
+# Cache
+# Сайт и бот — разные процессы: чтобы они видели одни и те же записи
+# (кэш пользователей бота, «слова на сегодня», статистика), кэш должен быть общим.
+# CACHE_BACKEND: 'locmem' — в памяти процесса (разработка, тесты),
+# 'file' — каталог на диске, 'database' — таблица в базе (python manage.py createcachetable),
+# 'redis' — Redis (нужен пакет redis). CACHE_LOCATION — каталог, таблица или адрес сервера.
+
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'lingua-track'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / 'var' / 'cache')),
+    'database': ('django.core.cache.backends.db.DatabaseCache', 'django_cache'),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+_cache_backend, _cache_location = CACHE_BACKENDS[os.getenv('CACHE_BACKEND', 'locmem')]
+
+CACHES = {
+    'default': {
+        'BACKEND': _cache_backend,
+        'LOCATION': os.getenv('CACHE_LOCATION', _cache_location),
+        'TIMEOUT': 3600,
+    }
+}
+if _cache_backend != CACHE_BACKENDS['redis'][0]:
+    # По умолчанию Django хранит всего 300 записей
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 100000))}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -139,3 +171,14 @@ LOGIN_URL = '/users/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/users/login/'
 
+
+# Сколько дней хранить журнал повторений (words.ReviewLog);
+# старые записи удаляет команда prune_review_log
+REVIEW_LOG_RETENTION_DAYS = int(os.getenv('REVIEW_LOG_RETENTION_DAYS', 730))
+
+# Озвучка слов (words.tts): потоков синтеза, мест в очереди сверх них
+# и сколько секунд запрос ждёт готовый файл
+TTS_BACKEND = os.getenv('TTS_BACKEND', 'words.tts.gtts_backend')
+TTS_WORKERS = int(os.getenv('TTS_WORKERS', 2))
+TTS_QUEUE_SIZE = int(os.getenv('TTS_QUEUE_SIZE', 50))
+TTS_TIMEOUT = float(os.getenv('TTS_TIMEOUT', 15))
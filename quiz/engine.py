@@ -0,0 +1,133 @@
+import random
+
+from words.models import Card
+from words.utils import sample_card_ids
+
+# Движок сессии теста.
+# План теста (случайные вопросы и неправильные варианты) строится один раз при старте
+# и хранится в сессии в компактном виде: список пар (слово, перевод) и для
+# каждого вопроса — индекс карточки и индексы вариантов ответа. Каждый
+# следующий вопрос берётся из плана по индексу, без запросов к таблице карточек.
+
+PLAN_SESSION_KEY = 'quiz_plan'
+
+# Сколько неправильных вариантов показывать в тестах с выбором ответа
+DISTRACTORS = 3
+
+# Длина теста (число вопросов) по умолчанию и максимальная
+DEFAULT_LENGTH = 10
+MAX_LENGTH = 100
+
+# Тесты с вариантами ответа: им нужны неправильные варианты и минимум 2 карточки
+CHOICE_TESTS = ('multiple_choice', 'matching')
+
+
+def min_cards_for(test_type):
+    """Минимальное число карточек, с которым тест имеет смысл"""
+    return 2 if test_type in CHOICE_TESTS else 1
+
+
+def parse_length(value):
+    """Длина теста из параметра запроса; при ошибке — длина по умолчанию"""
+    try:
+        length = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_LENGTH
+    return max(1, min(length, MAX_LENGTH))
+
+
+def build_plan(user, test_type, direction, length=DEFAULT_LENGTH):
+    """
+    Выбирает случайные карточки пользователя (с запасом под неправильные
+    варианты), загружает только их слово и перевод и заранее выбирает
+    неправильные варианты для каждого вопроса.
+    Возвращает план или None, если карточек недостаточно.
+    """
+    extra = DISTRACTORS if test_type in CHOICE_TESTS else 0
+    ids = sample_card_ids(Card.objects.filter(user=user), length + extra)
+    rows = dict((pk, [word, translation]) for pk, word, translation in
+                Card.objects.filter(id__in=ids).values_list('id', 'word', 'translation'))
+    pairs = [rows[pk] for pk in ids if pk in rows]
+    if len(pairs) < min_cards_for(test_type):
+        return None
+
+    # Вопросы — первые length карточек выборки, остальные служат только вариантами
+    questions = []
+    last = len(pairs) - 1
+    for i in range(min(length, len(pairs))):
+        if test_type in CHOICE_TESTS:
+            # Случайные индексы других карточек: выбираем из range(last) и сдвигаем те, что >= i
+            options = [i] + [j + (j >= i) for j in random.sample(range(last), min(DISTRACTORS, last))]
+            # Порядок вариантов фиксируется в плане и не меняется при перезагрузке страницы
+            random.shuffle(options)
+        else:
+            options = []
+        questions.append([i] + options)
+
+    return {
+        'test_type': test_type,
+        'direction': direction,
+        'pairs': pairs,
+        'questions': questions,
+        'idx': 0,
+        'score': 0,
+    }
+
+
+def start(session, user, test_type, direction, length=DEFAULT_LENGTH):
+    """Строит новый план и кладёт его в сессию"""
+    plan = build_plan(user, test_type, direction, length)
+    if plan is None:
+        session.pop(PLAN_SESSION_KEY, None)
+    else:
+        session[PLAN_SESSION_KEY] = plan
+    return plan
+
+
+def get_plan(session, test_type):
+    """Текущий план из сессии, если он относится к этому типу теста"""
+    plan = session.get(PLAN_SESSION_KEY)
+    if plan and plan['test_type'] == test_type:
+        return plan
+    return None
+
+
+def finish(session):
+    """Удаляет план из сессии"""
+    session.pop(PLAN_SESSION_KEY, None)
+
+
+def is_finished(plan):
+    return plan['idx'] >= len(plan['questions'])
+
+
+def _sides(plan, index):
+    word, translation = plan['pairs'][index]
+    if plan['direction'] == 'en-ru':
+        return word, translation
+    return translation, word
+
+
+def current_question(plan):
+    """
+    Текущий вопрос: (вопрос, правильный ответ, варианты).
+    Для тестов без вариантов список вариантов пустой.
+    """
+    card_index, *option_indices = plan['questions'][plan['idx']]
+    question, correct = _sides(plan, card_index)
+    options = [_sides(plan, j)[1] for j in option_indices]
+    return question, correct, options
+
+
+def submit_answer(session, plan, answer, ignore_case=False):
+    """Засчитывает ответ на текущий вопрос и переходит к следующему"""
+    _, correct, _ = current_question(plan)
+    if ignore_case:
+        is_correct = answer.strip().lower() == correct.lower()
+    else:
+        is_correct = answer == correct
+    if is_correct:
+        plan['score'] += 1
+    plan['idx'] += 1
+    session[PLAN_SESSION_KEY] = plan
+    return is_correct
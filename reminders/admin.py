@@ -0,0 +1,23 @@
+from django.contrib import admin
+from .models import ReminderPreference, ReminderDelivery, ReminderLease
+
+
+@admin.register(ReminderPreference)
+class ReminderPreferenceAdmin(admin.ModelAdmin):
+    list_display = ['user', 'enabled', 'timezone', 'hour', 'minute', 'quiet_days', 'updated_at']
+    list_filter = ['enabled', 'timezone']
+    search_fields = ['user__username']
+    raw_id_fields = ['user']
+
+
+@admin.register(ReminderDelivery)
+class ReminderDeliveryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'date', 'sent_at']
+    list_filter = ['date']
+    search_fields = ['user__username']
+    raw_id_fields = ['user']
+
+
+@admin.register(ReminderLease)
+class ReminderLeaseAdmin(admin.ModelAdmin):
+    list_display = ['name', 'owner', 'expires_at']
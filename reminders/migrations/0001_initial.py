@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:54
+
+import django.core.validators
+import django.db.models.deletion
+import reminders.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderPreference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('enabled', models.BooleanField(default=True, verbose_name='Напоминания включены')),
+                ('timezone', models.CharField(default='UTC', max_length=64, validators=[reminders.models.validate_timezone], verbose_name='Часовой пояс')),
+                ('hour', models.PositiveSmallIntegerField(default=9, validators=[django.core.validators.MaxValueValidator(23)], verbose_name='Час')),
+                ('minute', models.PositiveSmallIntegerField(default=0, validators=[django.core.validators.MaxValueValidator(59)], verbose_name='Минута')),
+                ('quiet_days', models.CharField(blank=True, max_length=13, validators=[reminders.models.validate_quiet_days], verbose_name='Дни без напоминаний')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='reminder_preference', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Настройки напоминаний',
+                'verbose_name_plural': 'Настройки напоминаний',
+            },
+        ),
+    ]
@@ -0,0 +1,141 @@
+import zoneinfo
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator
+from django.db import models, transaction, IntegrityError
+from django.db.models import Q
+from django.utils import timezone as django_timezone
+
+# Значения по умолчанию для пользователей без сохранённых настроек
+DEFAULT_TIMEZONE = 'UTC'
+DEFAULT_HOUR = 9
+DEFAULT_MINUTE = 0
+
+WEEKDAY_NAMES = ['пн', 'вт', 'ср', 'чт', 'пт', 'сб', 'вс']
+
+
+def validate_timezone(value):
+    if value not in zoneinfo.available_timezones():
+        raise ValidationError(f"Неизвестный часовой пояс: {value}")
+
+
+def validate_quiet_days(value):
+    if value and not all(part.isdigit() and int(part) < 7 for part in value.split(',')):
+        raise ValidationError("Дни недели — числа 0–6 через запятую (0 — понедельник)")
+
+
+class ReminderPreference(models.Model):
+    """Настройки ежедневного напоминания пользователя"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='reminder_preference')
+    enabled = models.BooleanField("Напоминания включены", default=True)
+    timezone = models.CharField("Часовой пояс", max_length=64, default=DEFAULT_TIMEZONE,
+                                validators=[validate_timezone])
+    hour = models.PositiveSmallIntegerField("Час", default=DEFAULT_HOUR, validators=[MaxValueValidator(23)])
+    minute = models.PositiveSmallIntegerField("Минута", default=DEFAULT_MINUTE, validators=[MaxValueValidator(59)])
+    # Дни без напоминаний: номера дней недели через запятую, 0 — понедельник
+    quiet_days = models.CharField("Дни без напоминаний", max_length=13, blank=True,
+                                  validators=[validate_quiet_days])
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Настройки напоминаний"
+        verbose_name_plural = "Настройки напоминаний"
+
+    def __str__(self):
+        state = f"{self.hour:02d}:{self.minute:02d} {self.timezone}" if self.enabled else "выключены"
+        return f"Напоминания {self.user.username}: {state}"
+
+    @property
+    def quiet_weekdays(self):
+        return parse_quiet_days(self.quiet_days)
+
+
+def parse_quiet_days(value):
+    return frozenset(int(part) for part in value.split(',') if part) if value else frozenset()
+
+
+def zone(tz_name):
+    """Часовой пояс по имени; неизвестное имя — UTC"""
+    try:
+        return zoneinfo.ZoneInfo(tz_name)
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        return dt_timezone.utc
+
+
+def next_fire_time(after, tz_name=DEFAULT_TIMEZONE, hour=DEFAULT_HOUR, minute=DEFAULT_MINUTE,
+                   quiet_days=frozenset(), offset_seconds=0):
+    """
+    Ближайший момент напоминания строго после after (aware datetime), в UTC.
+    Время hour:minute считается в часовом поясе пользователя, дни quiet_days
+    (0 — понедельник, по местному календарю) пропускаются. offset_seconds
+    сдвигает момент внутри окна, чтобы пользователи с одинаковым временем
+    не получали сообщения в одну секунду. None — если все дни недели тихие.
+    """
+    tz = zone(tz_name)
+    local_day = after.astimezone(tz).date()
+    for days in range(8):
+        day = local_day + timedelta(days=days)
+        if day.weekday() in quiet_days:
+            continue
+        candidate = datetime.combine(day, time(hour, minute), tzinfo=tz) + timedelta(seconds=offset_seconds)
+        if candidate > after:
+            return candidate.astimezone(dt_timezone.utc)
+    return None
+
+
+class ReminderLease(models.Model):
+    """
+    Аренда с истечением срока в базе: только владелец аренды (одна реплика
+    бота) рассылает напоминания; если он упал, аренда истекает и её берёт другая
+    """
+    name = models.CharField(max_length=100, unique=True)
+    owner = models.CharField(max_length=100)
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name}: {self.owner} до {self.expires_at:%H:%M:%S}"
+
+    @classmethod
+    def acquire(cls, name, owner, ttl):
+        """Берёт или продлевает аренду на ttl секунд; False — аренда у другого владельца"""
+        now = django_timezone.now()
+        expires_at = now + timedelta(seconds=ttl)
+        # Сравнение и запись одним UPDATE: из двух реплик строку получит только одна
+        updated = cls.objects.filter(name=name).filter(Q(owner=owner) | Q(expires_at__lte=now)).update(
+            owner=owner, expires_at=expires_at)
+        if updated:
+            return True
+        try:
+            with transaction.atomic():
+                cls.objects.create(name=name, owner=owner, expires_at=expires_at)
+            return True
+        except IntegrityError:
+            return False
+
+    @classmethod
+    def release(cls, name, owner):
+        cls.objects.filter(name=name, owner=owner).delete()
+
+
+class ReminderDelivery(models.Model):
+    """
+    Журнал обработанных напоминаний: не больше одного на пользователя в день
+    (по его местной дате). День, когда повторять было нечего, тоже отмечается
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reminder_deliveries')
+    date = models.DateField()
+    sent_at = models.DateTimeField(default=django_timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='unique_reminder_delivery_user_date'),
+        ]
+        indexes = [
+            # Очистка старых записей и выборка за последние дни
+            models.Index(fields=['date'], name='reminderdelivery_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.date}"
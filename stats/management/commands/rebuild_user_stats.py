@@ -0,0 +1,24 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from stats.models import UserStats
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики UserStats с нуля (для восстановления после сбоев)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="username пользователя; по умолчанию — все пользователи")
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options['user']:
+            users = users.filter(username=options['user'])
+            if not users.exists():
+                raise CommandError(f"Пользователь '{options['user']}' не найден")
+
+        count = 0
+        for user in users.iterator():
+            UserStats.rebuild(user)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Статистика пересчитана для {count} пользователей"))
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_accuracy(apps, schema_editor):
+    """Заполняет сохранённую точность для уже пройденных тестов"""
+    TestResult = apps.get_model('stats', 'TestResult')
+    batch = []
+    for result in TestResult.objects.filter(total__gt=0).only('id', 'score', 'total').iterator():
+        result.accuracy = round((result.score / result.total) * 100, 1)
+        batch.append(result)
+        if len(batch) >= 1000:
+            TestResult.objects.bulk_update(batch, ['accuracy'])
+            batch = []
+    if batch:
+        TestResult.objects.bulk_update(batch, ['accuracy'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stats', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testresult',
+            name='accuracy',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.RunPython(backfill_accuracy, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='testresult',
+            index=models.Index(fields=['user', 'test_type', 'accuracy', 'score'], name='testresult_user_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testresult',
+            index=models.Index(fields=['user', 'completed_at'], name='testresult_user_date_idx'),
+        ),
+    ]
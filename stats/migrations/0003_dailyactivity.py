@@ -0,0 +1,59 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_tests(apps, schema_editor):
+    """
+    Заполняет сводку по уже пройденным тестам. Повторения по дням
+    восстановить нельзя: в Repetition хранятся только итоговые счётчики.
+    """
+    TestResult = apps.get_model('stats', 'TestResult')
+    DailyActivity = apps.get_model('stats', 'DailyActivity')
+    rows = (
+        TestResult.objects.values('user_id', 'completed_at__date')
+        .annotate(tests=Count('id'), accuracy_sum=Sum('accuracy'))
+        .order_by()
+    )
+    DailyActivity.objects.bulk_create(
+        [
+            DailyActivity(
+                user_id=row['user_id'],
+                day=row['completed_at__date'],
+                tests=row['tests'],
+                accuracy_sum=row['accuracy_sum'] or 0.0,
+            )
+            for row in rows.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stats', '0002_testresult_accuracy'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('reviews', models.IntegerField(default=0)),
+                ('successes', models.IntegerField(default=0)),
+                ('tests', models.IntegerField(default=0)),
+                ('accuracy_sum', models.FloatField(default=0.0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_activity', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'day'), name='unique_daily_activity_user_day')],
+            },
+        ),
+        migrations.RunPython(backfill_tests, migrations.RunPython.noop),
+    ]
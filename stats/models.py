@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Sum, Avg, ExpressionWrapper, FloatField
 from django.contrib.auth.models import User
 from django.utils import timezone
 
@@ -22,17 +23,34 @@ class TestResult(models.Model):
     correct_answers = models.IntegerField(default=0)  # Правильные ответы
     wrong_answers = models.IntegerField(default=0)  # Неправильные ответы
     time_taken = models.IntegerField(null=True, blank=True)  # Время прохождения в секундах (опционально)
+    accuracy = models.FloatField(default=0.0)  # Процент правильных ответов (считается при сохранении)
+
+    class Meta:
+        indexes = [
+            # Агрегаты по типам тестов: WHERE user_id = ? GROUP BY test_type → AVG(accuracy), MAX(score)
+            models.Index(fields=['user', 'test_type', 'accuracy', 'score'], name='testresult_user_type_idx'),
+            # История и графики по датам
+            models.Index(fields=['user', 'completed_at'], name='testresult_user_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.get_test_type_display()} ({self.score}/{self.total})"
     
     # Метод для вычисления процента правильных ответов
-    @property
-    def accuracy(self):
+    @staticmethod
+    def compute_accuracy(score, total):
         """Возвращает процент правильных ответов"""
-        if self.total == 0:
+        if total == 0:
             return 0
-        return round((self.score / self.total) * 100, 1)
+        return round((score / total) * 100, 1)
+
+    def save(self, *args, **kwargs):
+        # Точность хранится в столбце, чтобы агрегировать её в SQL
+        self.accuracy = self.compute_accuracy(self.score, self.total)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'score', 'total'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'accuracy'}
+        super().save(*args, **kwargs)
     
     # Метод для определения результата теста
     @property
@@ -48,9 +66,21 @@ class TestResult(models.Model):
         else:
             return "Плохо"
 
+def _lock_user(user_id):
+    """Блокирует строку пользователя до конца транзакции (SELECT ... FOR UPDATE)"""
+    User.objects.select_for_update().filter(pk=user_id).first()
+
+
 # Модель для общей статистики пользователя
 # Агрегирует данные по карточкам, повторениям и тестам
 class UserStats(models.Model):
+    # Поле-счётчик для каждого уровня карточки
+    LEVEL_FIELDS = {
+        'beginner': 'beginner_cards',
+        'intermediate': 'intermediate_cards',
+        'advanced': 'advanced_cards',
+    }
+
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='stats')
     
     # --- Статистика карточек ---
@@ -74,6 +104,87 @@ class UserStats(models.Model):
     
     def __str__(self):
         return f"Статистика {self.user.username}"
+
+    @classmethod
+    def for_user(cls, user):
+        """
+        Возвращает статистику пользователя одной строкой; при первом обращении считает её с нуля.
+        Первый пересчёт идёт под блокировкой строки пользователя: apply_delta, не нашедший
+        строку статистики, ждёт его окончания и прибавляет дельту к уже записанной строке
+        """
+        try:
+            return cls.objects.get(user=user)
+        except cls.DoesNotExist:
+            pass
+        with transaction.atomic():
+            _lock_user(user.pk)
+            # Пока ждали блокировку, строку мог посчитать параллельный запрос
+            return cls.objects.filter(user=user).first() or cls.rebuild(user)
+
+    @classmethod
+    def rebuild(cls, user):
+        """Полностью пересчитывает счётчики по карточкам, повторениям и тестам"""
+        from words.models import Card, Repetition
+
+        counters = {field: 0 for field in cls.LEVEL_FIELDS.values()}
+        for row in Card.objects.filter(user=user).values('level').annotate(n=models.Count('id')):
+            if row['level'] in cls.LEVEL_FIELDS:
+                counters[cls.LEVEL_FIELDS[row['level']]] = row['n']
+        counters['total_cards'] = sum(counters.values())
+
+        agg = Repetition.objects.filter(user=user).aggregate(
+            total=Sum('total_reviews'),
+            success=Sum('successful_reviews'),
+            failed=Sum('failed_reviews'),
+        )
+        counters['total_reviews'] = agg['total'] or 0
+        counters['successful_reviews'] = agg['success'] or 0
+        counters['failed_reviews'] = agg['failed'] or 0
+
+        tests = TestResult.objects.filter(user=user).aggregate(count=models.Count('id'), avg=Avg('accuracy'))
+        counters['total_tests'] = tests['count']
+        counters['tests_accuracy'] = tests['avg'] or 0.0
+
+        user_stats, _ = cls.objects.update_or_create(user=user, defaults=counters)
+        return user_stats
+
+    @classmethod
+    def apply_delta(cls, user_id, **deltas):
+        """
+        Атомарно прибавляет deltas к счётчикам через F-выражения.
+        Если строки ещё нет, ничего не делает: она будет посчитана с нуля
+        при первом чтении через for_user.
+        """
+        updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+        if updates:
+            cls._update_or_wait_rebuild(user_id, last_activity=timezone.now(), **updates)
+
+    @classmethod
+    def _update_or_wait_rebuild(cls, user_id, **updates):
+        """
+        UPDATE строки статистики. Если строки нет, её может прямо сейчас считать
+        for_user по выборке без этого изменения: тогда ждём его блокировку и повторяем
+        UPDATE, иначе изменение пропало бы при записи пересчитанной строки
+        """
+        rows = cls.objects.filter(user_id=user_id)
+        if rows.update(**updates):
+            return
+        with transaction.atomic():
+            _lock_user(user_id)
+            rows.update(**updates)
+
+    @classmethod
+    def record_test(cls, user_id, accuracy):
+        """Учитывает новый тест: увеличивает счётчик и пересчитывает среднюю точность"""
+        cls._update_or_wait_rebuild(
+            user_id,
+            tests_accuracy=ExpressionWrapper(
+                (F('tests_accuracy') * F('total_tests') + accuracy) / (F('total_tests') + 1),
+                output_field=FloatField(),
+            ),
+            total_tests=F('total_tests') + 1,
+            last_activity=timezone.now(),
+        )
     
     # Метод для вычисления процента успешности повторений
     @property
@@ -109,3 +220,45 @@ class UserStats(models.Model):
             recommendations.append("Повторите слова перед прохождением тестов")
         
         return recommendations
+
+
+# Суточная сводка активности пользователя (rollup)
+# Обновляется при каждом событии, графики читают диапазон дней за O(дней)
+class DailyActivity(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_activity')
+    day = models.DateField()  # День (UTC)
+    reviews = models.IntegerField(default=0)  # Повторений за день
+    successes = models.IntegerField(default=0)  # Успешных повторений (оценка 3-5)
+    tests = models.IntegerField(default=0)  # Пройдено тестов
+    accuracy_sum = models.FloatField(default=0.0)  # Сумма точности тестов (для среднего)
+
+    class Meta:
+        constraints = [
+            # Уникальность даёт и индекс (user, day) для выборки диапазонов
+            models.UniqueConstraint(fields=['user', 'day'], name='unique_daily_activity_user_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} — {self.day}"
+
+    @property
+    def avg_accuracy(self):
+        """Средняя точность тестов за день"""
+        if self.tests == 0:
+            return 0
+        return round(self.accuracy_sum / self.tests, 1)
+
+    @classmethod
+    def record(cls, user_id, day, **deltas):
+        """Атомарно прибавляет deltas к строке (user, day), создавая её при необходимости"""
+        updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+        if not updates:
+            return
+        if cls.objects.filter(user_id=user_id, day=day).update(**updates):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(user_id=user_id, day=day, **deltas)
+        except IntegrityError:
+            # Строку только что создал параллельный запрос
+            cls.objects.filter(user_id=user_id, day=day).update(**updates)
@@ -0,0 +1,95 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from lingua_track.cache import bump_user_cache
+from words.models import Card, Repetition
+from words.signals import repetitions_reviewed
+from .models import TestResult, UserStats, DailyActivity
+
+# Инкрементальное обновление UserStats и DailyActivity: каждое событие меняет счётчики
+# одним UPDATE с F-выражениями вместо полного пересчёта при чтении
+
+
+@receiver(pre_save, sender=Card)
+def remember_card_level(sender, instance, **kwargs):
+    """Запоминает прежний уровень карточки, чтобы учесть его смену"""
+    if instance.pk:
+        instance._previous_level = Card.objects.filter(pk=instance.pk).values_list('level', flat=True).first()
+
+
+@receiver(post_save, sender=Card)
+def count_card_saved(sender, instance, created, **kwargs):
+    new_field = UserStats.LEVEL_FIELDS.get(instance.level)
+    if created:
+        deltas = {'total_cards': 1}
+        if new_field:
+            deltas[new_field] = 1
+        UserStats.apply_delta(instance.user_id, **deltas)
+        return
+
+    previous_level = getattr(instance, '_previous_level', None)
+    if previous_level and previous_level != instance.level:
+        deltas = {}
+        old_field = UserStats.LEVEL_FIELDS.get(previous_level)
+        if old_field:
+            deltas[old_field] = -1
+        if new_field:
+            deltas[new_field] = 1
+        UserStats.apply_delta(instance.user_id, **deltas)
+
+
+@receiver(post_delete, sender=Card)
+def count_card_deleted(sender, instance, **kwargs):
+    deltas = {'total_cards': -1}
+    level_field = UserStats.LEVEL_FIELDS.get(instance.level)
+    if level_field:
+        deltas[level_field] = -1
+    UserStats.apply_delta(instance.user_id, **deltas)
+
+
+@receiver(post_delete, sender=Repetition)
+def count_repetition_deleted(sender, instance, **kwargs):
+    """Повторения удалённой карточки больше не входят в статистику"""
+    UserStats.apply_delta(
+        instance.user_id,
+        total_reviews=-instance.total_reviews,
+        successful_reviews=-instance.successful_reviews,
+        failed_reviews=-instance.failed_reviews,
+    )
+
+
+@receiver(repetitions_reviewed)
+def count_reviews(sender, reviews, **kwargs):
+    per_user = {}
+    for repetition, quality in reviews:
+        counters = per_user.setdefault(repetition.user_id, {'total_reviews': 0, 'successful_reviews': 0, 'failed_reviews': 0})
+        counters['total_reviews'] += 1
+        if quality >= 3:
+            counters['successful_reviews'] += 1
+        else:
+            counters['failed_reviews'] += 1
+    today = timezone.now().date()
+    for user_id, counters in per_user.items():
+        UserStats.apply_delta(user_id, **counters)
+        DailyActivity.record(
+            user_id, today,
+            reviews=counters['total_reviews'],
+            successes=counters['successful_reviews'],
+        )
+
+
+@receiver(post_save, sender=TestResult)
+def count_test_result(sender, instance, created, **kwargs):
+    if created:
+        UserStats.record_test(instance.user_id, instance.accuracy)
+        DailyActivity.record(
+            instance.user_id, instance.completed_at.date(),
+            tests=1,
+            accuracy_sum=instance.accuracy,
+        )
+
+
+@receiver(post_save, sender=TestResult)
+@receiver(post_delete, sender=TestResult)
+def bump_cache_on_test(sender, instance, **kwargs):
+    bump_user_cache(instance.user_id)
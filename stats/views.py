@@ -1,51 +1,86 @@
-from django.shortcuts import render, get_object_or_404
+from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Avg, Sum, Q
+from django.db.models import Count, Avg, Max, Sum, Q, F
+from django.db.models.functions import TruncMonth
 from django.utils import timezone
 from datetime import timedelta
 from words.models import Card, Repetition
-from .models import TestResult, UserStats
+from .models import TestResult, UserStats, DailyActivity
+
+
+# Сводка по типам тестов одним запросом с условной агрегацией:
+# общее количество и средняя точность плюс count/avg/max для каждого типа
+def summarize_tests(test_results):
+    aggregates = {
+        'total': Count('id'),
+        'avg_accuracy': Avg('accuracy'),
+    }
+    for test_type, _ in TestResult.TEST_TYPE_CHOICES:
+        only_type = Q(test_type=test_type)
+        aggregates[f'{test_type}__count'] = Count('id', filter=only_type)
+        aggregates[f'{test_type}__avg'] = Avg('accuracy', filter=only_type)
+        aggregates[f'{test_type}__best'] = Max('score', filter=only_type)
+    row = test_results.order_by().aggregate(**aggregates)
+
+    by_type = [
+        {
+            'test_type': test_type,
+            'count': row[f'{test_type}__count'],
+            'avg_accuracy': row[f'{test_type}__avg'],
+            'best_score': row[f'{test_type}__best'],
+        }
+        for test_type, _ in TestResult.TEST_TYPE_CHOICES
+        if row[f'{test_type}__count']
+    ]
+    return row['total'], row['avg_accuracy'] or 0, by_type
+
+# Окна графиков: число дней; None — вся история, сжатая до месяцев
+CHART_WINDOWS = {
+    '7': (7, 'последние 7 дней'),
+    '30': (30, 'последние 30 дней'),
+    '365': (365, 'последний год'),
+    'all': (None, 'всё время, по месяцам'),
+}
+
+
+# Ряд активности из суточной сводки DailyActivity: O(дней) строк
+def activity_series(user, window_days):
+    activity = DailyActivity.objects.filter(user=user)
+    if window_days is None:
+        activity = activity.annotate(period=TruncMonth('day')).values('period').annotate(
+            reviews=Sum('reviews'),
+            successes=Sum('successes'),
+            tests=Sum('tests'),
+            accuracy_sum=Sum('accuracy_sum'),
+        )
+    else:
+        start = timezone.now().date() - timedelta(days=window_days - 1)
+        activity = activity.filter(day__gte=start).annotate(period=F('day')).values(
+            'period', 'reviews', 'successes', 'tests', 'accuracy_sum'
+        )
+
+    series = []
+    for row in activity.order_by('period'):
+        row['avg_accuracy'] = row['accuracy_sum'] / row['tests'] if row['tests'] else 0
+        series.append(row)
+    return series
+
 
 # Главная страница статистики (dashboard)
 # Показывает общую статистику пользователя: карточки, повторения, тесты
 @login_required
 def dashboard(request):
-    # Получаем или создаём статистику пользователя
-    user_stats, created = UserStats.objects.get_or_create(user=request.user)
-    
-    # Обновляем статистику карточек
-    cards = Card.objects.filter(user=request.user)
-    user_stats.total_cards = cards.count()
-    user_stats.beginner_cards = cards.filter(level='beginner').count()
-    user_stats.intermediate_cards = cards.filter(level='intermediate').count()
-    user_stats.advanced_cards = cards.filter(level='advanced').count()
-    
-    # Обновляем статистику повторений
-    repetitions = Repetition.objects.filter(user=request.user)
-    user_stats.total_reviews = repetitions.aggregate(total=Sum('total_reviews'))['total'] or 0
-    user_stats.successful_reviews = repetitions.aggregate(success=Sum('successful_reviews'))['success'] or 0
-    user_stats.failed_reviews = repetitions.aggregate(failed=Sum('failed_reviews'))['failed'] or 0
-    
-    # Обновляем статистику тестов
-    test_results = TestResult.objects.filter(user=request.user)
-    user_stats.total_tests = test_results.count()
-    if user_stats.total_tests > 0:
-        # Вычисляем среднюю точность в Python, так как accuracy - это property
-        total_accuracy = sum(test.accuracy for test in test_results)
-        user_stats.tests_accuracy = total_accuracy / user_stats.total_tests
-    else:
-        user_stats.tests_accuracy = 0
-    
-    user_stats.save()
+    # Счётчики поддерживаются инкрементально (stats/signals.py) — читаем одну строку
+    user_stats = UserStats.for_user(request.user)
     
     # Получаем последние тесты
-    recent_tests = test_results.order_by('-completed_at')[:5]
+    recent_tests = TestResult.objects.filter(user=request.user).order_by('-completed_at')[:5]
     
     # Получаем слова, требующие повторения
     today = timezone.now().date()
-    due_cards = Card.objects.filter(
+    due_cards = Repetition.objects.filter(
         user=request.user,
-        repetition__next_review__lte=today
+        next_review__lte=today
     ).count()
     
     context = {
@@ -65,74 +100,25 @@ def charts(request):
         count=Count('id')
     ).order_by('level')
     
-    # Статистика тестов по типам
+    # Статистика тестов по типам (один агрегирующий запрос)
     test_results = TestResult.objects.filter(user=request.user)
-    test_type_stats = []
-    
-    # Группируем результаты по типам тестов
-    for test_type in ['multiple_choice', 'typing', 'matching']:
-        type_results = test_results.filter(test_type=test_type)
-        if type_results.exists():
-            count = type_results.count()
-            avg_accuracy = sum(test.accuracy for test in type_results) / count
-            test_type_stats.append({
-                'test_type': test_type,
-                'count': count,
-                'avg_accuracy': avg_accuracy
-            })
-    
-    # Статистика тестов по дням (последние 30 дней)
-    thirty_days_ago = timezone.now().date() - timedelta(days=30)
-    daily_test_results = TestResult.objects.filter(
-        user=request.user,
-        completed_at__date__gte=thirty_days_ago
-    ).order_by('completed_at__date')
+    _, _, test_type_stats = summarize_tests(test_results)
     
-    # Группируем результаты по дням
-    daily_test_stats = []
-    current_date = None
-    current_tests = []
-    
-    for test in daily_test_results:
-        test_date = test.completed_at.date()
-        if test_date != current_date:
-            if current_tests:
-                count = len(current_tests)
-                avg_accuracy = sum(t.accuracy for t in current_tests) / count
-                daily_test_stats.append({
-                    'completed_at__date': current_date,
-                    'count': count,
-                    'avg_accuracy': avg_accuracy
-                })
-            current_date = test_date
-            current_tests = [test]
-        else:
-            current_tests.append(test)
-    
-    # Добавляем последнюю группу
-    if current_tests:
-        count = len(current_tests)
-        avg_accuracy = sum(t.accuracy for t in current_tests) / count
-        daily_test_stats.append({
-            'completed_at__date': current_date,
-            'count': count,
-            'avg_accuracy': avg_accuracy
-        })
-    
-    # Статистика повторений по дням
-    daily_review_stats = Repetition.objects.filter(
-        user=request.user,
-        last_reviewed__gte=thirty_days_ago
-    ).values('last_reviewed').annotate(
-        total_reviews=Sum('total_reviews'),
-        successful_reviews=Sum('successful_reviews')
-    ).order_by('last_reviewed')
+    # Активность по дням (или по месяцам за всё время) из суточной сводки
+    window = request.GET.get('window', '30')
+    if window not in CHART_WINDOWS:
+        window = '30'
+    window_days, window_label = CHART_WINDOWS[window]
+    series = activity_series(request.user, window_days)
     
     context = {
         'level_stats': list(level_stats),
         'test_type_stats': list(test_type_stats),
-        'daily_test_stats': list(daily_test_stats),
-        'daily_review_stats': list(daily_review_stats),
+        'daily_test_stats': [row for row in series if row['tests']],
+        'daily_review_stats': [row for row in series if row['reviews']],
+        'window': window,
+        'window_label': window_label,
+        'monthly': window_days is None,
     }
     return render(request, 'stats/charts.html', context)
 
@@ -140,7 +126,7 @@ def charts(request):
 # Показывает персонализированные советы для улучшения обучения
 @login_required
 def recommendations(request):
-    user_stats = get_object_or_404(UserStats, user=request.user)
+    user_stats = UserStats.for_user(request.user)
     
     # Получаем все рекомендации
     all_recommendations = user_stats.get_recommendations()
@@ -191,27 +177,8 @@ def test_history(request):
     if direction:
         test_results = test_results.filter(direction=direction)
     
-    # Статистика по фильтрам
-    total_tests = test_results.count()
-    if total_tests > 0:
-        avg_accuracy = sum(test.accuracy for test in test_results) / total_tests
-    else:
-        avg_accuracy = 0
-    
-    # Группировка по типам тестов
-    test_summary = []
-    for test_type in ['multiple_choice', 'typing', 'matching']:
-        type_results = test_results.filter(test_type=test_type)
-        if type_results.exists():
-            count = type_results.count()
-            avg_accuracy_type = sum(test.accuracy for test in type_results) / count
-            best_score = max(test.score for test in type_results)
-            test_summary.append({
-                'test_type': test_type,
-                'count': count,
-                'avg_accuracy': avg_accuracy_type,
-                'best_score': best_score
-            })
+    # Статистика по фильтрам и по типам тестов — один запрос
+    total_tests, avg_accuracy, test_summary = summarize_tests(test_results)
     
     context = {
         'test_results': test_results,
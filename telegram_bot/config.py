@@ -18,18 +18,64 @@ class Config:
     
     # URL сайта для API запросов
     SITE_URL = os.getenv('SITE_URL', 'http://127.0.0.1:8000')
+    # Как бот выполняет привязку, автовход и отзывы (см. services/site_gateway.py):
+    # 'local' — в своём процессе через сервисы сайта (общая база), 'http' — через API сайта
+    SITE_GATEWAY = os.getenv('SITE_GATEWAY', 'local')
+    SITE_API_TIMEOUT = float(os.getenv('SITE_API_TIMEOUT', 10))  # Таймаут запроса к API сайта, секунд
+    SITE_API_RETRIES = 3  # Повторы при ошибках сети, 429 и 5xx
+    SITE_API_POOL_SIZE = 20  # Одновременных соединений с сайтом
+    SITE_API_BREAKER_THRESHOLD = 5  # После стольких неудачных запросов подряд сайт считается недоступным
+    SITE_API_BREAKER_RESET = 30  # Через сколько секунд снова попробовать обратиться к сайту
+    
+    # Режим получения обновлений: 'polling' — long polling, 'webhook' — вебхук (см. utils/webhook.py)
+    BOT_MODE = os.getenv('BOT_MODE', 'polling')
+    WEBHOOK_BASE_URL = os.getenv('WEBHOOK_BASE_URL')  # Публичный https-адрес бота, например https://bot.example.com
+    WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram/webhook')
+    WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')  # Проверяется в заголовке X-Telegram-Bot-Api-Secret-Token
+    WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+    WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 8080))
+    WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', 16))  # Обработчиков; обновления одного чата идут к одному
+    WEBHOOK_QUEUE_SIZE = 1000  # Необработанных обновлений на воркер
+    WEBHOOK_MAX_CONNECTIONS = 40  # Одновременных запросов от Telegram
+    
+    # Сколько потоков выполняют ORM-запросы бота одновременно (см. utils/db.py)
+    DB_POOL_SIZE = int(os.getenv('BOT_DB_POOL_SIZE', 8))
     
     # Настройки тестов
     TEST_QUESTIONS_COUNT = 5  # Количество вопросов в тесте по умолчанию
+    TEST_MAX_QUESTIONS = 50  # Максимальное количество вопросов (/test N)
+    
+    # Хранилище активных тестов: 'memory' — в памяти процесса,
+    # 'cache' — в кэше Django (общий для нескольких процессов бота)
+    TEST_SESSION_BACKEND = os.getenv('TEST_SESSION_BACKEND', 'memory')
+    TEST_SESSION_TTL = int(os.getenv('TEST_SESSION_TTL', 1800))  # Брошенный тест удаляется через 30 минут
+    TEST_SESSION_MAX = 10000  # Максимум тестов в памяти одного процесса
+    
+    CARDS_PER_PAGE = 10  # Карточек на странице /cards
+    
+    # Очередь исходящих сообщений (см. services/outbox.py)
+    OUTBOX_GLOBAL_RATE = 28  # Сообщений в секунду на бота
+    OUTBOX_CHAT_RATE = 1.0  # Сообщений в секунду в один чат
+    OUTBOX_CHAT_BURST = 3  # Столько сообщений в чат можно отправить подряд без ожидания
+    OUTBOX_WORKERS = 16  # Одновременных запросов к Telegram
+    OUTBOX_METRICS_INTERVAL = 60  # Как часто писать метрики очереди в лог, секунд
     
     # Настройки напоминаний
-    REMINDER_HOUR = 9  # Час для отправки напоминаний (UTC)
-    REMINDER_MINUTE = 0  # Минута для отправки напоминаний
+    REMINDER_HOUR = 9  # Час напоминаний по умолчанию (UTC), если пользователь не выбрал своё время
+    REMINDER_MINUTE = 0  # Минута напоминаний по умолчанию
+    REMINDER_GLOBAL_RATE = 25  # Сообщений в секунду на бота (лимит Telegram — около 30), если бот работает без общей очереди
+    REMINDER_CONCURRENCY = 16  # Сколько сообщений отправляется одновременно
+    REMINDER_BATCH_SIZE = 200  # Сколько пользователей обрабатывается за одно пробуждение планировщика
+    REMINDER_SPREAD_SECONDS = 300  # Напоминания на одно время растягиваются на 5 минут
+    REMINDER_REFRESH_SECONDS = 900  # Как часто перечитывать настройки напоминаний из базы
+    REMINDER_CATCH_UP_HOURS = 6  # Недоставленное напоминание (падение реплики) досылается в течение 6 часов
+    REMINDER_LEASE_TTL = 120  # Аренда рассылки между репликами, секунд
+    REMINDER_LEASE_RETRY = 5  # Через сколько секунд снова пытаться взять занятую аренду
 
     # Сообщения бота
     MESSAGES = {
         "welcome": "👋 Добро пожаловать в LinguaTrack Bot!\n\nИспользуйте меню или команды для изучения слов.",
-        "help": "ℹ️ Доступные команды:\n/today — слова на сегодня\n/progress — статистика\n/cards — все карточки\n/test — пройти тест\n/remind — тест напоминаний\n/feedback — оставить отзыв\n\nДля связи аккаунта используйте /link",
+        "help": "ℹ️ Доступные команды:\n/today — слова на сегодня\n/progress — статистика\n/cards — все карточки\n/test [N] — пройти тест из N вопросов\n/remind — тест напоминаний\n/reminder — время ежедневного напоминания\n/feedback — оставить отзыв\n\nДля связи аккаунта используйте /link",
         "no_reviews_today": "Сегодня нет слов для повторения. Добавьте новые карточки!",
         "not_registered": "❗️ Вы не зарегистрированы. Сначала свяжите аккаунт через /link.",
         "no_cards": "У вас пока нет карточек. Добавьте их на сайте или через бота.",
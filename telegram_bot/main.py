@@ -14,16 +14,29 @@ from utils.django_init import *
 
 from aiogram import Bot, Dispatcher
 from config import Config
+from utils.db import shutdown_db_pool
+from services.http_client import site_client
+from services.outbox import Outbox
 
 # Настраиваем логирование
 logging.basicConfig(level=logging.INFO)
 
 # Создаём экземпляр бота
 bot = Bot(token=Config.BOT_TOKEN)
+# Все сообщения в чаты идут через общую очередь с ограничением частоты
+outbox = Outbox(
+	global_rate=Config.OUTBOX_GLOBAL_RATE,
+	chat_rate=Config.OUTBOX_CHAT_RATE,
+	chat_burst=Config.OUTBOX_CHAT_BURST,
+	workers=Config.OUTBOX_WORKERS,
+	metrics_interval=Config.OUTBOX_METRICS_INTERVAL,
+)
+bot.session.middleware(outbox)
 dp = Dispatcher()
 
 # Импортируем роутеры после создания диспетчера
 from routers import commands, test_handlers, progress_handlers, cards_handlers, tts_handlers, feedback_handlers
+from services.reminder_service import ReminderService
 
 # Регистрируем все роутеры
 dp.include_router(commands.router)
@@ -35,23 +48,68 @@ dp.include_router(feedback_handlers.router)
 
 async def on_shutdown():
 	"""Аккуратная остановка бота"""
+	await outbox.close()
 	try:
 		await bot.session.close()
 	except Exception:
 		pass
+	await site_client.close()
+
+async def run_webhook():
+	"""Приём обновлений через вебхук (Config.BOT_MODE = 'webhook')"""
+	from aiohttp import web
+	from aiogram.webhook.aiohttp_server import setup_application
+	from utils.webhook import ChatOrderedRequestHandler
+
+	app = web.Application()
+	handler = ChatOrderedRequestHandler(
+		dp, bot,
+		workers=Config.WEBHOOK_WORKERS,
+		queue_size=Config.WEBHOOK_QUEUE_SIZE,
+		secret_token=Config.WEBHOOK_SECRET,
+	)
+	handler.register(app, path=Config.WEBHOOK_PATH)
+	setup_application(app, dp, bot=bot)
+
+	runner = web.AppRunner(app)
+	await runner.setup()
+	await web.TCPSite(runner, Config.WEBHOOK_HOST, Config.WEBHOOK_PORT).start()
+	# Вебхук ставится после запуска сервера, чтобы первые обновления не потерялись
+	await bot.set_webhook(
+		f"{Config.WEBHOOK_BASE_URL.rstrip('/')}{Config.WEBHOOK_PATH}",
+		secret_token=Config.WEBHOOK_SECRET,
+		max_connections=Config.WEBHOOK_MAX_CONNECTIONS,
+		allowed_updates=dp.resolve_used_update_types(),
+		drop_pending_updates=True,
+	)
+	try:
+		await asyncio.Event().wait()
+	finally:
+		# Дожидаемся обработки принятых обновлений и закрываем сервер
+		await runner.cleanup()
 
 async def main():
 	"""Запуск бота"""
-	# Удаляем все обновления, накопившиеся за время остановки бота
-	await bot.delete_webhook(drop_pending_updates=True)
-	# Запускаем бота
-	task = asyncio.create_task(dp.start_polling(bot))
+	webhook_mode = Config.BOT_MODE == 'webhook'
+	if not webhook_mode:
+		# Удаляем все обновления, накопившиеся за время остановки бота
+		await bot.delete_webhook(drop_pending_updates=True)
+	# Запускаем планировщик напоминаний и бота
+	reminder_service = ReminderService(bot, outbox=outbox)
+	await reminder_service.start_reminder_scheduler()
+	task = asyncio.create_task(run_webhook() if webhook_mode else dp.start_polling(bot))
+
+	def stop():
+		if webhook_mode:
+			task.cancel()
+		else:
+			asyncio.create_task(on_shutdown())
 
 	# Обработка сигналов для graceful shutdown
 	loop = asyncio.get_running_loop()
 	try:
 		for sig in (signal.SIGINT, signal.SIGTERM):
-			loop.add_signal_handler(sig, lambda s=sig: asyncio.create_task(on_shutdown()))
+			loop.add_signal_handler(sig, stop)
 	except NotImplementedError:
 		# Windows / среда без поддержки сигналов
 		pass
@@ -61,7 +119,9 @@ async def main():
 	except asyncio.CancelledError:
 		pass
 	finally:
+		await reminder_service.stop_reminder_scheduler()
 		await on_shutdown()
+		shutdown_db_pool()
 
 if __name__ == '__main__':
 	asyncio.run(main()) 
\ No newline at end of file
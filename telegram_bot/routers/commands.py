@@ -10,21 +10,22 @@ from utils.django_init import *
 
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from aiogram.exceptions import TelegramBadRequest
 import re
 from django.contrib.auth.models import User
-from asgiref.sync import sync_to_async
+from utils.db import db_async
 
 from config import Config
 from keyboards.main_keyboard import get_main_keyboard, get_cards_navigation_keyboard
 from services.user_service import UserService
-from utils.django_utils import get_user_by_telegram_id, link_telegram_to_existing_user, get_user_telegram_info
+from utils.django_utils import get_user_by_telegram_id, link_telegram_to_existing_user, get_user_telegram_info, update_reminder_preference
+from users import identity
 
 import logging
-from services.http_client import HttpClient
-_client = HttpClient()
+from services.site_gateway import site_gateway
 
 logger = logging.getLogger(__name__)
 
@@ -63,7 +64,7 @@ async def cmd_start(message: Message, state: FSMContext):
         return
     
     # Обычная обработка /start
-    user = await sync_to_async(get_user_by_telegram_id)(telegram_id)
+    user = await db_async(get_user_by_telegram_id)(telegram_id)
     
     # Проверяем, есть ли у пользователя реальный email (а не технический)
     if user and user.email.startswith("telegram_") and user.email.endswith("@linguatrack.local"):
@@ -85,14 +86,7 @@ async def cmd_start(message: Message, state: FSMContext):
 async def handle_link_token(message: Message, token: str, telegram_id: int, telegram_username: str):
     """Обрабатывает токен привязки от сайта"""
     try:
-        data = _client.post_json(
-            f"{Config.SITE_URL}/users/api/v1/telegram-link-callback/",
-            {
-                'token': token,
-                'telegram_id': telegram_id,
-                'telegram_username': telegram_username
-            }
-        )
+        data = await site_gateway.link_telegram(token, telegram_id, telegram_username)
         if data.get('success'):
             username = data.get('username', 'пользователь')
             await message.answer(
@@ -133,7 +127,7 @@ async def cmd_today(message: Message):
     """Обработчик команды /today - слова на повторение сегодня"""
     try:
         # Получаем карточки на сегодня через сервис
-        today_cards = await sync_to_async(UserService.get_today_reviews)(message.from_user.id)
+        today_cards = await db_async(UserService.get_today_reviews)(message.from_user.id)
         
         if not today_cards:
             await message.answer(Config.MESSAGES['no_reviews_today'])
@@ -141,7 +135,7 @@ async def cmd_today(message: Message):
         
         # Форматируем карточки через сервис
         cards_text = "📚 Слова на повторение сегодня:\n\n"
-        cards_text += await sync_to_async(UserService.format_cards_for_display)(today_cards)
+        cards_text += await db_async(UserService.format_cards_for_display)(today_cards)
         cards_text += "\nИспользуйте команду /test для проверки знаний!"
         
         await message.answer(cards_text, parse_mode="HTML")
@@ -155,10 +149,10 @@ async def cmd_progress(message: Message):
     """Обработчик команды /progress - статистика пользователя"""
     try:
         # Получаем статистику через сервис
-        progress = await sync_to_async(UserService.get_user_statistics)(message.from_user.id)
+        progress = await db_async(UserService.get_user_statistics)(message.from_user.id)
         
         # Форматируем статистику через сервис
-        stats_text = await sync_to_async(UserService.format_statistics_for_display)(progress)
+        stats_text = await db_async(UserService.format_statistics_for_display)(progress)
         
         await message.answer(stats_text, parse_mode="HTML")
         
@@ -168,33 +162,18 @@ async def cmd_progress(message: Message):
 
 @router.message(Command("cards"))
 async def cmd_cards(message: Message):
-    """Обработчик команды /cards - список карточек пользователя"""
-    try:
-        # Получаем карточки через сервис
-        cards = await sync_to_async(UserService.get_user_cards)(message.from_user.id)
-        
-        if not cards:
-            await message.answer(Config.MESSAGES['no_cards'])
-            return
-        
-        # Форматируем карточки через сервис
-        cards_text = await sync_to_async(UserService.format_cards_for_display)(cards)
-        
-        await message.answer(cards_text, parse_mode="HTML")
-        
-    except Exception as e:
-        logger.exception("Ошибка в /cards")
-        await message.answer(Config.MESSAGES['not_registered'])
+    """Обработчик команды /cards - список карточек пользователя по страницам"""
+    await show_cards_page(message, message.from_user.id, 1)
 
 @router.message(Command("link"))
 async def cmd_link(message: Message):
     """Обработчик команды /link - информация о привязке аккаунта"""
     telegram_id = message.from_user.id
-    user = await sync_to_async(get_user_by_telegram_id)(telegram_id)
+    user = await db_async(get_user_by_telegram_id)(telegram_id)
     
     if user and not user.email.startswith("telegram_"):
         # Аккаунт уже привязан
-        telegram_info = await sync_to_async(get_user_telegram_info)(user)
+        telegram_info = await db_async(get_user_telegram_info)(user)
         
         link_text = f"✅ Ваш аккаунт привязан к Telegram!\n\n"
         link_text += f"👤 Пользователь: {user.username}\n"
@@ -231,17 +210,14 @@ async def handle_generate_auth_token(callback: CallbackQuery):
 	"""Обработчик генерации токена автовхода"""
 	try:
 		telegram_id = callback.from_user.id
-		user = await sync_to_async(get_user_by_telegram_id)(telegram_id)
+		user = await db_async(get_user_by_telegram_id)(telegram_id)
 		
 		if not user or user.email.startswith("telegram_"):
 			await callback.answer("❌ Аккаунт не привязан к Telegram")
 			return
 		
-		# Генерируем токен автовхода через API сайта
-		data = _client.post_json(
-			f"{Config.SITE_URL}/users/api/v1/generate-auth-token/",
-			{'telegram_id': telegram_id}
-		)
+		# Генерируем токен автовхода (в процессе бота или через API сайта)
+		data = await site_gateway.generate_auth_token(telegram_id)
 		
 		if data.get('success'):
 			auth_url = data.get('auth_url')
@@ -285,12 +261,65 @@ async def cmd_remind(message: Message):
     except Exception as e:
         await message.answer(f"❌ Ошибка: {str(e)}")
 
+REMINDER_TIME_REGEX = r"^([01]?\d|2[0-3]):([0-5]\d)$"
+
+@router.message(Command("reminder"))
+async def cmd_reminder(message: Message, command: CommandObject):
+    """
+    Настройка ежедневного напоминания:
+    /reminder — текущие настройки
+    /reminder 20:30 [Europe/Moscow] [сб,вс] — время, часовой пояс и дни без напоминаний
+    /reminder off | on — выключить или включить
+    """
+    from django.core.exceptions import ValidationError
+    from reminders.models import WEEKDAY_NAMES
+    
+    user = await db_async(get_user_by_telegram_id)(message.from_user.id)
+    if not user:
+        await message.answer(Config.MESSAGES['not_registered'])
+        return
+    args = (command.args or '').split()
+    fields = {}
+    
+    if args and args[0].lower() in ('off', 'on'):
+        fields['enabled'] = args[0].lower() == 'on'
+    elif args:
+        match = re.match(REMINDER_TIME_REGEX, args[0])
+        if not match:
+            await message.answer(
+                "❌ Формат: /reminder 20:30 [Europe/Moscow] [сб,вс]\n"
+                "или /reminder off — выключить напоминания"
+            )
+            return
+        fields.update(enabled=True, hour=int(match.group(1)), minute=int(match.group(2)))
+        for arg in args[1:]:
+            days = arg.lower().split(',')
+            if all(day in WEEKDAY_NAMES for day in days):
+                fields['quiet_days'] = ','.join(str(WEEKDAY_NAMES.index(day)) for day in days)
+            else:
+                fields['timezone'] = arg
+    
+    try:
+        preference = await db_async(update_reminder_preference)(user, **fields)
+    except ValidationError as e:
+        await message.answer(f"❌ {'; '.join(e.messages)}")
+        return
+    
+    if not preference.enabled:
+        await message.answer("🔕 Напоминания выключены. Включить: /reminder on")
+        return
+    quiet = ', '.join(WEEKDAY_NAMES[day] for day in sorted(preference.quiet_weekdays)) or 'нет'
+    await message.answer(
+        f"🔔 Напоминание каждый день в {preference.hour:02d}:{preference.minute:02d} ({preference.timezone})\n"
+        f"Дни без напоминаний: {quiet}"
+    )
+
 @router.callback_query(F.data.startswith("cards_page:"))
 async def callback_cards_page(callback: CallbackQuery):
-    """Обработчик навигации по карточкам"""
+    """Обработчик навигации по карточкам: страница меняется в том же сообщении"""
     page = int(callback.data.split(":")[1])
-    await show_cards_page(callback.message, page)
     await callback.answer()
+    await show_cards_page(callback.message, callback.from_user.id, page, edit=True)
 
 @router.callback_query(F.data == "cards_close")
 async def callback_cards_close(callback: CallbackQuery):
@@ -298,11 +327,11 @@ async def callback_cards_close(callback: CallbackQuery):
     await callback.message.delete()
     await callback.answer()
 
-async def show_cards_page(message: Message, page: int):
-    """Показывает страницу с карточками"""
+async def show_cards_page(message: Message, telegram_id: int, page: int, edit: bool = False):
+    """Показывает страницу с карточками; edit — заменить текст сообщения со списком"""
     try:
         # Получаем карточки через сервис
-        cards_data = await sync_to_async(UserService.get_user_cards_paginated)(message.from_user.id, page, Config.CARDS_PER_PAGE)
+        cards_data = await db_async(UserService.get_user_cards_paginated)(telegram_id, page, Config.CARDS_PER_PAGE)
         
         if not cards_data['cards']:
             await message.answer(Config.MESSAGES['no_cards'])
@@ -310,14 +339,24 @@ async def show_cards_page(message: Message, page: int):
         
         # Формируем сообщение
         cards_text = f"🗂 Ваши карточки (страница {page}/{cards_data['total_pages']}):\n\n"
-        cards_text += await sync_to_async(UserService.format_cards_for_display)(cards_data['cards'])
+        cards_text += UserService.format_cards_for_display(cards_data['cards'])
         
         # Создаём клавиатуру для навигации
         keyboard = get_cards_navigation_keyboard(page, cards_data['total_pages'])
         
-        await message.answer(cards_text, parse_mode="HTML", reply_markup=keyboard)
+        # Быстрое листание даёт несколько правок подряд — очередь отправки
+        # (services/outbox.py) сливает их и отправляет только последнюю
+        if edit:
+            await message.edit_text(cards_text, parse_mode="HTML", reply_markup=keyboard)
+        else:
+            await message.answer(cards_text, parse_mode="HTML", reply_markup=keyboard)
         
+    except TelegramBadRequest as e:
+        # Та же страница, что уже показана (слитые правки вернулись к исходной)
+        if 'message is not modified' not in str(e):
+            logger.exception("Ошибка при показе карточек")
     except Exception as e:
+        logger.exception("Ошибка при показе карточек")
         await message.answer(Config.MESSAGES['not_registered'])
 
 # Обработчики кнопок клавиатуры (используют те же функции)
@@ -353,7 +392,7 @@ async def link_username(message: Message):
         telegram_username = message.from_user.username
         
         # Связываем аккаунты
-        user = await sync_to_async(link_telegram_to_existing_user)(telegram_id, telegram_username, username)
+        user = await db_async(link_telegram_to_existing_user)(telegram_id, telegram_username, username)
         
         await message.answer(
             f"✅ Аккаунт успешно связан!\n\n"
@@ -389,15 +428,17 @@ async def process_email(message: Message, state: FSMContext):
         return
 
     # Проверка уникальности email
-    email_exists = await sync_to_async(User.objects.filter(email=email).exists)()
+    email_exists = await db_async(User.objects.filter(email=email).exists)()
     if email_exists:
         await message.answer("❌ Этот email уже используется. Попробуйте другой:")
         return
 
     # Получаем пользователя по telegram_id
-    user = await sync_to_async(get_user_by_telegram_id)(message.from_user.id)
+    user = await db_async(get_user_by_telegram_id)(message.from_user.id)
     user.email = email
-    await sync_to_async(user.save)()
+    await db_async(user.save)()
+    # В кэше пользователя хранится email — сбрасываем его
+    await db_async(identity.invalidate)(message.from_user.id)
 
     await message.answer(
         "✅ Email успешно привязан к вашему аккаунту!\n\n"
@@ -11,7 +11,7 @@ from aiogram.fsm.state import State, StatesGroup
 from config import Config
 from services.feedback_service import FeedbackService
 from services.user_service import UserService
-from asgiref.sync import sync_to_async
+from utils.db import db_async
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,7 +27,7 @@ async def cmd_feedback(message: Message, state: FSMContext):
     """Обработчик команды /feedback - оставить отзыв"""
     try:
         # Проверяем, что пользователь существует
-        await sync_to_async(UserService.get_or_create_user)(message.from_user.id)
+        await db_async(UserService.get_or_create_user)(message.from_user.id)
         
         await message.answer(
             "💬 Оставить отзыв\n\n"
@@ -5,10 +5,10 @@
 import asyncio
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from asgiref.sync import sync_to_async
+from utils.db import db_async
 import logging
 
 logger = logging.getLogger(__name__)
@@ -26,14 +26,19 @@ class TestStates(StatesGroup):
     answering_question = State()
 
 @router.message(Command("test"))
-async def cmd_test(message: Message, state: FSMContext):
-    """Обработчик команды /test - начало теста"""
+async def cmd_test(message: Message, state: FSMContext, command: CommandObject = None):
+    """Обработчик команды /test [N] - начало теста из N вопросов"""
     try:
         # Гарантируем, что пользователь существует (создаём при необходимости)
-        await sync_to_async(UserService.get_or_create_user)(message.from_user.id)
+        await db_async(UserService.get_or_create_user)(message.from_user.id)
+        
+        # Длина теста: /test 10; без аргумента — Config.TEST_QUESTIONS_COUNT
+        questions_count = None
+        if command and command.args and command.args.strip().isdigit():
+            questions_count = int(command.args.strip())
         
         # Создаём тест через сервис (внутри используются ORM-вызовы)
-        test_data = await sync_to_async(TestService.create_test)(message.from_user.id)
+        test_data = await db_async(TestService.create_test)(message.from_user.id, questions_count)
         
         if not test_data:
             await message.answer(Config.MESSAGES['no_cards'])
@@ -62,7 +67,7 @@ async def callback_test_start(callback: CallbackQuery, state: FSMContext):
     """Обработчик начала теста"""
     user_id = callback.from_user.id
     
-    if not await sync_to_async(TestService.get_test)(user_id):
+    if not await db_async(TestService.get_test)(user_id):
         await callback.answer("Тест не найден. Начните заново с /test")
         return
     
@@ -76,7 +81,7 @@ async def callback_test_cancel(callback: CallbackQuery, state: FSMContext):
     """Обработчик отмены теста"""
     user_id = callback.from_user.id
     
-    await sync_to_async(TestService.remove_test)(user_id)
+    await db_async(TestService.remove_test)(user_id)
     
     await callback.message.edit_text("❌ Тест отменён")
     await state.clear()
@@ -88,8 +93,8 @@ async def callback_test_answer(callback: CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
     user_answer = callback.data.split(":", 1)[1]
     
-    # Обрабатываем ответ через сервис (без ORM, в памяти)
-    result = await sync_to_async(TestService.process_answer)(user_id, user_answer)
+    # Обрабатываем ответ через сервис (без ORM, только хранилище сессий)
+    result = await db_async(TestService.process_answer)(user_id, user_answer)
     
     if not result:
         await callback.answer("Тест не найден")
@@ -116,15 +121,15 @@ async def callback_test_answer(callback: CallbackQuery, state: FSMContext):
 
 async def ask_question(message: Message, user_id: int):
     """Задаёт вопрос теста"""
-    # Получаем текущий вопрос через сервис (есть обращения к ORM)
-    question_data = await sync_to_async(TestService.get_current_question)(user_id)
+    # Получаем текущий вопрос через сервис (без обращений к ORM)
+    question_data = await db_async(TestService.get_current_question)(user_id)
     
     if not question_data:
         return
     
     # Формируем вопрос
     question_text = f"📝 Вопрос {question_data['question_number']}/{question_data['total_questions']}\n\n"
-    question_text += f"Как переводится слово <b>{question_data['card'].word}</b>?"
+    question_text += f"Как переводится слово <b>{question_data['word']}</b>?"
     
     # Создаём клавиатуру с вариантами ответов
     keyboard = get_test_answer_keyboard(question_data['answers'], question_data['correct_answer'])
@@ -134,7 +139,7 @@ async def ask_question(message: Message, user_id: int):
 async def finish_test(message: Message, user_id: int):
     """Завершает тест и показывает результаты"""
     # Завершаем тест через сервис (сохраняет результат в БД)
-    results = await sync_to_async(TestService.finish_test)(user_id)
+    results = await db_async(TestService.finish_test)(user_id)
     
     if not results:
         await message.answer("❌ Ошибка при завершении теста")
@@ -0,0 +1,129 @@
+"""
+Массовая отправка сообщений с учётом ограничений Telegram
+
+Telegram допускает около 30 сообщений в секунду на бота и примерно одно
+сообщение в секунду в один чат; при превышении отвечает 429 с retry_after.
+RateLimitedSender отправляет сообщения параллельно, но не быстрее этих
+ограничений, а на 429 ждёт указанное время и повторяет отправку.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest, TelegramNetworkError
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Ограничитель частоты: не больше rate событий в секунду, всплеск до capacity"""
+
+    def __init__(self, rate: float, capacity: float = None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """Берёт разрешение, если оно есть, и возвращает 0; иначе — сколько секунд ждать"""
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    async def acquire(self):
+        async with self._lock:
+            while (wait := self.try_acquire()) > 0:
+                await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """
+        Не выдавать разрешений ближайшие seconds секунд (после 429).
+        Паузы не складываются: одновременные 429 от запросов, отправленных
+        вместе, останавливают выдачу на самый долгий retry_after, а не на сумму
+        """
+        self._refill()
+        self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+class RateLimitedSender:
+    """
+    Параллельная отправка сообщений с общим и початовым ограничением частоты.
+    Если бот отправляет через общую очередь (services/outbox.py), которая сама
+    ограничивает частоту и повторяет после 429, передайте global_rate=None,
+    chat_interval=0 и max_retries=0: тогда остаются только параллельность
+    и учёт доставленных
+    """
+
+    def __init__(self, bot, global_rate: Optional[float] = 25, chat_interval: float = 1.0,
+                 concurrency: int = 16, max_retries: int = 3):
+        self.bot = bot
+        self.bucket = TokenBucket(global_rate) if global_rate else None
+        self.chat_interval = chat_interval
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self._chat_next: Dict[int, float] = {}
+
+    async def _wait_for_chat(self, chat_id: int):
+        # Следующее сообщение в тот же чат — не раньше чем через chat_interval
+        now = time.monotonic()
+        ready_at = max(now, self._chat_next.get(chat_id, 0))
+        self._chat_next[chat_id] = ready_at + self.chat_interval
+        if ready_at > now:
+            await asyncio.sleep(ready_at - now)
+
+    async def send(self, chat_id: int, text: str, **kwargs) -> bool:
+        """Отправляет сообщение; True — доставлено, False — отказ или исчерпаны попытки"""
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_chat(chat_id)
+            if self.bucket is not None:
+                await self.bucket.acquire()
+            try:
+                await self.bot.send_message(chat_id, text, **kwargs)
+                return True
+            except TelegramRetryAfter as e:
+                if attempt == self.max_retries:
+                    break
+                # Превышен лимит: Telegram сообщает, сколько ждать; притормаживаем всю отправку
+                logger.warning(f"429 для чата {chat_id}, ждём {e.retry_after} с")
+                if self.bucket is not None:
+                    self.bucket.pause(e.retry_after)
+                await asyncio.sleep(e.retry_after)
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                # Бот заблокирован или чат не существует — повтор не поможет
+                logger.info(f"Сообщение в чат {chat_id} не доставлено: {e}")
+                return False
+            except TelegramNetworkError as e:
+                logger.warning(f"Сетевая ошибка при отправке в чат {chat_id}: {e}")
+                if attempt < self.max_retries:
+                    await asyncio.sleep(2 ** attempt)
+        logger.error(f"Не удалось отправить сообщение в чат {chat_id} после {self.max_retries + 1} попыток")
+        return False
+
+    async def send_many(self, messages: Iterable[Tuple[int, str]], on_delivered=None) -> Dict[str, int]:
+        """
+        Отправляет пары (chat_id, text); возвращает счётчики sent и failed.
+        on_delivered — корутина-функция, вызывается с chat_id сразу после каждой доставки
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        counters = {'sent': 0, 'failed': 0}
+
+        async def deliver(chat_id, text):
+            async with semaphore:
+                delivered = await self.send(chat_id, text)
+            counters['sent' if delivered else 'failed'] += 1
+            if delivered and on_delivered is not None:
+                await on_delivered(chat_id)
+
+        await asyncio.gather(*(deliver(chat_id, text) for chat_id, text in messages))
+        return counters
@@ -2,8 +2,7 @@
 Сервис для работы с отзывами в Telegram боте
 """
 
-import requests
-from config import Config
+from services.site_gateway import site_gateway
 
 class FeedbackService:
     """Сервис для отправки отзывов"""
@@ -20,25 +19,4 @@ class FeedbackService:
         Returns:
             dict: Результат отправки
         """
-        try:
-            response = requests.post(
-                f"{Config.SITE_URL}/feedback/api/telegram/",
-                json={
-                    'text': text,
-                    'telegram_id': telegram_id
-                },
-                timeout=10
-            )
-            
-            return response.json()
-            
-        except requests.RequestException as e:
-            return {
-                'success': False,
-                'error': f'Ошибка соединения: {str(e)}'
-            }
-        except Exception as e:
-            return {
-                'success': False,
-                'error': f'Неизвестная ошибка: {str(e)}'
-            } 
\ No newline at end of file
+        return await site_gateway.send_feedback(text, telegram_id)
@@ -1,36 +1,159 @@
-import time
+"""
+Асинхронный HTTP клиент бота для API сайта
+
+Запросы выполняются через общий aiohttp.ClientSession с пулом соединений,
+поэтому медленный ответ сайта не останавливает цикл событий: остальные
+чаты обслуживаются, пока запрос ждёт ответа. Ошибки сети, таймауты и
+ответы 429/5xx повторяются с экспоненциальной задержкой (неидемпотентные
+запросы — только если сайт их точно не выполнил), а после серии
+неудачных запросов предохранитель (CircuitBreaker) на время перестаёт
+обращаться к сайту и сразу возвращает ошибку.
+"""
+
+import asyncio
 import logging
+import time
 from typing import Optional, Dict, Any
 
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import aiohttp
+
+from config import Config
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_TIMEOUT = 10
+# Дольше обработчик не ждёт, даже если сайт просит в Retry-After
+MAX_RETRY_AFTER = 5
+
+
+class CircuitBreaker:
+    """
+    Предохранитель: после failure_threshold неудач подряд запросы не выполняются
+    reset_timeout секунд, затем пропускается один пробный запрос
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """Можно ли выполнить запрос сейчас"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self._failures += 1
+        self._probe_in_flight = False
+        if self._opened_at is not None or self._failures >= self.failure_threshold:
+            # Неудачный пробный запрос снова размыкает цепь на reset_timeout
+            self._opened_at = self._clock()
+
 
 class HttpClient:
-    """HTTP клиент с ретраями"""
-
-    def __init__(self, retries: int = 3, backoff_factor: float = 0.5, status_forcelist: Optional[list] = None):
-        self.session = requests.Session()
-        retry = Retry(
-            total=retries,
-            backoff_factor=backoff_factor,
-            status_forcelist=status_forcelist or [429, 500, 502, 503, 504],
-            allowed_methods=["GET", "POST"],
-            raise_on_status=False,
-        )
-        adapter = HTTPAdapter(max_retries=retry)
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
-
-    def post_json(self, url: str, payload: Dict[str, Any], timeout: int = DEFAULT_TIMEOUT) -> Dict[str, Any]:
-        try:
-            resp = self.session.post(url, json=payload, timeout=timeout)
-            resp.raise_for_status()
-            return resp.json()
-        except requests.RequestException as e:
-            logger.error(f"HTTP POST failed: {url} - {e}")
-            return {"success": False, "error": str(e)} 
\ No newline at end of file
+    """HTTP клиент с пулом соединений, ретраями и предохранителем"""
+
+    def __init__(self, retries: int = 3, backoff_factor: float = 0.5, status_forcelist: Optional[list] = None,
+                 timeout: float = DEFAULT_TIMEOUT, pool_size: int = 20, breaker: Optional[CircuitBreaker] = None,
+                 max_retry_after: float = MAX_RETRY_AFTER):
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.status_forcelist = set(status_forcelist or [429, 500, 502, 503, 504])
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retry_after = max_retry_after
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Сессия создаётся при первом запросе: ей нужен запущенный цикл событий
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.pool_size))
+        return self._session
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_retry_after)
+        return self.backoff_factor * (2 ** attempt)
+
+    async def post_json(self, url: str, payload: Dict[str, Any], timeout: Optional[float] = None,
+                        idempotent: bool = True) -> Dict[str, Any]:
+        """
+        POST с JSON-телом. Возвращает JSON ответа; при ошибке —
+        {"success": False, "error": ...}, как и ответы API сайта.
+        idempotent=False — повтор только если запрос точно не выполнен
+        (не удалось соединиться или ответ 429): после таймаута или 5xx сайт
+        мог успеть выполнить его, и повтор создал бы дубликат
+        """
+        if not self.breaker.allow():
+            logger.warning(f"HTTP POST пропущен, сайт недоступен: {url}")
+            return {"success": False, "error": "Сервис временно недоступен, попробуйте позже"}
+
+        client_timeout = aiohttp.ClientTimeout(total=timeout or self.timeout)
+        error = None
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            retriable = True
+            try:
+                async with self._get_session().post(url, json=payload, timeout=client_timeout) as resp:
+                    if resp.status in self.status_forcelist:
+                        retry_after = resp.headers.get('Retry-After')
+                        error = f"{resp.status} {resp.reason}"
+                        retriable = idempotent or resp.status == 429
+                    else:
+                        self.breaker.record_success()
+                        try:
+                            # Ответы 4xx API сайта тоже JSON с полем error
+                            return await resp.json(content_type=None)
+                        except ValueError:
+                            if resp.status >= 400:
+                                return {"success": False, "error": f"{resp.status} {resp.reason}"}
+                            return {"success": False, "error": "Некорректный ответ сервера"}
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = str(e) or type(e).__name__
+                retriable = idempotent or isinstance(e, aiohttp.ClientConnectorError)
+            if not retriable:
+                break
+            if attempt < self.retries:
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+
+        self.breaker.record_failure()
+        logger.error(f"HTTP POST failed: {url} - {error}")
+        return {"success": False, "error": error}
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+# Общий клиент API сайта для всех обработчиков бота
+site_client = HttpClient(
+    retries=Config.SITE_API_RETRIES,
+    timeout=Config.SITE_API_TIMEOUT,
+    pool_size=Config.SITE_API_POOL_SIZE,
+    breaker=CircuitBreaker(Config.SITE_API_BREAKER_THRESHOLD, Config.SITE_API_BREAKER_RESET),
+)
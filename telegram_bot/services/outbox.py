@@ -0,0 +1,246 @@
+"""
+Общая очередь исходящих сообщений бота
+
+Outbox подключается к сессии бота как request middleware
+(bot.session.middleware(outbox)), поэтому через неё проходят все вызовы
+message.answer, bot.send_message, edit_text и т. п. без изменений в
+обработчиках. Запросы, адресованные чату (с chat_id), ставятся в очередь
+этого чата и отправляются по порядку:
+
+    * не быстрее chat_rate сообщений в секунду в один чат (с всплеском до chat_burst)
+      и global_rate сообщений в секунду на весь бот;
+    * на 429 Telegram отправка в этот чат приостанавливается на retry_after и запрос
+      повторяется; остальные чаты не ждут;
+    * правки одного сообщения, ещё не ушедшие в Telegram и идущие подряд в очереди
+      чата, сливаются в одну — при быстром листании карточек отправляется только
+      последняя страница.
+
+Остальные методы (answerCallbackQuery, getMe, ...) идут напрямую.
+Рассылка напоминаний тоже идёт через очередь и своего ограничения частоты
+не добавляет (ReminderService с параметром outbox).
+Метрики — глубина очереди, время от постановки в очередь до ответа Telegram,
+число повторов и слитых правок — доступны в outbox.metrics.snapshot()
+и периодически пишутся в лог.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import EditMessageCaption, EditMessageReplyMarkup, EditMessageText
+
+from lingua_track.cache import LRUTTLCache
+from services.delivery import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Правки, которые можно сливать: из нескольких ожидающих отправляется последняя
+COALESCED_METHODS = (EditMessageText, EditMessageReplyMarkup, EditMessageCaption)
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class OutboxMetrics:
+    """Счётчики очереди и задержки отправки по последним window запросам"""
+
+    def __init__(self, window: int = 1000):
+        self.depth = 0
+        self.max_depth = 0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.coalesced = 0
+        self._latencies: Deque[float] = deque(maxlen=window)
+
+    def enqueued(self):
+        self.depth += 1
+        self.max_depth = max(self.max_depth, self.depth)
+
+    def finished(self, latency: float, ok: bool):
+        self.depth -= 1
+        self._latencies.append(latency)
+        if ok:
+            self.sent += 1
+        else:
+            self.failed += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        latencies = list(self._latencies)
+        return {
+            'depth': self.depth,
+            'max_depth': self.max_depth,
+            'sent': self.sent,
+            'failed': self.failed,
+            'retried': self.retried,
+            'coalesced': self.coalesced,
+            'latency_p50_ms': round(_percentile(latencies, 50) * 1000, 1),
+            'latency_p95_ms': round(_percentile(latencies, 95) * 1000, 1),
+            'latency_max_ms': round(max(latencies, default=0.0) * 1000, 1),
+        }
+
+
+class _Job:
+    __slots__ = ('bot', 'method', 'make_request', 'waiters', 'enqueued_at', 'edit_key', 'attempts')
+
+    def __init__(self, bot, method, make_request, edit_key):
+        self.bot = bot
+        self.method = method
+        self.make_request = make_request
+        self.waiters: List[asyncio.Future] = []
+        self.enqueued_at = time.monotonic()
+        self.edit_key = edit_key
+        self.attempts = 0
+
+
+class Outbox(BaseRequestMiddleware):
+    """Очередь исходящих запросов с ограничением частоты, слиянием правок и повтором после 429"""
+
+    def __init__(self, global_rate: float = 28, chat_rate: float = 1.0, chat_burst: int = 3,
+                 workers: int = 16, max_retries: int = 3, metrics_interval: Optional[float] = 60):
+        self.bucket = TokenBucket(global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.workers = workers
+        self.max_retries = max_retries
+        self.metrics_interval = metrics_interval
+        self.metrics = OutboxMetrics()
+        # Ограничители чатов; чат без сообщений дольше минуты забывается (его ведро и так полное)
+        self._chat_buckets = LRUTTLCache(max_size=100000, ttl=60)
+        # Очереди чатов с неотправленными запросами; чат стоит в _ready не больше одного раза
+        self._pending: Dict[int, Deque[_Job]] = {}
+        self._edits: Dict[tuple, _Job] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def __call__(self, make_request, bot, method):
+        chat_id = getattr(method, 'chat_id', None)
+        if chat_id is None:
+            return await make_request(bot, method)
+
+        self._start()
+        waiter = asyncio.get_running_loop().create_future()
+        edit_key = self._edit_key(method)
+        job = self._edits.get(edit_key) if edit_key else None
+        queue = self._pending.get(chat_id)
+        if job is not None and queue and queue[-1] is job:
+            # Предыдущая правка этого сообщения ещё ждёт отправки и стоит последней
+            # в очереди чата — заменяем её новой. Если после неё уже есть другие
+            # запросы, новая правка встаёт в конец, чтобы не обогнать их
+            job.bot, job.method, job.make_request = bot, method, make_request
+            self.metrics.coalesced += 1
+        else:
+            job = _Job(bot, method, make_request, edit_key)
+            if edit_key:
+                self._edits[edit_key] = job
+            if queue is None:
+                queue = self._pending[chat_id] = deque()
+                self._ready.put_nowait(chat_id)
+            queue.append(job)
+            self.metrics.enqueued()
+        job.waiters.append(waiter)
+        return await waiter
+
+    @staticmethod
+    def _edit_key(method) -> Optional[tuple]:
+        if isinstance(method, COALESCED_METHODS) and method.message_id is not None:
+            return type(method).__name__, method.chat_id, method.message_id
+        return None
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, capacity=self.chat_burst)
+        # Обращение продлевает жизнь ведра, пока чат активен
+        self._chat_buckets.set(chat_id, bucket)
+        return bucket
+
+    def _start(self):
+        if self._tasks:
+            return
+        self._ready = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if self.metrics_interval:
+            self._tasks.append(asyncio.create_task(self._report()))
+
+    def _schedule(self, chat_id, delay: float):
+        asyncio.get_running_loop().call_later(delay, self._ready.put_nowait, chat_id)
+
+    async def _worker(self):
+        while True:
+            chat_id = await self._ready.get()
+            queue = self._pending[chat_id]
+            # Лимит чата не занимает воркер: чат вернётся в очередь, когда появится разрешение
+            wait = self._chat_bucket(chat_id).try_acquire()
+            if wait > 0:
+                self._schedule(chat_id, wait)
+                continue
+            await self.bucket.acquire()
+
+            job = queue.popleft()
+            if self._edits.get(job.edit_key) is job:
+                # Отправку уже не изменить: следующие правки встанут в очередь за ней
+                del self._edits[job.edit_key]
+            retry_after = await self._execute(job)
+            if retry_after is not None:
+                queue.appendleft(job)
+                self._schedule(chat_id, retry_after)
+            elif queue:
+                self._ready.put_nowait(chat_id)
+            else:
+                del self._pending[chat_id]
+
+    async def _execute(self, job: _Job) -> Optional[float]:
+        """Отправляет запрос; возвращает retry_after, если его нужно повторить"""
+        try:
+            result = await job.make_request(job.bot, job.method)
+        except TelegramRetryAfter as e:
+            self.metrics.retried += 1
+            if job.attempts < self.max_retries:
+                job.attempts += 1
+                logger.warning(f"429 для чата {job.method.chat_id}, ждём {e.retry_after} с")
+                self._chat_bucket(job.method.chat_id).pause(e.retry_after)
+                return e.retry_after
+            self._finish(job, exception=e)
+        except Exception as e:
+            self._finish(job, exception=e)
+        else:
+            self._finish(job, result=result)
+        return None
+
+    def _finish(self, job: _Job, result=None, exception=None):
+        self.metrics.finished(time.monotonic() - job.enqueued_at, ok=exception is None)
+        for waiter in job.waiters:
+            if waiter.done():
+                continue  # обработчик, ждавший ответа, уже отменён
+            if exception is None:
+                waiter.set_result(result)
+            else:
+                waiter.set_exception(exception)
+
+    async def _report(self):
+        reported = None
+        while True:
+            await asyncio.sleep(self.metrics_interval)
+            snapshot = self.metrics.snapshot()
+            if snapshot != reported:
+                logger.info(f"Очередь отправки: {snapshot}")
+                reported = snapshot
+
+    async def close(self, timeout: float = 10):
+        """Дожидается отправки очереди (не дольше timeout секунд) и останавливает воркеры"""
+        deadline = time.monotonic() + timeout
+        while self._pending and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
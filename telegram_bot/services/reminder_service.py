@@ -3,20 +3,52 @@
 """
 
 import asyncio
-from datetime import datetime, time
+import heapq
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
 from typing import List
-from utils.django_utils import get_today_cards
-from django.contrib.auth.models import User
+from utils.django_utils import (
+    get_today_cards, get_due_reminders, get_reminder_schedule,
+    get_reminder_deliveries, record_reminder_delivery, record_reminder_deliveries,
+    prune_reminder_deliveries,
+)
+from utils.db import db_async
+from services.delivery import RateLimitedSender
+from reminders.models import ReminderLease, next_fire_time, parse_quiet_days, zone
+from config import Config
 import logging
 
 logger = logging.getLogger(__name__)
 
 class ReminderService:
-    """Сервис для отправки напоминаний"""
+    """
+    Сервис для отправки напоминаний.
     
-    def __init__(self, bot):
+    Планировщик держит в куче ближайшее время напоминания каждого пользователя
+    (по его часовому поясу, времени и тихим дням), спит до самого раннего и
+    отправляет напоминания небольшими пачками. Куча строится одним запросом
+    при старте и периодически перестраивается, чтобы учесть новые настройки.
+    
+    Несколько реплик бота: пачку рассылает только владелец аренды ReminderLease,
+    а каждое доставленное напоминание записывается в ReminderDelivery. Поэтому
+    пользователь не получает напоминание дважды, а после падения реплики
+    неотправленные напоминания дня досылаются при следующей перестройке кучи.
+    """
+    
+    LEASE_NAME = 'reminders'
+    
+    def __init__(self, bot, outbox=None):
         self.bot = bot
+        # Общая очередь исходящих сообщений бота (services/outbox.py), если бот отправляет через неё
+        self.outbox = outbox
         self.reminder_task = None
+        # Элементы кучи: (время в UTC, user_id, telegram_id, часовой пояс, час, минута, тихие дни)
+        self._queue = []
+        self._rebuild_at = None
+        # Имя владельца аренды: уникально для каждого экземпляра планировщика
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
     
     async def start_reminder_scheduler(self):
         """Запускает планировщик напоминаний"""
@@ -28,21 +60,22 @@ class ReminderService:
             self.reminder_task.cancel()
     
     async def _reminder_loop(self):
-        """Основной цикл отправки напоминаний"""
+        """Основной цикл: спим до ближайшего напоминания и отправляем пачку"""
         while True:
             try:
-                # Ждём до следующего часа
-                now = datetime.now()
-                next_hour = now.replace(minute=0, second=0, microsecond=0)
-                if next_hour <= now:
-                    next_hour = next_hour.replace(hour=next_hour.hour + 1)
+                now = datetime.now(dt_timezone.utc)
+                # Перестраиваем кучу, только когда нет наступивших напоминаний,
+                # иначе ещё не отправленные могли бы выпасть
+                rebuild_due = self._rebuild_at is None or now >= self._rebuild_at
+                if rebuild_due and not (self._queue and self._queue[0][0] <= now):
+                    await self._rebuild_queue(now)
                 
-                wait_seconds = (next_hour - now).total_seconds()
-                await asyncio.sleep(wait_seconds)
+                batch = self._pop_due(now, Config.REMINDER_BATCH_SIZE)
+                if batch:
+                    await self._send_batch(batch)
+                    continue
                 
-                # Проверяем, пора ли отправлять напоминания
-                if now.hour == 10:  # Напоминания в 10:00
-                    await self._send_daily_reminders()
+                await asyncio.sleep(self._seconds_until_next(now))
                     
             except asyncio.CancelledError:
                 break
@@ -50,55 +83,189 @@ class ReminderService:
                 logger.error(f"Ошибка в планировщике напоминаний: {e}")
                 await asyncio.sleep(60)  # Ждём минуту перед повтором
     
-    async def _send_daily_reminders(self):
-        """Отправляет ежедневные напоминания всем пользователям"""
+    @staticmethod
+    def _offset_seconds(user_id: int) -> int:
+        # Постоянный для пользователя сдвиг внутри окна: у кого одинаковое время,
+        # получают напоминания не в одну секунду
+        return (user_id * 7919) % Config.REMINDER_SPREAD_SECONDS
+    
+    def _entry(self, after: datetime, row: tuple):
+        """Элемент кучи для строки настроек (user_id, telegram_id, пояс, час, минута, тихие дни)"""
+        user_id, _, tz, hour, minute, quiet_days = row
+        fire_at = next_fire_time(after, tz, hour, minute, parse_quiet_days(quiet_days), self._offset_seconds(user_id))
+        return None if fire_at is None else (fire_at,) + tuple(row)
+    
+    @staticmethod
+    def _local_date(entry: tuple):
+        """Местная дата напоминания: по ней ведётся журнал доставки"""
+        fire_at, _, _, tz, *_ = entry
+        return fire_at.astimezone(zone(tz)).date()
+    
+    async def _rebuild_queue(self, now: datetime):
+        """
+        Строит кучу заново по настройкам из базы (один запрос).
+        Напоминания, время которых прошло не более REMINDER_CATCH_UP_HOURS назад,
+        а записи о доставке нет (реплика упала посреди рассылки), ставятся сразу
+        """
+        rows = await db_async(get_reminder_schedule)(Config.REMINDER_HOUR, Config.REMINDER_MINUTE)
+        delivered = await db_async(get_reminder_deliveries)((now - timedelta(days=2)).date())
+        catch_up_from = now - timedelta(hours=Config.REMINDER_CATCH_UP_HOURS)
+        
+        queue = []
+        for row in rows:
+            entry = self._entry(catch_up_from, row)
+            if entry is not None and (entry[0] > now or (row[0], self._local_date(entry)) in delivered):
+                entry = self._entry(now, row)
+            if entry is not None:
+                queue.append(entry)
+        heapq.heapify(queue)
+        self._queue = queue
+        self._rebuild_at = now + timedelta(seconds=Config.REMINDER_REFRESH_SECONDS)
+        await db_async(prune_reminder_deliveries)((now - timedelta(days=7)).date())
+        logger.info(f"Очередь напоминаний перестроена: {len(self._queue)} пользователей")
+    
+    def _pop_due(self, now: datetime, limit: int) -> list:
+        """Забирает из кучи до limit напоминаний, время которых наступило"""
+        batch = []
+        while self._queue and self._queue[0][0] <= now and len(batch) < limit:
+            batch.append(heapq.heappop(self._queue))
+        return batch
+    
+    def _seconds_until_next(self, now: datetime) -> float:
+        wake_at = self._rebuild_at
+        if self._queue and self._queue[0][0] < wake_at:
+            wake_at = self._queue[0][0]
+        return max(0.0, (wake_at - now).total_seconds())
+    
+    async def _send_batch(self, batch: list):
+        """Отправляет напоминания пачке пользователей и ставит им следующее время"""
         try:
-            from asgiref.sync import sync_to_async
-            
-            # Получаем всех пользователей с Telegram ID
-            users = await sync_to_async(list)(User.objects.filter(username__startswith='telegram_'))
-            
-            for user in users:
-                try:
-                    # Извлекаем Telegram ID из username
-                    telegram_id = int(user.username.replace('telegram_', ''))
-                    
-                    # Проверяем, есть ли слова на повторение
-                    today_cards = await sync_to_async(get_today_cards)(user)
-                    
-                    if today_cards:
-                        # Отправляем напоминание
-                        await self._send_reminder(telegram_id, today_cards)
-                    
-                except (ValueError, Exception) as e:
-                    logger.error(f"Ошибка при отправке напоминания пользователю {user.username}: {e}")
-                    continue
-                    
+            # Пока пачку рассылает другая реплика, ждём: после неё здесь останутся
+            # только недоставленные (например, если та реплика упала)
+            while not await db_async(ReminderLease.acquire)(self.LEASE_NAME, self.owner, Config.REMINDER_LEASE_TTL):
+                await asyncio.sleep(Config.REMINDER_LEASE_RETRY)
+            try:
+                await self._deliver_under_lease(batch)
+            finally:
+                await db_async(ReminderLease.release)(self.LEASE_NAME, self.owner)
         except Exception as e:
-            logger.error(f"Ошибка при отправке ежедневных напоминаний: {e}")
+            logger.error(f"Ошибка при отправке напоминаний: {e}")
+        finally:
+            # Следующее напоминание — после только что отправленного
+            for fire_at, *row in batch:
+                entry = self._entry(fire_at, tuple(row))
+                if entry is not None:
+                    heapq.heappush(self._queue, entry)
+    
+    async def _deliver_under_lease(self, batch: list):
+        """
+        Рассылка пачки, пока аренда продлевается каждые REMINDER_LEASE_TTL / 3 секунд:
+        долгая рассылка (ожидание после 429) не отдаёт аренду другой реплике.
+        Если аренду всё же забрали, рассылка прекращается, а остаток досылает новый владелец
+        """
+        delivery = asyncio.create_task(self._deliver(batch))
+        lease_lost = asyncio.Event()
+        keeper = asyncio.create_task(self._keep_lease(delivery, lease_lost))
+        try:
+            await delivery
+        except asyncio.CancelledError:
+            if not lease_lost.is_set():
+                raise
+            logger.warning("Аренда напоминаний перешла к другой реплике, рассылка пачки остановлена")
+        finally:
+            keeper.cancel()
+    
+    async def _keep_lease(self, delivery: asyncio.Task, lease_lost: asyncio.Event):
+        while True:
+            await asyncio.sleep(Config.REMINDER_LEASE_TTL / 3)
+            try:
+                renewed = await db_async(ReminderLease.acquire)(self.LEASE_NAME, self.owner, Config.REMINDER_LEASE_TTL)
+            except Exception as e:
+                # Сбой базы ещё не значит, что аренда потеряна: до истечения срока есть ещё попытки
+                logger.warning(f"Не удалось продлить аренду напоминаний: {e}")
+                continue
+            if not renewed:
+                lease_lost.set()
+                delivery.cancel()
+                return
+    
+    async def _deliver(self, batch: list):
+        """Рассылка пачки под арендой: пропускает уже обработанные, отмечает каждую доставку"""
+        days = {entry[1]: self._local_date(entry) for entry in batch}
+        delivered = await db_async(get_reminder_deliveries)(min(days.values()), user_ids=list(days))
+        pending = [user_id for user_id, day in days.items() if (user_id, day) not in delivered]
+        if not pending:
+            return
+        
+        # Число слов на повторение и первые 5 слов для каждого пользователя пачки —
+        # на его местную дату (один запрос на каждую дату, обычно одна-две)
+        reminders = await db_async(get_due_reminders)(days={user_id: days[user_id] for user_id in pending})
+        # Chat id берётся из ответа базы, а не из снимка кучи: пользователь мог
+        # перепривязать Telegram после перестройки очереди
+        users_by_chat = {reminder['telegram_id']: reminder['user_id'] for reminder in reminders}
+        
+        # Кому сегодня нечего повторять, тоже отмечены: иначе при каждой перестройке
+        # кучи они снова попадали бы в досылку и получили бы напоминание спустя часы
+        with_cards = {reminder['user_id'] for reminder in reminders}
+        idle = [(user_id, days[user_id]) for user_id in pending if user_id not in with_cards]
+        if idle:
+            await db_async(record_reminder_deliveries)(idle)
+        
+        messages = [
+            (reminder['telegram_id'], self._format_reminder(reminder['due_count'], reminder['cards']))
+            for reminder in reminders
+        ]
+        
+        async def mark_delivered(chat_id):
+            user_id = users_by_chat[chat_id]
+            await db_async(record_reminder_delivery)(user_id, days[user_id])
+        
+        if self.outbox is not None:
+            # Частоту и повторы после 429 обеспечивает общая очередь бота: второй
+            # ограничитель только замедлил бы рассылку, а его повторы не срабатывали бы
+            sender = RateLimitedSender(
+                self.bot,
+                global_rate=None,
+                chat_interval=0,
+                concurrency=Config.REMINDER_CONCURRENCY,
+                max_retries=0,
+            )
+        else:
+            sender = RateLimitedSender(
+                self.bot,
+                global_rate=Config.REMINDER_GLOBAL_RATE,
+                concurrency=Config.REMINDER_CONCURRENCY,
+            )
+        result = await sender.send_many(messages, on_delivered=mark_delivered)
+        logger.info(f"Напоминания: отправлено {result['sent']}, не доставлено {result['failed']}")
+    
+    @staticmethod
+    def _format_reminder(due_count: int, cards: List) -> str:
+        """Текст напоминания; cards — первые слова в виде (слово, перевод, уровень)"""
+        message = "🔔 Пора повторить слова!\n\n"
+        message += f"У вас {due_count} слов на повторение сегодня:\n\n"
+        
+        for i, (word, translation, level) in enumerate(cards[:5], 1):  # Показываем первые 5
+            level_emoji = {
+                'beginner': '🟢',
+                'intermediate': '🟡', 
+                'advanced': '🔴'
+            }.get(level, '⚪')
+            
+            message += f"{i}. {level_emoji} {word} — {translation}\n"
+        
+        if due_count > 5:
+            message += f"\n... и ещё {due_count - 5} слов"
+        
+        message += "\n\nИспользуйте команду /today для просмотра всех слов"
+        message += "\nИли /test для проверки знаний!"
+        return message
     
     async def _send_reminder(self, telegram_id: int, cards: List):
         """Отправляет напоминание конкретному пользователю"""
         try:
-            message = "🔔 Пора повторить слова!\n\n"
-            message += f"У вас {len(cards)} слов на повторение сегодня:\n\n"
-            
-            for i, card in enumerate(cards[:5], 1):  # Показываем первые 5
-                level_emoji = {
-                    'beginner': '🟢',
-                    'intermediate': '🟡', 
-                    'advanced': '🔴'
-                }.get(card.level, '⚪')
-                
-                message += f"{i}. {level_emoji} {card.word} — {card.translation}\n"
-            
-            if len(cards) > 5:
-                message += f"\n... и ещё {len(cards) - 5} слов"
-            
-            message += "\n\nИспользуйте команду /today для просмотра всех слов"
-            message += "\nИли /test для проверки знаний!"
-            
-            await self.bot.send_message(telegram_id, message)
+            preview = [(card.word, card.translation, card.level) for card in cards[:5]]
+            await self.bot.send_message(telegram_id, self._format_reminder(len(cards), preview))
             
         except Exception as e:
             logger.error(f"Ошибка при отправке напоминания {telegram_id}: {e}")
@@ -108,12 +275,11 @@ class ReminderService:
         try:
             # Получаем пользователя
             from utils.django_utils import get_user_by_telegram_id
-            from asgiref.sync import sync_to_async
             
-            user = await sync_to_async(get_user_by_telegram_id)(telegram_id)
+            user = await db_async(get_user_by_telegram_id)(telegram_id)
             
             # Проверяем слова на повторение
-            today_cards = await sync_to_async(get_today_cards)(user)
+            today_cards = await db_async(get_today_cards)(user)
             
             if today_cards:
                 await self._send_reminder(telegram_id, today_cards)
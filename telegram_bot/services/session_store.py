@@ -0,0 +1,100 @@
+"""
+Хранилища сессий тестов бота
+"""
+
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+from django.core.cache import caches
+
+from lingua_track.cache import LRUTTLCache
+from config import Config
+
+
+class TestSessionStore(ABC):
+    """
+    Интерфейс хранилища активных тестов.
+    Сессия — словарь из простых значений (id, строки, числа); хранится
+    в сериализованном виде, поэтому не держит ссылок на модели и может
+    разделяться между несколькими процессами бота.
+    """
+
+    def get(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        raw = self._get(self._key(telegram_id))
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, telegram_id: int, session: Dict[str, Any]):
+        self._set(self._key(telegram_id), json.dumps(session, ensure_ascii=False, separators=(',', ':')))
+
+    def delete(self, telegram_id: int):
+        self._delete(self._key(telegram_id))
+
+    @staticmethod
+    def _key(telegram_id: int) -> str:
+        return f"bot_test:{telegram_id}"
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def _set(self, key: str, raw: str):
+        ...
+
+    @abstractmethod
+    def _delete(self, key: str):
+        ...
+
+
+class MemorySessionStore(TestSessionStore):
+    """Хранилище в памяти процесса: не больше max_size сессий, брошенные истекают через ttl"""
+
+    def __init__(self, max_size: int, ttl: int):
+        self._cache = LRUTTLCache(max_size=max_size, ttl=ttl)
+
+    def _get(self, key):
+        return self._cache.get(key)
+
+    def _set(self, key, raw):
+        self._cache.set(key, raw)
+
+    def _delete(self, key):
+        self._cache.delete(key)
+
+    def __len__(self):
+        return len(self._cache)
+
+
+class CacheSessionStore(TestSessionStore):
+    """
+    Хранилище в кэше Django (settings.CACHES). С общим бэкендом
+    (база данных, Redis, Memcached) сессии видны всем процессам бота
+    """
+
+    def __init__(self, ttl: int, alias: str = 'default'):
+        self.ttl = ttl
+        self.alias = alias
+
+    @property
+    def _cache(self):
+        return caches[self.alias]
+
+    def _get(self, key):
+        return self._cache.get(key)
+
+    def _set(self, key, raw):
+        self._cache.set(key, raw, self.ttl)
+
+    def _delete(self, key):
+        self._cache.delete(key)
+
+
+def create_session_store(backend: str = None) -> TestSessionStore:
+    """Создаёт хранилище по настройке Config.TEST_SESSION_BACKEND ('memory' или 'cache')"""
+    backend = backend or Config.TEST_SESSION_BACKEND
+    if backend == 'memory':
+        return MemorySessionStore(max_size=Config.TEST_SESSION_MAX, ttl=Config.TEST_SESSION_TTL)
+    if backend == 'cache':
+        return CacheSessionStore(ttl=Config.TEST_SESSION_TTL)
+    raise ValueError(f"Неизвестное хранилище сессий тестов: {backend}")
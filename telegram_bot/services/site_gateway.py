@@ -0,0 +1,107 @@
+"""
+Обращения бота к операциям сайта: привязка аккаунта, автовход, отзывы
+
+Бот и так загружает Django (utils/django_init) и работает с той же базой,
+поэтому по умолчанию операции выполняются в процессе бота через сервисные
+функции сайта (users/services.py, feedback/services.py) — без HTTP-запроса
+к собственному API, сериализации JSON и работы второго процесса.
+Если бот запущен отдельно от сайта, Config.SITE_GATEWAY = 'http'
+переключает его на API сайта по адресу Config.SITE_URL.
+
+Оба варианта возвращают словари одного вида: {'success': True, ...}
+или {'success': False, 'error': ...}.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+from feedback.services import submit_telegram_feedback
+from users.services import ServiceError, link_telegram, issue_auth_token
+
+from config import Config
+from services.http_client import site_client
+from utils.db import db_async
+
+
+class SiteGateway(ABC):
+    """Интерфейс операций сайта, доступных боту"""
+
+    @abstractmethod
+    async def link_telegram(self, token: str, telegram_id: int, telegram_username: Optional[str]) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    async def generate_auth_token(self, telegram_id: int) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    async def send_feedback(self, text: str, telegram_id: int) -> Dict[str, Any]:
+        ...
+
+
+class LocalSiteGateway(SiteGateway):
+    """Вызовы сервисного слоя сайта в процессе бота (в пуле потоков для ORM)"""
+
+    @staticmethod
+    async def _call(func, *args) -> Dict[str, Any]:
+        try:
+            return await db_async(func)(*args)
+        except ServiceError as e:
+            return {'success': False, 'error': e.error}
+
+    async def link_telegram(self, token, telegram_id, telegram_username):
+        return await self._call(link_telegram, token, telegram_id, telegram_username)
+
+    async def generate_auth_token(self, telegram_id):
+        return await self._call(issue_auth_token, telegram_id, Config.SITE_URL)
+
+    async def send_feedback(self, text, telegram_id):
+        return await self._call(submit_telegram_feedback, text, telegram_id)
+
+
+class HttpSiteGateway(SiteGateway):
+    """Вызовы API сайта по HTTP (бот и сайт на разных серверах)"""
+
+    def __init__(self, client=site_client, site_url: str = None):
+        self.client = client
+        self.site_url = site_url or Config.SITE_URL
+
+    async def link_telegram(self, token, telegram_id, telegram_username):
+        return await self.client.post_json(
+            f"{self.site_url}/users/api/v1/telegram-link-callback/",
+            {
+                'token': token,
+                'telegram_id': telegram_id,
+                'telegram_username': telegram_username
+            },
+            idempotent=False,  # токен одноразовый: повтор после успешной привязки вернул бы ошибку
+        )
+
+    async def generate_auth_token(self, telegram_id):
+        return await self.client.post_json(
+            f"{self.site_url}/users/api/v1/generate-auth-token/",
+            {'telegram_id': telegram_id}
+        )
+
+    async def send_feedback(self, text, telegram_id):
+        return await self.client.post_json(
+            f"{self.site_url}/feedback/api/telegram/",
+            {
+                'text': text,
+                'telegram_id': telegram_id
+            },
+            idempotent=False,  # повтор мог бы сохранить отзыв дважды
+        )
+
+
+def create_site_gateway(backend: str = None) -> SiteGateway:
+    """Создаёт шлюз по настройке Config.SITE_GATEWAY ('local' или 'http')"""
+    backend = backend or Config.SITE_GATEWAY
+    if backend == 'local':
+        return LocalSiteGateway()
+    if backend == 'http':
+        return HttpSiteGateway()
+    raise ValueError(f"Неизвестный способ обращения к сайту: {backend}")
+
+
+site_gateway = create_site_gateway()
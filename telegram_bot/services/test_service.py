@@ -7,28 +7,40 @@ import random
 from typing import List, Dict, Any
 from utils.django_utils import get_user_by_telegram_id, get_random_cards_for_test, save_test_result
 from config import Config
+from services.session_store import create_session_store
 
 class TestService:
     """Сервис для работы с тестами"""
     
-    # Глобальное хранилище активных тестов (в продакшене лучше использовать Redis)
-    active_tests = {}
+    # Хранилище активных тестов (память процесса или общий кэш, см. Config.TEST_SESSION_BACKEND).
+    # Тест хранится компактно: id и строки карточек, без объектов моделей
+    store = create_session_store()
+    
+    # Количество неправильных вариантов ответа в вопросе
+    DISTRACTORS = 3
     
     @classmethod
     def create_test(cls, telegram_id: int, questions_count: int = None) -> Dict[str, Any]:
         """Создаёт новый тест для пользователя"""
         if questions_count is None:
             questions_count = Config.TEST_QUESTIONS_COUNT
+        questions_count = max(1, min(questions_count, Config.TEST_MAX_QUESTIONS))
             
         user = get_user_by_telegram_id(telegram_id)
-        cards = get_random_cards_for_test(user, questions_count)
+        # Берём карточки с запасом: лишние служат только неправильными вариантами
+        pool = get_random_cards_for_test(user, questions_count + cls.DISTRACTORS)
+        cards = pool[:questions_count]
         
         if not cards:
             return None
         
         test_data = {
-            'user': user,
-            'cards': cards,
+            'user_id': user.id,
+            # Карточки вопросов: [id, слово, перевод]
+            'cards': [[card.id, card.word, card.translation] for card in cards],
+            # Варианты ответа выбираются один раз на весь тест,
+            # поэтому показ вопроса не обращается к базе
+            'options': [cls._build_options(card, pool) for card in cards],
             'current_question': 0,
             'correct_answers': 0,
             'wrong_answers': 0,
@@ -36,29 +48,35 @@ class TestService:
             'start_time': time.time()
         }
         
-        cls.active_tests[telegram_id] = test_data
+        cls.store.set(telegram_id, test_data)
         return test_data
     
+    @classmethod
+    def _build_options(cls, card, pool) -> List[str]:
+        """Правильный перевод и до DISTRACTORS неправильных из карточек теста, в случайном порядке"""
+        wrong = list({c.translation for c in pool if c.translation != card.translation})
+        options = [card.translation] + random.sample(wrong, min(cls.DISTRACTORS, len(wrong)))
+        random.shuffle(options)
+        return options
+    
     @classmethod
     def get_test(cls, telegram_id: int) -> Dict[str, Any]:
         """Получает активный тест пользователя"""
-        return cls.active_tests.get(telegram_id)
+        return cls.store.get(telegram_id)
     
     @classmethod
     def remove_test(cls, telegram_id: int):
         """Удаляет активный тест пользователя"""
-        if telegram_id in cls.active_tests:
-            del cls.active_tests[telegram_id]
+        cls.store.delete(telegram_id)
     
     @classmethod
     def process_answer(cls, telegram_id: int, user_answer: str) -> Dict[str, Any]:
         """Обрабатывает ответ пользователя на вопрос теста"""
-        test_data = cls.active_tests.get(telegram_id)
-        if not test_data:
+        test_data = cls.store.get(telegram_id)
+        if not test_data or test_data['current_question'] >= len(test_data['cards']):
             return None
         
-        current_card = test_data['cards'][test_data['current_question']]
-        correct_answer = current_card.translation
+        _, word, correct_answer = test_data['cards'][test_data['current_question']]
         
         is_correct = user_answer == correct_answer
         
@@ -69,7 +87,7 @@ class TestService:
         
         # Сохраняем ответ
         test_data['answers'].append({
-            'card': current_card,
+            'word': word,
             'user_answer': user_answer,
             'correct_answer': correct_answer,
             'is_correct': is_correct
@@ -77,44 +95,37 @@ class TestService:
         
         # Переходим к следующему вопросу
         test_data['current_question'] += 1
+        cls.store.set(telegram_id, test_data)
         
         return {
             'is_correct': is_correct,
             'correct_answer': correct_answer,
-            'word': current_card.word,
+            'word': word,
             'is_finished': test_data['current_question'] >= len(test_data['cards'])
         }
     
     @classmethod
     def get_current_question(cls, telegram_id: int) -> Dict[str, Any]:
         """Получает текущий вопрос теста"""
-        test_data = cls.active_tests.get(telegram_id)
+        test_data = cls.store.get(telegram_id)
         if not test_data or test_data['current_question'] >= len(test_data['cards']):
             return None
         
-        current_card = test_data['cards'][test_data['current_question']]
-        correct_answer = current_card.translation
-        
-        # Получаем другие карточки для создания неправильных ответов
-        other_cards = get_random_cards_for_test(test_data['user'], 10)
-        wrong_answers = [card.translation for card in other_cards if card.translation != correct_answer][:3]
-        
-        # Добавляем правильный ответ и перемешиваем
-        all_answers = [correct_answer] + wrong_answers
-        random.shuffle(all_answers)
+        card_id, word, correct_answer = test_data['cards'][test_data['current_question']]
         
         return {
-            'card': current_card,
+            'card_id': card_id,
+            'word': word,
             'question_number': test_data['current_question'] + 1,
             'total_questions': len(test_data['cards']),
-            'answers': all_answers,
+            'answers': test_data['options'][test_data['current_question']],
             'correct_answer': correct_answer
         }
     
     @classmethod
     def finish_test(cls, telegram_id: int) -> Dict[str, Any]:
         """Завершает тест и возвращает результаты"""
-        test_data = cls.active_tests.get(telegram_id)
+        test_data = cls.store.get(telegram_id)
         if not test_data:
             return None
         
@@ -135,7 +146,7 @@ class TestService:
         
         # Сохраняем результат в базу данных
         save_test_result(
-            user=test_data['user'],
+            user_id=test_data['user_id'],
             test_type='multiple_choice',
             direction='en-ru',  # Пока только английский → русский
             score=correct_answers,
@@ -169,6 +180,6 @@ class TestService:
         final_text += "\n\n📋 Детали:\n"
         for i, answer in enumerate(results['answers'], 1):
             emoji = "✅" if answer['is_correct'] else "❌"
-            final_text += f"{i}. {emoji} {answer['card'].word} = {answer['correct_answer']}\n"
+            final_text += f"{i}. {emoji} {answer['word']} = {answer['correct_answer']}\n"
         
         return final_text 
\ No newline at end of file
@@ -40,34 +40,17 @@ class TTSService:
     @staticmethod
     async def generate_audio(word: str, lang: str) -> Optional[str]:
         """
-        Генерирует аудиофайл для слова
+        Генерирует аудиофайл для слова.
+        Синтез идёт в общем пуле words.tts: цикл событий не блокируется,
+        одновременные запросы одного слова ждут один синтез
         """
         try:
-            # Импортируем функцию генерации TTS из Django
-            import sys
-            import os
-            
-            # Добавляем путь к Django проекту
-            django_path = os.path.join(os.getcwd(), '..')
-            sys.path.append(django_path)
-            
-            # Настраиваем Django
-            os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lingua_track.settings')
-            import django
-            django.setup()
-            
-            # Импортируем функцию генерации TTS
-            from words.utils import generate_tts
-            
-            # Генерируем аудио
-            relative_path = generate_tts(word, lang)
-            
-            # Получаем абсолютный путь
             from django.conf import settings
-            absolute_path = os.path.join(settings.MEDIA_ROOT, relative_path)
-            
-            return absolute_path
-            
+            from words.tts import get_tts_pool
+
+            relative_path = await get_tts_pool().generate_async(word, lang)
+            return os.path.join(settings.MEDIA_ROOT, relative_path)
+
         except Exception as e:
             logger.exception("Ошибка при генерации TTS")
             return None
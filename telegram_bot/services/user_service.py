@@ -31,6 +31,12 @@ class UserService:
         cards_data = get_user_cards_paginated(user, 1, 50)  # Получаем первые 50 карточек
         return cards_data['cards']  # Возвращаем только список карточек
     
+    @staticmethod
+    def get_user_cards_paginated(telegram_id: int, page: int = 1, per_page: int = 10):
+        """Получает страницу карточек пользователя (cards, total, page, per_page, total_pages)"""
+        user = get_user_by_telegram_id(telegram_id)
+        return get_user_cards_paginated(user, page, per_page)
+    
     @staticmethod
     def format_cards_for_display(cards: list) -> str:
         """Форматирует карточки для отображения"""
@@ -0,0 +1,45 @@
+"""
+Выполнение ORM-кода бота в отдельном пуле потоков
+
+sync_to_async по умолчанию (thread_sensitive=True) выполняет все вызовы
+в одном общем потоке, поэтому медленный запрос одного чата задерживает
+остальные. Здесь ORM-вызовы идут в ограниченный пул потоков: у каждого
+потока своё соединение с базой, и запросы разных чатов выполняются
+параллельно, но не больше Config.DB_POOL_SIZE одновременно.
+"""
+
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+from config import Config
+
+_executor = ThreadPoolExecutor(max_workers=Config.DB_POOL_SIZE, thread_name_prefix='bot-db')
+
+
+def _with_connection_cleanup(func):
+    # Как и в обработке HTTP-запроса Django: закрываем соединения, которые
+    # устарели (CONN_MAX_AGE) или сломались, до и после обращения к базе
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return wrapper
+
+
+def db_async(func):
+    """
+    Замена sync_to_async для ORM-кода бота:
+        user = await db_async(get_user_by_telegram_id)(telegram_id)
+    """
+    return sync_to_async(_with_connection_cleanup(func), thread_sensitive=False, executor=_executor)
+
+
+def shutdown_db_pool():
+    """Дожидается завершения запросов и закрывает пул (при остановке бота)"""
+    _executor.shutdown(wait=True)
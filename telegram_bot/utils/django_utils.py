@@ -5,6 +5,7 @@
 import os
 import django
 from datetime import date
+from typing import NamedTuple
 
 # Настройка Django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lingua_track.settings')
@@ -13,43 +14,69 @@ django.setup()
 # Импортируем модели после настройки Django
 from django.contrib.auth.models import User
 from django.utils import timezone
-from django.db.models import Sum
 from words.models import Card, Repetition
 from users.models import UserProfile
 from stats.models import TestResult, UserStats
-from django.core.cache import cache
+from django.db import transaction, IntegrityError
+from users import identity
+from lingua_track.cache import TwoTierCache, user_cache_key
 
-CACHE_TTL_SHORT = 60  # 1 минута
-CACHE_TTL_PROGRESS = 300  # 5 минут
+# Ключи версионированы (lingua_track.cache.user_cache_key): любая запись карточек,
+# повторений и тестов на сайте или в боте сразу делает старые записи недействительными
+CACHE_TTL_TODAY = 24 * 3600  # Ключ содержит дату, поэтому дольше суток не нужен
+CACHE_TTL_PROGRESS = 6 * 3600
+# Выборки, которые бот читает на каждое нажатие, держим и в памяти процесса:
+# ключ версионирован, поэтому после записи старая копия в LRU просто не читается
+CACHE_LOCAL_TTL = 60
+user_data_cache = TwoTierCache(local_size=10000, local_ttl=CACHE_LOCAL_TTL)
+
+
+class CardRecord(NamedTuple):
+    """
+    Карточка в том виде, в каком её показывает бот. В кэше хранится простым
+    кортежем: без _state и остальных полей модели он в разы меньше
+    и быстрее распаковывается (см. benchmarks/card_cache.py)
+    """
+    id: int
+    word: str
+    translation: str
+    level: str
+
+
+CARD_RECORD_FIELDS = CardRecord._fields
 
 
 def get_user_by_telegram_id(telegram_id: int) -> User:
     """
     Получает пользователя Django по Telegram ID
-    Создаёт пользователя, если его нет
+    Создаёт пользователя, если его нет.
+    Результат берётся из кэша users.identity, поэтому обычно запросов к базе нет
     """
-    try:
-        # Ищем пользователя по Telegram ID в профиле
-        profile = UserProfile.objects.get(telegram_id=telegram_id)
-        return profile.user
-    except UserProfile.DoesNotExist:
-        # Проверяем, не существует ли уже пользователь с таким telegram_id (дополнительная защита)
-        if UserProfile.objects.filter(telegram_id=telegram_id).exists():
-            return UserProfile.objects.get(telegram_id=telegram_id).user
-        # Создаём нового пользователя с профилем
-        username = f"telegram_{telegram_id}"
-        user = User.objects.create_user(
-            username=username,
-            email=f"{username}@linguatrack.local",
-            password=f"{username}_password"
-        )
-        UserProfile.objects.create(
-            user=user,
-            telegram_id=telegram_id,
-            is_telegram_user=True
-        )
+    user = identity.get_user(telegram_id)
+    if user is not None:
         return user
 
+    # Создаём нового пользователя с профилем
+    username = f"telegram_{telegram_id}"
+    try:
+        with transaction.atomic():
+            user = User.objects.create_user(
+                username=username,
+                email=f"{username}@linguatrack.local",
+                password=f"{username}_password"
+            )
+            UserProfile.objects.create(
+                user=user,
+                telegram_id=telegram_id,
+                is_telegram_user=True
+            )
+    except IntegrityError:
+        # Параллельный запрос уже создал пользователя
+        identity.invalidate(telegram_id)
+        return identity.get_user(telegram_id)
+    identity.remember(telegram_id, user)
+    return user
+
 def link_telegram_to_existing_user(telegram_id: int, telegram_username: str, django_username: str) -> User:
     """
     Связывает существующего пользователя Django с Telegram
@@ -73,12 +100,16 @@ def link_telegram_to_existing_user(telegram_id: int, telegram_username: str, dja
                 'is_telegram_user': True
             }
         )
+        previous_telegram_id = None
         if not created:
             # Обновляем существующий профиль
+            previous_telegram_id = profile.telegram_id
             profile.telegram_id = telegram_id
             profile.telegram_username = telegram_username
             profile.is_telegram_user = True
             profile.save()
+        # Telegram ID теперь указывает на другого пользователя (и старый ID — ни на кого)
+        identity.invalidate(telegram_id, previous_telegram_id)
         return user
     except User.DoesNotExist:
         raise ValueError(f"Пользователь Django с username '{django_username}' не найден")
@@ -103,24 +134,133 @@ def get_user_telegram_info(user: User) -> dict:
 
 def get_today_cards(user: User) -> list:
     """
-    Получает карточки на повторение сегодня
+    Получает карточки на повторение сегодня (список CardRecord)
     """
-    cache_key = f"today_cards:{user.id}:{timezone.now().date()}"
-    cached = cache.get(cache_key)
-    if cached is not None:
-        return cached
+    cache_key = user_cache_key('today_cards', user.id, timezone.now().date())
+    rows = user_data_cache.get(cache_key)
+    if rows is None:
+        today = timezone.now().date()
+        # Одно соединение по индексу (user, next_review), без distinct
+        rows = list(Card.objects.filter(
+            repetition__user=user,
+            repetition__next_review__lte=today
+        ).order_by('repetition__next_review', 'id').values_list(*CARD_RECORD_FIELDS))
+        user_data_cache.set(cache_key, rows, CACHE_TTL_TODAY)
+    return [CardRecord._make(row) for row in rows]
 
-    today = timezone.now().date()
-    # Получаем уникальные card_id для избежания дублирования
-    card_ids = Repetition.objects.filter(
-        user=user, 
-        next_review__lte=today
-    ).values_list('card_id', flat=True).distinct()
-    
-    # Получаем карточки по уникальным ID
-    cards = list(Card.objects.filter(id__in=card_ids))
-    cache.set(cache_key, cards, CACHE_TTL_SHORT)
-    return cards
+def get_due_reminders(today: date = None, preview: int = 5, user_ids: list = None, days: dict = None) -> list:
+    """
+    Данные для ежедневных напоминаний одним запросом: для каждого
+    пользователя с привязанным Telegram и словами на повторение —
+    число слов к повторению и первые preview слов. user_ids ограничивает
+    выборку частью пользователей (очередной пачкой планировщика).
+    days — {user_id: местная дата пользователя}: слова отбираются на его
+    собственную дату, по одному запросу на каждую различную дату.
+    Возвращает список словарей {'user_id', 'telegram_id', 'due_count', 'cards': [(слово, перевод, уровень)]};
+    telegram_id — текущий chat id пользователя на момент запроса
+    """
+    from django.db.models import Count, F, Window
+    from django.db.models.functions import RowNumber
+
+    if days is not None:
+        users_by_day = {}
+        for user_id, day in days.items():
+            users_by_day.setdefault(day, []).append(user_id)
+        return [
+            reminder
+            for day, ids in sorted(users_by_day.items())
+            for reminder in get_due_reminders(day, preview, ids)
+        ]
+
+    if today is None:
+        today = timezone.now().date()
+
+    repetitions = Repetition.objects.filter(next_review__lte=today, user__profile__telegram_id__isnull=False)
+    if user_ids is not None:
+        repetitions = repetitions.filter(user_id__in=user_ids)
+    rows = (
+        repetitions
+        .annotate(
+            position=Window(RowNumber(), partition_by=[F('user_id')],
+                            order_by=[F('next_review').asc(), F('card_id').asc()]),
+            due_count=Window(Count('id'), partition_by=[F('user_id')]),
+        )
+        .filter(position__lte=preview)
+        .order_by('user_id', 'position')
+        .values_list('user_id', 'user__profile__telegram_id', 'due_count', 'card__word', 'card__translation', 'card__level')
+    )
+
+    reminders = []
+    for user_id, telegram_id, due_count, word, translation, level in rows.iterator():
+        if not reminders or reminders[-1]['user_id'] != user_id:
+            reminders.append({'user_id': user_id, 'telegram_id': telegram_id, 'due_count': due_count, 'cards': []})
+        reminders[-1]['cards'].append((word, translation, level))
+    return reminders
+
+def get_reminder_schedule(default_hour: int, default_minute: int) -> list:
+    """
+    Настройки напоминаний всех пользователей с привязанным Telegram одним запросом
+    (для построения очереди планировщика). Пользователи без сохранённых
+    настроек получают время default_hour:default_minute по UTC.
+    Возвращает кортежи (user_id, telegram_id, timezone, hour, minute, quiet_days)
+    """
+    from reminders.models import DEFAULT_TIMEZONE
+
+    rows = (
+        UserProfile.objects
+        .filter(telegram_id__isnull=False)
+        .exclude(user__reminder_preference__enabled=False)
+        .values_list('user_id', 'telegram_id', 'user__reminder_preference__timezone',
+                     'user__reminder_preference__hour', 'user__reminder_preference__minute',
+                     'user__reminder_preference__quiet_days')
+    )
+    return [
+        (user_id, telegram_id, tz or DEFAULT_TIMEZONE,
+         default_hour if hour is None else hour,
+         default_minute if minute is None else minute,
+         quiet_days or '')
+        for user_id, telegram_id, tz, hour, minute, quiet_days in rows.iterator()
+    ]
+
+def get_reminder_deliveries(since: date, user_ids: list = None) -> set:
+    """
+    Пары (user_id, дата), для которых напоминание уже отправлено, начиная с since.
+    user_ids ограничивает выборку частью пользователей (очередной пачкой планировщика)
+    """
+    from reminders.models import ReminderDelivery
+    deliveries = ReminderDelivery.objects.filter(date__gte=since)
+    if user_ids is not None:
+        deliveries = deliveries.filter(user_id__in=user_ids)
+    return set(deliveries.values_list('user_id', 'date'))
+
+def record_reminder_delivery(user_id: int, day: date):
+    """Отмечает, что напоминание за день day отправлено (повторная отметка игнорируется)"""
+    record_reminder_deliveries([(user_id, day)])
+
+def record_reminder_deliveries(pairs: list):
+    """Отмечает пары (user_id, дата) обработанными одним запросом (повторные отметки игнорируются)"""
+    from reminders.models import ReminderDelivery
+    ReminderDelivery.objects.bulk_create(
+        [ReminderDelivery(user_id=user_id, date=day) for user_id, day in pairs], ignore_conflicts=True)
+
+def prune_reminder_deliveries(before: date) -> int:
+    """Удаляет записи журнала напоминаний старше before"""
+    from reminders.models import ReminderDelivery
+    return ReminderDelivery.objects.filter(date__lt=before).delete()[0]
+
+def update_reminder_preference(user: User, **fields):
+    """
+    Создаёт или меняет настройки напоминаний пользователя.
+    Некорректные значения (часовой пояс, время) — django ValidationError
+    """
+    from reminders.models import ReminderPreference
+
+    preference = ReminderPreference.objects.filter(user=user).first() or ReminderPreference(user=user)
+    for name, value in fields.items():
+        setattr(preference, name, value)
+    preference.full_clean(exclude=['user'])
+    preference.save()
+    return preference
 
 def get_user_cards_paginated(user: User, page: int = 1, per_page: int = 10) -> dict:
     """
@@ -133,7 +273,7 @@ def get_user_cards_paginated(user: User, page: int = 1, per_page: int = 10) -> d
     end = start + per_page
     
     return {
-        'cards': list(cards[start:end]),
+        'cards': [CardRecord._make(row) for row in cards[start:end].values_list(*CARD_RECORD_FIELDS)],
         'total': total,
         'page': page,
         'per_page': per_page,
@@ -142,88 +282,52 @@ def get_user_cards_paginated(user: User, page: int = 1, per_page: int = 10) -> d
 
 def get_user_progress(user: User) -> dict:
     """
-    Получает статистику пользователя
+    Получает статистику пользователя.
+    Пересчёт после истечения или изменения данных делает один запрос,
+    остальные одновременные получают его результат (lingua_track.cache.get_or_compute)
     """
-    cache_key = f"user_progress:{user.id}"
-    cached = cache.get(cache_key)
-    if cached is not None:
-        return cached
+    def compute():
+        # Счётчики поддерживаются инкрементально — одна строка UserStats
+        user_stats = UserStats.for_user(user)
+        return {
+            'total_cards': user_stats.total_cards,
+            'total_reviews': user_stats.total_reviews,
+            'total_tests': user_stats.total_tests,
+            'review_success_rate': user_stats.review_success_rate,
+            'tests_accuracy': round(user_stats.tests_accuracy, 1),
+            'beginner_cards': user_stats.beginner_cards,
+            'intermediate_cards': user_stats.intermediate_cards,
+            'advanced_cards': user_stats.advanced_cards,
+        }
 
-    # Получаем или создаём статистику
-    user_stats, created = UserStats.objects.get_or_create(user=user)
-    
-    # Обновляем статистику
-    cards = Card.objects.filter(user=user)
-    user_stats.total_cards = cards.count()
-    user_stats.beginner_cards = cards.filter(level='beginner').count()
-    user_stats.intermediate_cards = cards.filter(level='intermediate').count()
-    user_stats.advanced_cards = cards.filter(level='advanced').count()
-    
-    # Статистика повторений
-    repetitions = Repetition.objects.filter(user=user)
-    agg = repetitions.aggregate(
-        total=Sum('total_reviews'),
-        success=Sum('successful_reviews'),
-        failed=Sum('failed_reviews'),
-    )
-    user_stats.total_reviews = agg['total'] or 0
-    user_stats.successful_reviews = agg['success'] or 0
-    user_stats.failed_reviews = agg['failed'] or 0
-    
-    # Статистика тестов
-    test_results = TestResult.objects.filter(user=user)
-    user_stats.total_tests = test_results.count()
-    if user_stats.total_tests > 0:
-        total_accuracy = sum(test.accuracy for test in test_results)
-        user_stats.tests_accuracy = total_accuracy / user_stats.total_tests
-    
-    user_stats.save()
-    
-    result = {
-        'total_cards': user_stats.total_cards,
-        'total_reviews': user_stats.total_reviews,
-        'total_tests': user_stats.total_tests,
-        'review_success_rate': user_stats.review_success_rate,
-        'tests_accuracy': round(user_stats.tests_accuracy, 1),
-        'beginner_cards': user_stats.beginner_cards,
-        'intermediate_cards': user_stats.intermediate_cards,
-        'advanced_cards': user_stats.advanced_cards,
-    }
-    cache.set(cache_key, result, CACHE_TTL_PROGRESS)
-    return result
+    # Копия: словарь из LRU процесса общий для всех вызывающих
+    return dict(user_data_cache.get_or_compute(user_cache_key('user_progress', user.id), compute, CACHE_TTL_PROGRESS))
 
 def get_random_cards_for_test(user: User, count: int = 5) -> list:
     """
-    Получает случайные карточки для теста
+    Получает случайные карточки для теста.
+    Выборка делается в базе (words.utils.sample_card_ids): колода
+    пользователя не читается целиком, каждая карточка равновероятна
     """
-    from django.db.models import Q
-    
-    # Получаем карточки с повторениями (более изученные)
-    cards_with_repetitions = Card.objects.filter(
-        user=user,
-        repetition__total_reviews__gte=1
-    ).distinct()
-    
-    # Если карточек с повторениями мало, добавляем все карточки
-    if cards_with_repetitions.count() < count:
-        all_cards = Card.objects.filter(user=user)
-        cards_for_test = list(all_cards)
-    else:
-        cards_for_test = list(cards_with_repetitions)
-    
-    # Перемешиваем и возвращаем нужное количество
-    import random
-    random.shuffle(cards_for_test)
-    return cards_for_test[:count]
+    from words.utils import sample_card_ids
+
+    # Предпочитаем карточки с повторениями (более изученные)
+    ids = sample_card_ids(Card.objects.filter(user=user, repetition__total_reviews__gte=1), count)
+    # Если карточек с повторениями мало, выбираем из всех карточек
+    if len(ids) < count:
+        ids = sample_card_ids(Card.objects.filter(user=user), count)
+
+    cards = Card.objects.in_bulk(ids)
+    return [cards[card_id] for card_id in ids if card_id in cards]
 
-def save_test_result(user: User, test_type: str, direction: str, 
+def save_test_result(user_id: int, test_type: str, direction: str, 
                     score: int, total: int, correct_answers: int, 
                     wrong_answers: int, time_taken: int = None) -> TestResult:
     """
-    Сохраняет результат теста
+    Сохраняет результат теста (по id пользователя, без загрузки User)
     """
     return TestResult.objects.create(
-        user=user,
+        user_id=user_id,
         test_type=test_type,
         direction=direction,
         score=score,
@@ -233,20 +337,16 @@ def save_test_result(user: User, test_type: str, direction: str,
         time_taken=time_taken
     )
 
+def update_repetitions_batch(user: User, reviews: list) -> list:
+    """
+    Применяет SM-2 к нескольким карточкам пользователя сразу.
+    reviews — список пар (card_id, quality)
+    """
+    from words.utils import apply_reviews
+    return apply_reviews(user, reviews)
+
 def update_repetition_stats(user: User, card: Card, quality: int):
     """
     Обновляет статистику повторения
     """
-    repetition, created = Repetition.objects.get_or_create(
-        user=user, 
-        card=card
-    )
-    
-    # Обновляем статистику
-    repetition.update_stats(quality)
-    
-    # Обновляем интервал по алгоритму SM-2
-    from words.utils import update_sm2
-    update_sm2(repetition, quality)
-    
-    repetition.save() 
\ No newline at end of file
+    update_repetitions_batch(user, [(card.id, quality)])
@@ -0,0 +1,104 @@
+"""
+Приём обновлений через вебхук с сохранением порядка в каждом чате
+
+SimpleRequestHandler из aiogram в фоновом режиме запускает отдельную задачу
+на каждое обновление: два быстрых нажатия кнопки в одном чате могут
+обработаться в обратном порядке (например, ответы на вопросы теста).
+ChatOrderedRequestHandler сразу отвечает Telegram и раскладывает обновления
+по workers очередям по chat_id: обновления одного чата всегда попадают
+к одному воркеру и обрабатываются по очереди, а разные чаты — параллельно.
+Очереди ограничены queue_size: при переполнении обновление не принимается
+(ответ 503), и Telegram повторит его позже. Задерживать ответ нельзя —
+Telegram не дождался бы его и прислал обновление ещё раз, уже принятым.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Поля обновления, в которых есть чат (или пользователь, если чата нет)
+_CHAT_PATHS = (
+    ('message', 'chat'),
+    ('edited_message', 'chat'),
+    ('callback_query', 'message', 'chat'),
+    ('callback_query', 'from'),
+    ('my_chat_member', 'chat'),
+    ('chat_member', 'chat'),
+    ('inline_query', 'from'),
+    ('pre_checkout_query', 'from'),
+)
+
+
+def chat_key(update: Dict[str, Any]) -> int:
+    """id чата обновления; для обновлений без чата — update_id"""
+    for path in _CHAT_PATHS:
+        value = update
+        for field in path:
+            value = value.get(field) if isinstance(value, dict) else None
+        if value and 'id' in value:
+            return value['id']
+    return update.get('update_id', 0)
+
+
+class ChatOrderedRequestHandler(SimpleRequestHandler):
+    """Обработчик вебхука: ответ сразу, обработка в воркерах с порядком по чатам"""
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, workers: int = 8, queue_size: int = 1000,
+                 secret_token: Optional[str] = None, **data: Any):
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=True,
+                         secret_token=secret_token, **data)
+        self.workers = workers
+        self._queues: List[asyncio.Queue] = [asyncio.Queue(maxsize=queue_size) for _ in range(workers)]
+        self._tasks: List[asyncio.Task] = []
+
+    def register(self, app: web.Application, /, path: str, **kwargs: Any) -> None:
+        app.on_startup.append(self._handle_start)
+        super().register(app, path, **kwargs)
+
+    async def _handle_start(self, *a: Any, **kw: Any) -> None:
+        self.start()
+
+    def start(self):
+        """Запускает воркеры (при регистрации в приложении — автоматически)"""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker(queue)) for queue in self._queues]
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            update = await queue.get()
+            try:
+                await self._background_feed_update(bot=self.bot, update=update)
+            except Exception as e:
+                logger.exception(f"Ошибка обработки обновления {update.get('update_id')}: {e}")
+            finally:
+                queue.task_done()
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        update = await request.json(loads=bot.session.json_loads)
+        try:
+            self._queues[chat_key(update) % self.workers].put_nowait(update)
+        except asyncio.QueueFull:
+            logger.warning(f"Очередь обновлений переполнена, обновление {update.get('update_id')} отклонено")
+            return web.Response(status=503)
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    async def drain(self, timeout: float = 10):
+        """Ждёт обработки уже принятых обновлений (не дольше timeout секунд)"""
+        try:
+            await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self._queues)), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Не все принятые обновления обработаны до остановки")
+
+    async def close(self) -> None:
+        await self.drain()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await super().close()
@@ -28,7 +28,7 @@ def test_full_user_cycle():
     # 4. Добавляем ещё карточки для теста
     for i in range(3):
         card = Card.objects.create(user=user, word=f'word{i}', translation=f'trans{i}', level='beginner')
-        Repetition.objects.create(card=card, user=user)
+        Repetition.objects.get_or_create(card=card, user=user)
     
     # 5. Проверяем статистику
     total_cards = Card.objects.filter(user=user).count()
@@ -52,7 +52,7 @@ def test_telegram_integration():
     # Добавляем карточки
     for i in range(5):
         card = Card.objects.create(user=user, word=f'tgword{i}', translation=f'tgtrans{i}', level='beginner')
-        Repetition.objects.create(card=card, user=user)
+        Repetition.objects.get_or_create(card=card, user=user)
     
     # Проверяем через сервисы бота
     import sys
@@ -10,4 +10,113 @@ def test_quiz_generation():
     cards = Card.objects.filter(user=user)
     assert cards.count() == 5
 
-# Здесь можно добавить тесты для бизнес-логики quiz/test_service, если она вынесена отдельно 
\ No newline at end of file
+# Здесь можно добавить тесты для бизнес-логики quiz/test_service, если она вынесена отдельно 
+
+@pytest.mark.django_db
+def test_quiz_plan_built_once(client):
+    from quiz import engine
+    user = User.objects.create_user(username='planuser', password='123')
+    for i in range(6):
+        Card.objects.create(user=user, word=f'word{i}', translation=f'перевод{i}', level='beginner')
+    client.force_login(user)
+
+    response = client.get('/quiz/multiple-choice/?direction=en-ru')
+    assert response.status_code == 200
+    plan = client.session[engine.PLAN_SESSION_KEY]
+    assert len(plan['questions']) == 6
+    for card_index, *options in plan['questions']:
+        assert len(set(options)) == 4 and card_index in options
+
+    # Ответы на вопросы не читают таблицу карточек
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    for _ in range(6):
+        question = client.get('/quiz/multiple-choice/').context['question']
+        with CaptureQueriesContext(connection) as queries:
+            client.post('/quiz/multiple-choice/', {'answer': question.replace('word', 'перевод')})
+        assert not [q for q in queries.captured_queries if 'words_card' in q['sql']]
+
+    response = client.get('/quiz/multiple-choice/')
+    assert response.context['score'] == 6
+    assert engine.PLAN_SESSION_KEY not in client.session
+
+
+@pytest.mark.django_db
+def test_typing_quiz_ignores_case(client):
+    user = User.objects.create_user(username='typeuser', password='123')
+    Card.objects.create(user=user, word='Cat', translation='Кот', level='beginner')
+    client.force_login(user)
+    client.get('/quiz/typing/?direction=en-ru')
+    client.post('/quiz/typing/?direction=en-ru', {'answer': '  кот '})
+    response = client.get('/quiz/typing/')
+    assert response.context['score'] == 1
+    assert response.context['total'] == 1
+
+
+@pytest.mark.django_db
+def test_sample_card_ids_small_and_large_decks():
+    from words.utils import sample_card_ids
+    user = User.objects.create_user(username='sampleuser', password='123')
+    Card.objects.bulk_create([Card(user=user, word=f'w{i}', translation=f't{i}') for i in range(60)])
+    cards = Card.objects.filter(user=user)
+    all_ids = set(cards.values_list('id', flat=True))
+
+    # Колода меньше запроса — возвращаются все карточки
+    assert set(sample_card_ids(cards.filter(word__in=['w1', 'w2']), 5)) == set(cards.filter(word__in=['w1', 'w2']).values_list('id', flat=True))
+    # 60 > 4 * 5 — выборка по случайным точкам диапазона id
+    for _ in range(10):
+        ids = sample_card_ids(cards, 5)
+        assert len(ids) == len(set(ids)) == 5
+        assert set(ids) <= all_ids
+
+
+@pytest.mark.django_db
+def test_sample_card_ids_cost_does_not_grow_with_deck(django_assert_max_num_queries):
+    from words.utils import sample_card_ids
+
+    for size in (50, 5000):
+        user = User.objects.create_user(username=f'deck{size}', password='123')
+        Card.objects.bulk_create([Card(user=user, word=f'w{i}', translation=f't{i}') for i in range(size)])
+        # id колоды подряд: почти каждая точка — карточка; чтение id, границы и по запросу на карточку
+        with django_assert_max_num_queries(12):
+            assert len(set(sample_card_ids(Card.objects.filter(user=user), 5))) == 5
+
+
+@pytest.mark.django_db
+def test_sample_card_ids_uniform_over_gappy_ids():
+    import random
+    from collections import Counter
+    from words.utils import sample_card_ids
+
+    user = User.objects.create_user(username='gappy', password='123')
+    other = User.objects.create_user(username='neighbour', password='123')
+    # id карточек пользователя перемежаются с чужими, «дыры» от 0 до 40 id
+    for i, gap in enumerate([0, 40, 0, 0, 25, 0, 40, 1, 0, 10]):
+        Card.objects.bulk_create([Card(user=other, word=f'o{i}_{n}', translation='t') for n in range(gap)])
+        Card.objects.create(user=user, word=f'w{i}', translation=f't{i}')
+    cards = Card.objects.filter(user=user)
+
+    random.seed(1)
+    counts = Counter()
+    for _ in range(1500):
+        counts.update(sample_card_ids(cards, 2))  # 10 > 4 * 2 — выборка большой колоды
+
+    assert set(counts) == set(cards.values_list('id', flat=True))
+    # Ожидается по 300 попаданий; при выборке по диапазону id карточки после дыр выпадали в разы чаще
+    assert 240 < min(counts.values()) and max(counts.values()) < 360
+
+
+@pytest.mark.django_db
+def test_quiz_length(client):
+    from quiz import engine
+    user = User.objects.create_user(username='lenuser', password='123')
+    Card.objects.bulk_create([Card(user=user, word=f'w{i}', translation=f't{i}') for i in range(30)])
+    client.force_login(user)
+
+    response = client.get('/quiz/matching/?direction=ru-en&length=7')
+    assert response.context['total'] == 7
+    plan = client.session[engine.PLAN_SESSION_KEY]
+    assert len(plan['pairs']) == 10  # 7 вопросов + 3 запасных варианта
+
+    client.post('/quiz/', {'test_type': 'typing', 'direction': 'en-ru', 'length': '3'})
+    assert client.get('/quiz/typing/').context['total'] == 3
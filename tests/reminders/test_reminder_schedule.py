@@ -0,0 +1,309 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../telegram_bot')))
+
+import asyncio
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from reminders.models import ReminderPreference, next_fire_time
+from users.models import UserProfile
+from words.models import Card, Repetition
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+def test_next_fire_time_uses_local_time_and_quiet_days():
+    # Пятница, 2026-03-06 12:00 UTC = 15:00 в Москве
+    now = utc(2026, 3, 6, 12, 0)
+    assert next_fire_time(now, 'Europe/Moscow', 20, 30) == utc(2026, 3, 6, 17, 30)
+    assert next_fire_time(now, 'Europe/Moscow', 9, 0) == utc(2026, 3, 7, 6, 0)
+    # Суббота и воскресенье тихие — следующее в понедельник
+    assert next_fire_time(now, 'Europe/Moscow', 9, 0, frozenset({5, 6})) == utc(2026, 3, 9, 6, 0)
+    assert next_fire_time(now, 'UTC', 12, 0, offset_seconds=90) == utc(2026, 3, 6, 12, 1, 30)
+    assert next_fire_time(now, 'UTC', 9, 0, frozenset(range(7))) is None
+
+
+@pytest.mark.django_db
+def test_preference_validation():
+    user = User.objects.create_user(username='prefuser', password='123')
+    with pytest.raises(ValidationError):
+        ReminderPreference(user=user, timezone='Mars/Olympus').full_clean()
+    with pytest.raises(ValidationError):
+        ReminderPreference(user=user, hour=24).full_clean()
+    ReminderPreference(user=user, timezone='Asia/Tokyo', quiet_days='5,6').full_clean()
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append(chat_id)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_scheduler_fires_due_users_and_reschedules(django_assert_num_queries):
+    from config import Config
+    from services.reminder_service import ReminderService
+    from utils.django_utils import get_reminder_schedule
+
+    def linked_user(telegram_id, **preference):
+        user = User.objects.create_user(username=f'sched{telegram_id}', password='123')
+        UserProfile.objects.create(user=user, telegram_id=telegram_id)
+        card = Card.objects.create(user=user, word=f'w{telegram_id}', translation='t', level='beginner')
+        Repetition.objects.filter(card=card).update(next_review=utc(2026, 3, 1).date())
+        if preference:
+            ReminderPreference.objects.create(user=user, **preference)
+        return user
+
+    linked_user(51001)                                              # по умолчанию: 09:00 UTC
+    linked_user(51002, timezone='Asia/Tokyo', hour=9)               # 00:00 UTC
+    linked_user(51003, enabled=False)
+    linked_user(51004, timezone='UTC', hour=9, quiet_days='0,1,2,3,4,5,6')
+
+    with django_assert_num_queries(1):
+        schedule = get_reminder_schedule(Config.REMINDER_HOUR, Config.REMINDER_MINUTE)
+    assert {row[1] for row in schedule} == {51001, 51002, 51004}
+
+    bot = FakeBot()
+    service = ReminderService(bot)
+
+    async def run():
+        now = utc(2026, 3, 6, 8, 0)
+        await service._rebuild_queue(now)
+        # Тихие все дни — в очередь не попадает
+        assert [entry[2] for entry in sorted(service._queue)] == [51001, 51002]
+
+        # Через час наступило время только для 51001 (09:00 UTC + сдвиг не больше 5 минут)
+        later = utc(2026, 3, 6, 9, 10)
+        batch = service._pop_due(later, 10)
+        assert [entry[2] for entry in batch] == [51001]
+        await service._send_batch(batch)
+        assert bot.sent == [51001]
+
+        # Следующие: 51002 в полночь UTC, 51001 — завтра в 09:00
+        nxt = sorted(service._queue)
+        assert [entry[2] for entry in nxt] == [51002, 51001]
+        assert nxt[1][0].date() == utc(2026, 3, 7).date()
+
+    asyncio.run(run())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_due_cards_counted_on_users_local_date():
+    from services.reminder_service import ReminderService
+
+    user = User.objects.create_user(username='brisbane', password='123')
+    UserProfile.objects.create(user=user, telegram_id=51101)
+    ReminderPreference.objects.create(user=user, timezone='Australia/Brisbane', hour=9)  # UTC+10
+    card = Card.objects.create(user=user, word='sunrise', translation='рассвет', level='beginner')
+    # Сегодня по UTC слово ещё не на повторении, а по местному времени — уже завтра и пора
+    today = datetime.now(dt_timezone.utc).date()
+    local_day = today + timedelta(days=1)
+    Repetition.objects.filter(card=card).update(next_review=local_day)
+
+    bot = FakeBot()
+    service = ReminderService(bot)
+
+    async def run():
+        # 09:00 в Брисбене — 23:00 UTC предыдущего дня
+        await service._rebuild_queue(utc(today.year, today.month, today.day, 22, 0))
+        batch = service._pop_due(utc(today.year, today.month, today.day, 23, 10), 10)
+        assert [entry[2] for entry in batch] == [51101]
+        await service._send_batch(batch)
+
+    asyncio.run(run())
+    assert bot.sent == [51101]
+
+
+@pytest.mark.django_db
+def test_lease_has_single_owner():
+    from reminders.models import ReminderLease
+
+    assert ReminderLease.acquire('reminders', 'a', 60)
+    assert ReminderLease.acquire('reminders', 'a', 60)  # продление своей аренды
+    assert not ReminderLease.acquire('reminders', 'b', 60)
+    ReminderLease.release('reminders', 'b')  # чужую аренду не снимает
+    assert not ReminderLease.acquire('reminders', 'b', 60)
+    ReminderLease.release('reminders', 'a')
+    assert ReminderLease.acquire('reminders', 'b', 60)
+    # Просроченную аренду забирает другой владелец
+    ReminderLease.objects.update(expires_at=utc(2000, 1, 1))
+    assert ReminderLease.acquire('reminders', 'a', 60)
+
+
+def fleet_users(count):
+    users = []
+    for n in range(count):
+        user = User.objects.create_user(username=f'fleet{n}', password='123')
+        UserProfile.objects.create(user=user, telegram_id=52000 + n)
+        card = Card.objects.create(user=user, word=f'w{n}', translation='t', level='beginner')
+        Repetition.objects.filter(card=card).update(next_review=utc(2026, 3, 1).date())
+        users.append(user)
+    return users
+
+
+@pytest.mark.django_db(transaction=True)
+def test_two_replicas_deliver_once(monkeypatch):
+    from config import Config
+    from services.reminder_service import ReminderService
+
+    monkeypatch.setattr(Config, 'REMINDER_LEASE_RETRY', 0.01)
+    fleet_users(6)
+    bot = FakeBot()
+    replicas = [ReminderService(bot), ReminderService(bot)]
+
+    async def run():
+        now = utc(2026, 3, 6, 9, 30)
+        for service in replicas:
+            await service._rebuild_queue(utc(2026, 3, 6, 8, 0))
+        batches = [service._pop_due(now, 100) for service in replicas]
+        assert len(batches[0]) == len(batches[1]) == 6
+        await asyncio.gather(*(service._send_batch(batch) for service, batch in zip(replicas, batches)))
+
+    asyncio.run(run())
+    assert sorted(bot.sent) == [52000 + n for n in range(6)]
+
+
+class SlowBot(FakeBot):
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(0.1)
+        self.sent.append(chat_id)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_lease_renewed_while_delivery_outlasts_ttl(monkeypatch):
+    from config import Config
+    from services.reminder_service import ReminderService
+
+    # Рассылка 6 сообщений по одному занимает около 0,6 с — вдвое дольше аренды
+    monkeypatch.setattr(Config, 'REMINDER_LEASE_TTL', 0.3)
+    monkeypatch.setattr(Config, 'REMINDER_LEASE_RETRY', 0.05)
+    monkeypatch.setattr(Config, 'REMINDER_CONCURRENCY', 1)
+    fleet_users(6)
+    bot = SlowBot()
+    replicas = [ReminderService(bot), ReminderService(bot)]
+
+    async def run():
+        for service in replicas:
+            await service._rebuild_queue(utc(2026, 3, 6, 8, 0))
+        batches = [service._pop_due(utc(2026, 3, 6, 9, 30), 100) for service in replicas]
+        await asyncio.gather(*(service._send_batch(batch) for service, batch in zip(replicas, batches)))
+
+    asyncio.run(run())
+    assert sorted(bot.sent) == [52000 + n for n in range(6)]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_delivery_stops_when_lease_is_lost(monkeypatch):
+    from config import Config
+    from reminders.models import ReminderLease
+    from services.reminder_service import ReminderService
+    from utils.db import db_async
+
+    monkeypatch.setattr(Config, 'REMINDER_LEASE_TTL', 0.3)
+    monkeypatch.setattr(Config, 'REMINDER_CONCURRENCY', 1)
+    fleet_users(6)
+    bot = SlowBot()
+    service = ReminderService(bot)
+
+    def steal():
+        ReminderLease.objects.update(owner='other', expires_at=utc(2100, 1, 1))
+
+    async def run():
+        await service._rebuild_queue(utc(2026, 3, 6, 8, 0))
+        sending = asyncio.create_task(service._send_batch(service._pop_due(utc(2026, 3, 6, 9, 30), 100)))
+        await asyncio.sleep(0.15)
+        await db_async(steal)()
+        await sending
+
+    asyncio.run(run())
+    # Остановилась при первом продлении (через 0,1 с после кражи), а не разослала всё
+    assert 1 <= len(bot.sent) < 6
+
+
+@pytest.mark.django_db(transaction=True)
+def test_restarted_replica_sends_only_undelivered():
+    from reminders.models import ReminderDelivery
+    from services.reminder_service import ReminderService
+
+    users = fleet_users(4)
+    # Реплика упала, успев доставить напоминания двум пользователям
+    for user in users[:2]:
+        ReminderDelivery.objects.create(user=user, date=utc(2026, 3, 6).date())
+
+    bot = FakeBot()
+    service = ReminderService(bot)
+
+    async def run():
+        # Перезапуск в 11:00 UTC: 09:00 уже прошло, недоставленные ставятся сразу
+        now = utc(2026, 3, 6, 11, 0)
+        await service._rebuild_queue(now)
+        batch = service._pop_due(now, 100)
+        assert sorted(entry[2] for entry in batch) == [52002, 52003]
+        await service._send_batch(batch)
+
+    asyncio.run(run())
+    assert sorted(bot.sent) == [52002, 52003]
+    assert ReminderDelivery.objects.count() == 4
+
+    # Пачка читает журнал только своих пользователей, а не все записи за дни
+    from utils.django_utils import get_reminder_deliveries
+    day = utc(2026, 3, 6).date()
+    assert get_reminder_deliveries(day, user_ids=[users[0].id, users[3].id]) == {
+        (users[0].id, day), (users[3].id, day)}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_user_with_nothing_due_is_not_caught_up_later():
+    from reminders.models import ReminderDelivery
+    from services.reminder_service import ReminderService
+
+    user = fleet_users(1)[0]
+    Repetition.objects.filter(user=user).update(next_review=utc(2026, 3, 9).date())
+    bot = FakeBot()
+    service = ReminderService(bot)
+
+    async def morning():
+        await service._rebuild_queue(utc(2026, 3, 6, 8, 0))
+        await service._send_batch(service._pop_due(utc(2026, 3, 6, 9, 30), 100))
+
+    async def later():
+        await service._rebuild_queue(utc(2026, 3, 6, 11, 0))
+        return service._pop_due(utc(2026, 3, 6, 11, 0), 100)
+
+    asyncio.run(morning())
+    assert ReminderDelivery.objects.filter(user=user, date=utc(2026, 3, 6).date()).exists()
+    # В 10:00 слово стало на повторение; перестройка в 11:00 не досылает «утреннее» напоминание
+    Repetition.objects.filter(user=user).update(next_review=utc(2026, 3, 6).date())
+    assert asyncio.run(later()) == []
+    assert bot.sent == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_relinked_user_gets_reminder_in_new_chat():
+    from reminders.models import ReminderDelivery
+    from services.reminder_service import ReminderService
+
+    users = fleet_users(2)
+    bot = FakeBot()
+    service = ReminderService(bot)
+
+    async def rebuild():
+        await service._rebuild_queue(utc(2026, 3, 6, 8, 0))
+
+    async def deliver():
+        await service._send_batch(service._pop_due(utc(2026, 3, 6, 9, 30), 100))
+
+    asyncio.run(rebuild())
+    # Между перестройкой кучи и рассылкой пользователь перепривязал Telegram
+    UserProfile.objects.filter(user=users[0]).update(telegram_id=53000)
+    asyncio.run(deliver())
+
+    assert sorted(bot.sent) == [52001, 53000]
+    assert set(ReminderDelivery.objects.values_list('user_id', flat=True)) == {users[0].id, users[1].id}
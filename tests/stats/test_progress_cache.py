@@ -0,0 +1,90 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../telegram_bot')))
+
+import threading
+import time
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+
+from lingua_track import cache as shared_cache
+from lingua_track.cache import get_or_compute
+from stats.models import UserStats
+from words.models import Card
+
+
+def run_threads(count, target):
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def worker(n):
+        barrier.wait()
+        try:
+            results[n] = target()
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+@pytest.mark.django_db(transaction=True)
+def test_one_recompute_for_100_concurrent_progress_requests(monkeypatch):
+    from utils.django_utils import get_user_progress
+
+    user = User.objects.create_user(username='stampede', password='123')
+    for i in range(3):
+        Card.objects.create(user=user, word=f'w{i}', translation=f't{i}', level='beginner')
+    UserStats.objects.filter(user=user).delete()
+    cache.clear()
+
+    rebuilds = []
+    original = UserStats.rebuild.__func__
+
+    def slow_rebuild(cls, user):
+        rebuilds.append(1)
+        time.sleep(0.2)  # пересчёт долгий — остальные запросы успевают прийти
+        return original(cls, user)
+
+    monkeypatch.setattr(UserStats, 'rebuild', classmethod(slow_rebuild))
+    results = run_threads(100, lambda: get_user_progress(user))
+
+    assert len(rebuilds) == 1
+    assert all(result == results[0] for result in results)
+    assert results[0]['total_cards'] == 3
+
+
+def test_stale_value_served_while_one_refreshes():
+    cache.set('swr', ('old', time.time() - 1, 0.0), 60)
+    computes = []
+
+    def compute():
+        computes.append(1)
+        time.sleep(0.2)
+        return 'new'
+
+    results = run_threads(20, lambda: get_or_compute('swr', compute, ttl=60))
+
+    assert len(computes) == 1
+    assert sorted(results) == ['new'] + ['old'] * 19
+    assert get_or_compute('swr', compute, ttl=60) == 'new'
+    cache.delete('swr')
+
+
+def test_hot_key_recomputed_early(monkeypatch):
+    # До срока 1 с, а вычисление занимает 10 с: XFetch почти всегда пересчитывает заранее
+    cache.set('xfetch', ('old', time.time() + 1, 10.0), 60)
+    monkeypatch.setattr(shared_cache.random, 'random', lambda: 0.5)
+    assert get_or_compute('xfetch', lambda: 'new', ttl=60) == 'new'
+
+    # Свежая запись с быстрым вычислением раньше срока не пересчитывается
+    cache.set('xfetch', ('old', time.time() + 60, 0.01), 60)
+    assert get_or_compute('xfetch', lambda: 'new', ttl=60) == 'old'
+    cache.delete('xfetch')
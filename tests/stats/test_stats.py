@@ -7,4 +7,55 @@ def test_stats_card_count():
     user = User.objects.create_user(username='statsuser', password='123')
     Card.objects.create(user=user, word='one', translation='один', level='beginner')
     Card.objects.create(user=user, word='two', translation='два', level='beginner')
-    assert Card.objects.filter(user=user).count() == 2 
\ No newline at end of file
+    assert Card.objects.filter(user=user).count() == 2 
+
+@pytest.mark.django_db
+def test_test_accuracy_stored_and_aggregated(client):
+    from stats import models as stats_models
+    from stats.views import summarize_tests
+    user = User.objects.create_user(username='accuser', password='123')
+    for score, test_type in [(1, 'typing'), (2, 'typing'), (3, 'matching')]:
+        stats_models.TestResult.objects.create(user=user, test_type=test_type, direction='en-ru', score=score, total=3)
+
+    results = stats_models.TestResult.objects.filter(user=user)
+    assert sorted(results.values_list('accuracy', flat=True)) == [33.3, 66.7, 100.0]
+
+    total, avg_accuracy, by_type = summarize_tests(results)
+    assert total == 3
+    assert round(avg_accuracy, 1) == 66.7
+    typing = next(row for row in by_type if row['test_type'] == 'typing')
+    assert typing['count'] == 2
+    assert typing['best_score'] == 2
+    assert round(typing['avg_accuracy'], 1) == 50.0
+
+    client.force_login(user)
+    response = client.get('/stats/test-history/?test_type=typing')
+    assert response.context['total_tests'] == 2
+    assert response.context['current_filters']['test_type'] == 'typing'
+    assert client.get('/stats/charts/').status_code == 200
+    assert client.get('/stats/').status_code == 200
+
+@pytest.mark.django_db
+def test_daily_activity_rollup(client):
+    from django.utils import timezone
+    from stats import models as stats_models
+    from words.models import Repetition
+    from words.utils import update_sm2_batch
+    user = User.objects.create_user(username='dailyuser', password='123')
+    Card.objects.create(user=user, word='one', translation='один', level='beginner')
+    Card.objects.create(user=user, word='two', translation='два', level='beginner')
+    reps = list(Repetition.objects.filter(user=user))
+    update_sm2_batch([(reps[0], 5), (reps[1], 1)])
+    stats_models.TestResult.objects.create(user=user, test_type='typing', direction='en-ru', score=1, total=2)
+    stats_models.TestResult.objects.create(user=user, test_type='typing', direction='en-ru', score=2, total=2)
+
+    today = stats_models.DailyActivity.objects.get(user=user, day=timezone.now().date())
+    assert (today.reviews, today.successes, today.tests) == (2, 1, 2)
+    assert today.avg_accuracy == 75.0
+
+    client.force_login(user)
+    for window in ('7', '30', '365', 'all'):
+        response = client.get(f'/stats/charts/?window={window}')
+        assert response.status_code == 200
+        assert response.context['daily_review_stats'][0]['reviews'] == 2
+    assert client.get('/stats/charts/?window=bogus').context['window'] == '30'
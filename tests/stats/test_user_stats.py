@@ -0,0 +1,69 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from words.models import Card
+from words.utils import apply_reviews
+from stats import models as stats_models
+from stats.models import UserStats
+
+COUNTERS = [
+    'total_cards', 'beginner_cards', 'intermediate_cards', 'advanced_cards',
+    'total_reviews', 'successful_reviews', 'failed_reviews', 'total_tests',
+]
+
+
+def snapshot(user_stats):
+    data = {field: getattr(user_stats, field) for field in COUNTERS}
+    data['tests_accuracy'] = round(user_stats.tests_accuracy, 6)
+    return data
+
+
+@pytest.mark.django_db
+def test_incremental_stats_match_rebuild():
+    user = User.objects.create_user(username='incstats', password='123')
+    UserStats.for_user(user)
+
+    cards = [Card.objects.create(user=user, word=f'w{i}', translation=f't{i}', level='beginner') for i in range(4)]
+    cards[0].level = 'advanced'
+    cards[0].save()
+    apply_reviews(user, [(cards[0].id, 5), (cards[1].id, 1), (cards[1].id, 4)])
+    stats_models.TestResult.objects.create(user=user, test_type='typing', direction='en-ru', score=2, total=3)
+    stats_models.TestResult.objects.create(user=user, test_type='typing', direction='en-ru', score=3, total=3)
+    cards[1].delete()
+
+    incremental = snapshot(UserStats.objects.get(user=user))
+    assert incremental['total_cards'] == 3
+    assert incremental['advanced_cards'] == 1
+    assert incremental['total_reviews'] == 1
+    assert incremental['total_tests'] == 2
+    assert incremental == snapshot(UserStats.rebuild(user))
+
+
+@pytest.mark.django_db
+def test_rebuild_user_stats_command():
+    user = User.objects.create_user(username='repairstats', password='123')
+    Card.objects.create(user=user, word='one', translation='один', level='intermediate')
+    UserStats.for_user(user)
+    UserStats.objects.filter(user=user).update(total_cards=100)
+
+    call_command('rebuild_user_stats', user='repairstats')
+    assert UserStats.objects.get(user=user).total_cards == 1
+
+
+@pytest.mark.django_db
+def test_delta_during_first_rebuild_not_lost(monkeypatch):
+    user = User.objects.create_user(username='racestats', password='123')
+    Card.objects.create(user=user, word='one', translation='один', level='beginner')
+    # Выборка первого пересчёта в for_user сделана до второй карточки
+    stale = snapshot(UserStats.rebuild(user))
+    UserStats.objects.filter(user=user).delete()
+
+    def lock_while_rebuild_commits(user_id):
+        # Пока apply_delta ждал блокировку, параллельный for_user записал строку по своей выборке
+        UserStats.objects.create(user_id=user_id, **stale)
+
+    monkeypatch.setattr(stats_models, '_lock_user', lock_while_rebuild_commits)
+    Card.objects.create(user=user, word='two', translation='два', level='beginner')
+
+    assert UserStats.objects.get(user=user).total_cards == 2
+    assert snapshot(UserStats.objects.get(user=user)) == snapshot(UserStats.rebuild(user))
@@ -0,0 +1,29 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../telegram_bot')))
+
+import asyncio
+import threading
+
+import pytest
+
+from utils.db import db_async
+
+
+# Пул закрывает устаревшие соединения вокруг каждого вызова — нужен доступ к базе
+@pytest.mark.django_db
+def test_db_async_runs_chats_in_parallel():
+    # Оба вызова ждут друг друга на барьере: в одном общем потоке это бы зависло
+    barrier = threading.Barrier(2, timeout=5)
+
+    def query(n):
+        barrier.wait()
+        return n, threading.current_thread().name
+
+    async def run():
+        return await asyncio.gather(db_async(query)(1), db_async(query)(2))
+
+    results = asyncio.run(run())
+    assert [n for n, _ in results] == [1, 2]
+    assert all(name.startswith('bot-db') for _, name in results)
+    assert results[0][1] != results[1][1]
@@ -0,0 +1,165 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../telegram_bot')))
+
+import asyncio
+
+from aiohttp import web
+
+from services.http_client import HttpClient, CircuitBreaker
+
+
+async def stub_server(handler):
+    """Локальный сервер-заглушка API сайта на свободном порту"""
+    app = web.Application()
+    app.router.add_post('/api/', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f'http://127.0.0.1:{port}/api/'
+
+
+def run_with_server(handler, scenario):
+    async def main():
+        runner, url = await stub_server(handler)
+        try:
+            return await scenario(url)
+        finally:
+            await runner.cleanup()
+    return asyncio.run(main())
+
+
+def test_retries_server_errors_then_succeeds():
+    calls = []
+
+    async def handler(request):
+        calls.append(await request.json())
+        if len(calls) < 3:
+            return web.json_response({'error': 'busy'}, status=503)
+        return web.json_response({'success': True, 'echo': calls[-1]['n']})
+
+    async def scenario(url):
+        client = HttpClient(retries=3, backoff_factor=0)
+        try:
+            return await client.post_json(url, {'n': 7})
+        finally:
+            await client.close()
+
+    assert run_with_server(handler, scenario) == {'success': True, 'echo': 7}
+    assert len(calls) == 3
+
+
+def test_client_error_body_returned_without_retry():
+    calls = []
+
+    async def handler(request):
+        calls.append(1)
+        return web.json_response({'success': False, 'error': 'Неверный токен'}, status=400)
+
+    async def scenario(url):
+        client = HttpClient(retries=3, backoff_factor=0)
+        try:
+            return await client.post_json(url, {})
+        finally:
+            await client.close()
+
+    assert run_with_server(handler, scenario) == {'success': False, 'error': 'Неверный токен'}
+    assert calls == [1]
+
+
+def test_slow_site_does_not_block_event_loop():
+    async def handler(request):
+        await asyncio.sleep(1)
+        return web.json_response({'success': True})
+
+    async def scenario(url):
+        client = HttpClient(retries=0, timeout=0.3)
+        ticks = 0
+
+        async def other_chat():
+            nonlocal ticks
+            for _ in range(5):
+                await asyncio.sleep(0.02)
+                ticks += 1
+
+        try:
+            result, _ = await asyncio.gather(client.post_json(url, {}), other_chat())
+        finally:
+            await client.close()
+        return result, ticks
+
+    result, ticks = run_with_server(handler, scenario)
+    # Таймаут запроса — ошибка, а другие корутины всё это время работали
+    assert result['success'] is False
+    assert ticks == 5
+
+
+def test_circuit_breaker_opens_and_probes():
+    now = [0.0]
+    calls = []
+    healthy = [False]
+
+    async def handler(request):
+        calls.append(1)
+        if healthy[0]:
+            return web.json_response({'success': True})
+        return web.json_response({}, status=500)
+
+    async def scenario(url):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=lambda: now[0])
+        client = HttpClient(retries=0, breaker=breaker)
+        try:
+            await client.post_json(url, {})
+            await client.post_json(url, {})
+            assert breaker.state == CircuitBreaker.OPEN
+            # Цепь разомкнута: сайт не вызывается
+            skipped = await client.post_json(url, {})
+            assert skipped['success'] is False and len(calls) == 2
+
+            # Через reset_timeout проходит пробный запрос; неудача снова размыкает цепь
+            now[0] = 31
+            await client.post_json(url, {})
+            assert len(calls) == 3 and breaker.state == CircuitBreaker.OPEN
+
+            now[0] = 62
+            healthy[0] = True
+            assert await client.post_json(url, {}) == {'success': True}
+            assert breaker.state == CircuitBreaker.CLOSED
+        finally:
+            await client.close()
+
+    run_with_server(handler, scenario)
+
+
+def test_non_idempotent_post_retried_only_when_not_processed():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.headers.get('X-Case'))
+        status = {'slow': 504, 'throttled': 429}[request.headers['X-Case']]
+        if calls.count('throttled') == 2:
+            return web.json_response({'success': True})
+        return web.json_response({}, status=status, headers={'Retry-After': '600'})
+
+    async def scenario(url):
+        client = HttpClient(retries=3, backoff_factor=0, max_retry_after=0.01)
+        session = client._get_session()
+        try:
+            # 5xx: сайт мог успеть сохранить отзыв — повтора нет
+            session.headers['X-Case'] = 'slow'
+            slow = await client.post_json(url, {}, idempotent=False)
+            # 429: запрос отклонён — повтор безопасен, Retry-After ограничен max_retry_after
+            session.headers['X-Case'] = 'throttled'
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            throttled = await client.post_json(url, {}, idempotent=False)
+            return slow, throttled, loop.time() - start
+        finally:
+            await client.close()
+
+    slow, throttled, elapsed = run_with_server(handler, scenario)
+    assert slow['success'] is False and throttled == {'success': True}
+    assert calls == ['slow', 'throttled', 'throttled']
+    assert elapsed < 1
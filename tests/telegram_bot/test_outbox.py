@@ -0,0 +1,131 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../telegram_bot')))
+
+import asyncio
+import time
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import AnswerCallbackQuery, EditMessageText, SendMessage
+
+from services.outbox import Outbox
+
+
+class FakeApi:
+    """make_request для Outbox: записывает отправленные методы, может ответить 429"""
+
+    def __init__(self, flood_first=0):
+        self.calls = []
+        self.flood_left = flood_first
+
+    async def __call__(self, bot, method):
+        if self.flood_left:
+            self.flood_left -= 1
+            raise TelegramRetryAfter(method, 'Too Many Requests', retry_after=0)
+        self.calls.append((time.monotonic(), method))
+        return getattr(method, 'text', None) or True
+
+
+def test_rapid_edits_coalesced_and_chat_order_kept():
+    api = FakeApi()
+
+    async def main():
+        outbox = Outbox(chat_rate=20, chat_burst=1, metrics_interval=None)
+        sent = asyncio.create_task(outbox(api, None, SendMessage(chat_id=1, text='list')))
+        await asyncio.sleep(0)
+        # Листание: три правки одного сообщения, пока чат ждёт своей очереди
+        edits = [
+            asyncio.create_task(outbox(api, None, EditMessageText(chat_id=1, message_id=5, text=f'page {n}')))
+            for n in (2, 3, 4)
+        ]
+        other = asyncio.create_task(outbox(api, None, SendMessage(chat_id=2, text='other')))
+        results = await asyncio.gather(sent, *edits, other)
+        await outbox.close()
+        return results, outbox.metrics.snapshot()
+
+    results, metrics = asyncio.run(main())
+    # Все ожидающие правки получили результат последней
+    assert results == ['list', 'page 4', 'page 4', 'page 4', 'other']
+    chat_1 = [method.text for _, method in api.calls if method.chat_id == 1]
+    assert chat_1 == ['list', 'page 4']
+    assert metrics['coalesced'] == 2 and metrics['sent'] == 3 and metrics['depth'] == 0
+
+
+def test_edit_not_coalesced_past_later_message():
+    api = FakeApi()
+
+    async def main():
+        outbox = Outbox(chat_rate=20, chat_burst=1, metrics_interval=None)
+        first = asyncio.create_task(outbox(api, None, SendMessage(chat_id=1, text='list')))
+        await asyncio.sleep(0)
+        # Правка, затем новое сообщение, затем ещё правка того же сообщения
+        requests = [
+            EditMessageText(chat_id=1, message_id=5, text='page 2'),
+            SendMessage(chat_id=1, text='reply'),
+            EditMessageText(chat_id=1, message_id=5, text='page 3'),
+            EditMessageText(chat_id=1, message_id=5, text='page 4'),
+        ]
+        tasks = [asyncio.create_task(outbox(api, None, method)) for method in requests]
+        await asyncio.gather(first, *tasks)
+        await outbox.close()
+        return outbox.metrics.snapshot()
+
+    metrics = asyncio.run(main())
+    # Последняя правка не обгоняет сообщение, отправленное после первой; подряд идущие сливаются
+    assert [method.text for _, method in api.calls] == ['list', 'page 2', 'reply', 'page 4']
+    assert metrics['coalesced'] == 1
+
+
+def test_chat_rate_limit_spaces_messages():
+    api = FakeApi()
+
+    async def main():
+        outbox = Outbox(chat_rate=20, chat_burst=2, metrics_interval=None)
+        await asyncio.gather(*(outbox(api, None, SendMessage(chat_id=7, text=str(n))) for n in range(5)))
+        await outbox.close()
+
+    asyncio.run(main())
+    assert [method.text for _, method in api.calls] == ['0', '1', '2', '3', '4']
+    # Два сообщения сразу, затем не чаще одного в 50 мс
+    assert api.calls[-1][0] - api.calls[0][0] >= 0.14
+
+
+def test_retry_after_is_retried_and_other_methods_pass_through():
+    api = FakeApi(flood_first=2)
+
+    async def main():
+        outbox = Outbox(metrics_interval=None)
+        result = await outbox(api, None, SendMessage(chat_id=3, text='hello'))
+        answered = await outbox(api, None, AnswerCallbackQuery(callback_query_id='q'))
+        await outbox.close()
+        return result, answered, outbox.metrics.snapshot()
+
+    result, answered, metrics = asyncio.run(main())
+    assert result == 'hello' and answered is True
+    assert metrics['retried'] == 2 and metrics['sent'] == 1
+
+
+def test_retry_after_pauses_only_flooded_chat():
+    start = time.monotonic()
+    calls = []
+
+    async def api(bot, method):
+        if method.chat_id == 1 and not calls:
+            calls.append(None)
+            raise TelegramRetryAfter(method, 'Too Many Requests', retry_after=1)
+        calls.append((time.monotonic() - start, method.chat_id))
+        return True
+
+    async def main():
+        outbox = Outbox(metrics_interval=None)
+        flooded = asyncio.create_task(outbox(api, None, SendMessage(chat_id=1, text='a')))
+        await asyncio.sleep(0)
+        await asyncio.gather(*(outbox(api, None, SendMessage(chat_id=chat_id, text='b')) for chat_id in (2, 3)))
+        await flooded
+        await outbox.close()
+
+    asyncio.run(main())
+    elapsed = {chat_id: at for at, chat_id in calls[1:]}
+    # Другие чаты не ждут паузы первого
+    assert elapsed[2] < 0.5 and elapsed[3] < 0.5
+    assert elapsed[1] >= 1
@@ -0,0 +1,37 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../telegram_bot')))
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from aiogram.filters import CommandObject
+
+from config import Config
+
+
+class FakeMessage:
+    def __init__(self, telegram_id):
+        self.from_user = SimpleNamespace(id=telegram_id)
+        self.answers = []
+
+    async def answer(self, text, **kwargs):
+        self.answers.append(text)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reminder_command_for_unlinked_chat():
+    from django.contrib.auth.models import User
+    from reminders.models import ReminderPreference
+    from routers.commands import cmd_reminder
+
+    # Учётка telegram_<id> осталась после перепривязки, профиля с этим chat id нет:
+    # get_user_by_telegram_id не может создать пользователя и возвращает None
+    User.objects.create_user(username='telegram_36001', password='123')
+
+    message = FakeMessage(36001)
+    asyncio.run(cmd_reminder(message, CommandObject(command='reminder', args='20:30')))
+
+    assert message.answers == [Config.MESSAGES['not_registered']]
+    assert not ReminderPreference.objects.exists()
@@ -0,0 +1,119 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../telegram_bot')))
+
+import asyncio
+import pytest
+from django.contrib.auth.models import User
+from django.utils import timezone
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError
+from aiogram.methods import SendMessage
+from users.models import UserProfile
+from words.models import Card, Repetition
+from utils.django_utils import get_due_reminders
+from services.delivery import RateLimitedSender, TokenBucket
+
+
+def make_due_cards(user, count, due=True):
+    today = timezone.now().date()
+    for i in range(count):
+        card = Card.objects.create(user=user, word=f'{user.username}{i}', translation=f't{i}', level='beginner')
+        next_review = today - timezone.timedelta(days=count - i) if due else today + timezone.timedelta(days=3)
+        Repetition.objects.filter(card=card).update(next_review=next_review)
+
+
+@pytest.mark.django_db
+def test_due_reminders_single_query(django_assert_num_queries):
+    bot_user = User.objects.create_user(username='telegram_41001', password='123')
+    UserProfile.objects.create(user=bot_user, telegram_id=41001)
+    make_due_cards(bot_user, 7)
+    # Пользователь сайта с привязанным Telegram тоже получает напоминания
+    web_user = User.objects.create_user(username='webuser', password='123')
+    UserProfile.objects.create(user=web_user, telegram_id=41002)
+    make_due_cards(web_user, 2)
+    # Без Telegram и без слов на сегодня — напоминаний нет
+    make_due_cards(User.objects.create_user(username='nolink', password='123'), 3)
+    idle = User.objects.create_user(username='idle', password='123')
+    UserProfile.objects.create(user=idle, telegram_id=41003)
+    make_due_cards(idle, 2, due=False)
+
+    with django_assert_num_queries(1):
+        reminders = get_due_reminders()
+
+    by_chat = {r['telegram_id']: r for r in reminders}
+    assert set(by_chat) == {41001, 41002}
+    assert by_chat[41001]['due_count'] == 7
+    assert [word for word, _, _ in by_chat[41001]['cards']] == [f'telegram_41001{i}' for i in range(5)]
+    assert by_chat[41002]['due_count'] == 2
+    assert len(by_chat[41002]['cards']) == 2
+    assert by_chat[41002]['user_id'] == web_user.id
+
+
+class FakeBot:
+    def __init__(self, fail=None):
+        self.sent = []
+        self.fail = fail or {}
+
+    async def send_message(self, chat_id, text, **kwargs):
+        errors = self.fail.get(chat_id)
+        if errors:
+            raise errors.pop(0)
+        self.sent.append(chat_id)
+
+
+def test_sender_retries_after_429_and_skips_blocked_chats():
+    method = SendMessage(chat_id=1, text='x')
+    bot = FakeBot(fail={
+        1: [TelegramRetryAfter(method=method, message='Too Many Requests', retry_after=0)],
+        2: [TelegramForbiddenError(method=method, message='bot was blocked by the user')],
+    })
+    sender = RateLimitedSender(bot, global_rate=1000, chat_interval=0)
+    result = asyncio.run(sender.send_many([(1, 'a'), (2, 'b'), (3, 'c')]))
+    assert result == {'sent': 2, 'failed': 1}
+    assert sorted(bot.sent) == [1, 3]
+
+
+def test_sender_respects_global_rate():
+    bot = FakeBot()
+    sender = RateLimitedSender(bot, global_rate=50, chat_interval=0)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await sender.send_many([(chat_id, 'x') for chat_id in range(100)])
+        return loop.time() - start
+
+    # 50 сообщений уходят сразу (ёмкость корзины), остальные 50 — не быстрее 50 в секунду
+    assert asyncio.run(run()) >= 0.9
+    assert len(bot.sent) == 100
+
+
+def test_concurrent_pauses_do_not_add_up():
+    now = [100.0]
+    bucket = TokenBucket(10, clock=lambda: now[0])
+    # 16 запросов, отправленных вместе, получили 429 с retry_after=30
+    for _ in range(16):
+        bucket.pause(30)
+    assert bucket.try_acquire() == pytest.approx(30.1)
+
+    now[0] += 30
+    assert bucket.try_acquire() == pytest.approx(0.1)
+    now[0] += 0.2
+    assert bucket.try_acquire() == 0
+
+
+def test_sender_behind_outbox_adds_no_throttling_or_retries():
+    method = SendMessage(chat_id=1, text='x')
+    # Общая очередь уже исчерпала свои повторы и вернула 429
+    bot = FakeBot(fail={1: [TelegramRetryAfter(method=method, message='Too Many Requests', retry_after=30)]})
+    sender = RateLimitedSender(bot, global_rate=None, chat_interval=0, max_retries=0)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        result = await sender.send_many([(chat_id, 'x') for chat_id in range(1, 101)])
+        return result, loop.time() - start
+
+    result, elapsed = asyncio.run(run())
+    assert result == {'sent': 99, 'failed': 1}
+    assert elapsed < 1
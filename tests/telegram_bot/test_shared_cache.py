@@ -0,0 +1,80 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../telegram_bot')))
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils import timezone
+
+from lingua_track.cache import user_cache_key, user_cache_version, user_versions
+from words.models import Card, Repetition
+from words.utils import update_sm2
+
+
+@pytest.fixture
+def file_cache(settings, tmp_path):
+    # Файловый кэш вместо общего (Redis, база): как и у сайта с ботом, записи видны всем процессам
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(tmp_path / 'cache'),
+        }
+    }
+    yield cache
+    cache.clear()
+
+
+@pytest.mark.django_db
+def test_writes_on_site_refresh_bot_cache(file_cache, django_assert_num_queries):
+    from utils.django_utils import get_today_cards, get_user_progress
+
+    user = User.objects.create_user(username='cacheuser', password='123')
+    card = Card.objects.create(user=user, word='fresh', translation='свежий', level='beginner')
+
+    assert [c.word for c in get_today_cards(user)] == ['fresh']
+    assert get_user_progress(user)['total_tests'] == 0
+    with django_assert_num_queries(0):
+        assert [c.word for c in get_today_cards(user)] == ['fresh']
+        get_user_progress(user)
+
+    # Повторение на сайте: слово уходит из списка на сегодня сразу, без ожидания TTL
+    update_sm2(Repetition.objects.get(card=card), 5)
+    assert get_today_cards(user) == []
+
+    from stats.models import TestResult
+    TestResult.objects.create(user=user, test_type='typing', direction='en-ru', score=3, total=4)
+    assert get_user_progress(user)['total_tests'] == 1
+
+    card.delete()
+    assert get_user_progress(user)['total_cards'] == 0
+
+
+@pytest.mark.django_db
+def test_version_is_per_user_and_survives_eviction(file_cache):
+    first = User.objects.create_user(username='ver1', password='123')
+    second = User.objects.create_user(username='ver2', password='123')
+
+    key = user_cache_key('today_cards', second.id)
+    Card.objects.create(user=first, word='w', translation='t')
+    # Запись карточки другого пользователя чужой кэш не сбрасывает
+    assert user_cache_key('today_cards', second.id) == key
+
+    old_version = user_cache_version(first.id)
+    cache.delete(f'user_ver:{first.id}')
+    user_versions.clear_local()  # как в другом процессе или через VERSION_LOCAL_TTL
+    assert user_cache_version(first.id) != old_version
+
+
+@pytest.mark.django_db
+def test_today_cards_cached_as_plain_tuples(file_cache):
+    from utils.django_utils import CardRecord, get_today_cards
+
+    user = User.objects.create_user(username='compact', password='123')
+    card = Card.objects.create(user=user, word='slim', translation='тонкий', level='advanced')
+
+    assert get_today_cards(user) == [CardRecord(card.id, 'slim', 'тонкий', 'advanced')]
+    # В кэше только кортежи встроенных типов: их читает любой процесс без импорта модулей бота
+    cached = cache.get(user_cache_key('today_cards', user.id, timezone.now().date()))
+    assert cached == [(card.id, 'slim', 'тонкий', 'advanced')] and type(cached[0]) is tuple
+    assert get_today_cards(user)[0].level == 'advanced'
@@ -0,0 +1,99 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../telegram_bot')))
+
+import asyncio
+import json
+
+import pytest
+from aiohttp import web
+from django.contrib.auth.models import User
+
+from feedback.models import Feedback
+from users.models import UserProfile, TelegramLinkToken
+
+
+@pytest.mark.django_db(transaction=True)
+def test_local_gateway_links_account_and_issues_auth_token():
+    from services.site_gateway import LocalSiteGateway
+
+    user = User.objects.create_user(username='gateuser', email='gate@example.com', password='123')
+    token = TelegramLinkToken.generate_token(user=user, token_type='link').token
+    gateway = LocalSiteGateway()
+
+    async def run():
+        linked = await gateway.link_telegram(token, 61001, 'gate_tg')
+        reused = await gateway.link_telegram(token, 61002, 'other')
+        auth = await gateway.generate_auth_token(61001)
+        missing = await gateway.generate_auth_token(61999)
+        return linked, reused, auth, missing
+
+    linked, reused, auth, missing = asyncio.run(run())
+    assert linked == {'success': True, 'user_id': user.id, 'username': 'gateuser'}
+    assert reused == {'success': False, 'error': 'Invalid or expired token'}
+    assert UserProfile.objects.get(user=user).telegram_id == 61001
+    assert auth['success'] and '/users/telegram-auth/?token=' in auth['auth_url']
+    assert missing == {'success': False, 'error': 'User not found'}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_local_gateway_feedback():
+    from services.site_gateway import LocalSiteGateway
+
+    gateway = LocalSiteGateway()
+    assert asyncio.run(gateway.send_feedback('  Отличный бот  ', 61003))['success']
+    assert not asyncio.run(gateway.send_feedback('   ', 61003))['success']
+    assert list(Feedback.objects.values_list('text', 'telegram_id')) == [('Отличный бот', 61003)]
+
+
+@pytest.mark.django_db
+def test_site_api_uses_same_services(client):
+    user = User.objects.create_user(username='apiuser', email='api@example.com', password='123')
+    token = TelegramLinkToken.generate_token(user=user, token_type='link').token
+
+    response = client.post('/users/api/v1/telegram-link-callback/',
+                           data=json.dumps({'token': token, 'telegram_id': 61004}),
+                           content_type='application/json')
+    assert response.json() == {'success': True, 'user_id': user.id, 'username': 'apiuser'}
+
+    response = client.post('/users/api/v1/telegram-link-callback/',
+                           data=json.dumps({'token': token, 'telegram_id': 61004}),
+                           content_type='application/json')
+    assert response.status_code == 400
+
+    response = client.post('/users/api/v1/generate-auth-token/',
+                           data=json.dumps({'telegram_id': 61004}),
+                           content_type='application/json')
+    assert response.json()['auth_url'].startswith('http://testserver/users/telegram-auth/?token=')
+
+
+def test_http_gateway_posts_to_site_api():
+    from services.http_client import HttpClient
+    from services.site_gateway import HttpSiteGateway
+
+    received = []
+
+    async def handler(request):
+        received.append((request.path, await request.json()))
+        return web.json_response({'success': True})
+
+    async def main():
+        app = web.Application()
+        app.router.add_post('/{tail:.*}', handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', 0).start()
+        client = HttpClient(retries=0)
+        gateway = HttpSiteGateway(client, f'http://127.0.0.1:{runner.addresses[0][1]}')
+        try:
+            await gateway.link_telegram('tok', 61005, 'name')
+            await gateway.send_feedback('текст', 61005)
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    asyncio.run(main())
+    assert received == [
+        ('/users/api/v1/telegram-link-callback/', {'token': 'tok', 'telegram_id': 61005, 'telegram_username': 'name'}),
+        ('/feedback/api/telegram/', {'text': 'текст', 'telegram_id': 61005}),
+    ]
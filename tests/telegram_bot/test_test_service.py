@@ -17,7 +17,7 @@ def test_create_test():
     # Создаём карточки для теста
     for i in range(5):
         card = Card.objects.create(user=user, word=f'word{i}', translation=f'trans{i}', level='beginner')
-        Repetition.objects.create(card=card, user=user)
+        Repetition.objects.get_or_create(card=card, user=user)
     
     test_data = TestService.create_test(7777)
     assert test_data is not None
@@ -31,7 +31,7 @@ def test_process_answer():
     profile = UserProfile.objects.create(user=user, telegram_id=8888)
     
     card = Card.objects.create(user=user, word='test', translation='тест', level='beginner')
-    Repetition.objects.create(card=card, user=user)
+    Repetition.objects.get_or_create(card=card, user=user)
     
     # Создаём тест
     test_data = TestService.create_test(8888)
@@ -51,7 +51,7 @@ def test_finish_test():
     # Создаём карточки и тест
     for i in range(3):
         card = Card.objects.create(user=user, word=f'word{i}', translation=f'trans{i}', level='beginner')
-        Repetition.objects.create(card=card, user=user)
+        Repetition.objects.get_or_create(card=card, user=user)
     
     test_data = TestService.create_test(9999)
     assert test_data is not None
@@ -64,4 +64,76 @@ def test_finish_test():
     results = TestService.finish_test(9999)
     assert results is not None
     assert 'total_questions' in results
-    assert 'correct_answers' in results 
\ No newline at end of file
+    assert 'correct_answers' in results 
+@pytest.mark.django_db
+def test_create_test_length():
+    user = User.objects.create_user(username='testuser4', password='123')
+    from users.models import UserProfile
+    UserProfile.objects.create(user=user, telegram_id=4444)
+    Card.objects.bulk_create([Card(user=user, word=f'w{i}', translation=f't{i}') for i in range(40)])
+
+    test_data = TestService.create_test(4444, 12)
+    assert len(test_data['cards']) == 12
+    assert len({card_id for card_id, _, _ in test_data['cards']}) == 12
+
+@pytest.mark.django_db
+def test_questions_need_no_queries(django_assert_num_queries):
+    user = User.objects.create_user(username='testuser5', password='123')
+    from users.models import UserProfile
+    UserProfile.objects.create(user=user, telegram_id=5050)
+    Card.objects.bulk_create([Card(user=user, word=f'w{i}', translation=f't{i}') for i in range(20)])
+
+    test_data = TestService.create_test(5050, 5)
+    for card_id, word, translation in test_data['cards']:
+        with django_assert_num_queries(0):
+            question = TestService.get_current_question(5050)
+        assert (question['card_id'], question['word']) == (card_id, word)
+        assert len(question['answers']) == 4
+        assert len(set(question['answers'])) == 4
+        assert translation in question['answers']
+        TestService.process_answer(5050, translation)
+    TestService.remove_test(5050)
+
+
+def test_memory_session_store_bounded_and_expiring():
+    from lingua_track.cache import LRUTTLCache
+    from services.session_store import MemorySessionStore
+
+    now = [0.0]
+    store = MemorySessionStore(max_size=2, ttl=60)
+    store._cache = LRUTTLCache(max_size=2, ttl=60, clock=lambda: now[0])
+    store.set(1, {'cards': [[1, 'a', 'б']]})
+    store.set(2, {'cards': []})
+    assert store.get(1) == {'cards': [[1, 'a', 'б']]}
+    store.set(3, {'cards': []})  # вытесняет давно не использованный тест 2
+    assert store.get(2) is None
+    assert len(store) == 2
+
+    now[0] = 61
+    assert store.get(1) is None
+    assert store.get(3) is None
+
+
+@pytest.mark.django_db
+def test_cache_session_store_shared_between_services():
+    from services.session_store import CacheSessionStore
+    user = User.objects.create_user(username='testuser6', password='123')
+    from users.models import UserProfile
+    UserProfile.objects.create(user=user, telegram_id=6060)
+    for i in range(4):
+        Card.objects.create(user=user, word=f'word{i}', translation=f'trans{i}', level='beginner')
+
+    original = TestService.store
+    TestService.store = CacheSessionStore(ttl=60)
+    try:
+        test_data = TestService.create_test(6060, 2)
+        # Другой процесс бота с тем же кэшем видит тот же тест
+        other_worker = CacheSessionStore(ttl=60)
+        assert other_worker.get(6060) == test_data
+        TestService.process_answer(6060, test_data['cards'][0][2])
+        assert other_worker.get(6060)['correct_answers'] == 1
+        results = TestService.finish_test(6060)
+        assert results['correct_answers'] == 1
+        assert other_worker.get(6060) is None
+    finally:
+        TestService.store = original
@@ -0,0 +1,67 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../telegram_bot')))
+
+import time
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+from lingua_track import cache as shared_cache
+from lingua_track.cache import TwoTierCache
+from words.models import Card, Repetition
+
+
+def test_counters_per_tier():
+    tiers = TwoTierCache(local_size=10, local_ttl=60)
+    assert tiers.get('tt:missing') is None
+    tiers.set('tt:key', 'value', 60)
+    assert tiers.get('tt:key') == 'value'
+
+    # Другой процесс: LRU пустой, значение берётся из общего кэша и оседает в LRU
+    other = TwoTierCache(local_size=10, local_ttl=60)
+    assert other.get('tt:key') == 'value'
+    assert other.get('tt:key') == 'value'
+    assert other.get_or_compute('tt:computed', lambda: 42, ttl=60) == 42
+    assert other.get_or_compute('tt:computed', lambda: 0, ttl=60) == 42
+
+    assert tiers.stats() == {'local_hits': 1, 'local_misses': 1, 'shared_hits': 0, 'shared_misses': 1}
+    assert other.stats() == {'local_hits': 2, 'local_misses': 2, 'shared_hits': 1, 'shared_misses': 1}
+
+    tiers.delete('tt:key')
+    assert tiers.get('tt:key') is None
+    cache.delete_many(['tt:key', 'tt:computed'])
+
+
+@pytest.mark.django_db
+def test_write_in_other_process_seen_after_version_ttl(monkeypatch):
+    from utils.django_utils import get_today_cards, user_data_cache
+
+    user = User.objects.create_user(username='twotier', password='123')
+    Card.objects.create(user=user, word='first', translation='первый', level='beginner')
+    assert [c.word for c in get_today_cards(user)] == ['first']
+
+    # Запись в другом процессе (без сигналов этого) меняет версию только в общем кэше
+    card = Card.objects.bulk_create([Card(user=user, word='second', translation='второй', level='beginner')])[0]
+    Repetition.objects.bulk_create([Repetition(user=user, card=card)])
+    cache.incr(f'user_ver:{user.id}')
+
+    hits = user_data_cache.stats()['local_hits']
+    assert [c.word for c in get_today_cards(user)] == ['first']
+    assert user_data_cache.stats()['local_hits'] == hits + 1
+
+    # Через VERSION_LOCAL_TTL процесс видит новую версию, и старая выборка в LRU уже не читается
+    later = time.monotonic() + shared_cache.VERSION_LOCAL_TTL + 1
+    monkeypatch.setattr(shared_cache.user_versions.local, '_clock', lambda: later)
+    assert [c.word for c in get_today_cards(user)] == ['first', 'second']
+
+
+@pytest.mark.django_db
+def test_write_in_same_process_seen_immediately():
+    from utils.django_utils import get_user_progress
+
+    user = User.objects.create_user(username='twotier2', password='123')
+    assert get_user_progress(user)['total_cards'] == 0
+    Card.objects.create(user=user, word='w', translation='t', level='beginner')
+    assert get_user_progress(user)['total_cards'] == 1
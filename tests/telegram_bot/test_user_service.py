@@ -25,6 +25,6 @@ def test_get_today_reviews():
     from users.models import UserProfile
     profile = UserProfile.objects.create(user=user, telegram_id=6666)
     card = Card.objects.create(user=user, word='today', translation='сегодня', level='beginner')
-    rep = Repetition.objects.create(card=card, user=user)
+    rep, _ = Repetition.objects.get_or_create(card=card, user=user)
     reviews = UserService.get_today_reviews(6666)
     assert any(c.word == 'today' for c in reviews) 
\ No newline at end of file
@@ -0,0 +1,122 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../telegram_bot')))
+
+import asyncio
+import time
+from collections import defaultdict
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Message
+from aiohttp import ClientSession, web
+
+from utils.webhook import ChatOrderedRequestHandler, chat_key
+
+
+def message_update(update_id, chat_id, text):
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id, 'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'T'},
+            'text': text,
+        },
+    }
+
+
+def test_chat_key():
+    assert chat_key(message_update(1, 42, 'hi')) == 42
+    callback = {'update_id': 2, 'callback_query': {'id': 'x', 'from': {'id': 7}, 'message': {'chat': {'id': -100}}}}
+    assert chat_key(callback) == -100
+    assert chat_key({'update_id': 3, 'inline_query': {'id': 'q', 'from': {'id': 9}}}) == 9
+    assert chat_key({'update_id': 4}) == 4
+
+
+async def serve(handler):
+    app = web.Application()
+    handler.register(app, path='/webhook')
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', 0).start()
+    return runner, f'http://127.0.0.1:{runner.addresses[0][1]}/webhook'
+
+
+def test_updates_of_one_chat_processed_in_order():
+    handled = defaultdict(list)
+    active = defaultdict(int)
+    same_chat_overlaps = []
+    timeouts = []
+    two_chats_at_once = asyncio.Event()
+    dp = Dispatcher()
+
+    @dp.message()
+    async def slow_first(message: Message):
+        chat_id = message.chat.id
+        if active[chat_id]:
+            same_chat_overlaps.append(chat_id)
+        active[chat_id] += 1
+        if sum(active.values()) >= 2:
+            two_chats_at_once.set()
+        if message.text == '0':
+            # Первое сообщение чата ждёт, пока параллельно не начнёт обрабатываться другой чат
+            try:
+                await asyncio.wait_for(two_chats_at_once.wait(), 2)
+            except asyncio.TimeoutError:
+                timeouts.append(chat_id)
+        handled[chat_id].append(int(message.text))
+        active[chat_id] -= 1
+
+    async def main():
+        bot = Bot('123456:TEST')
+        handler = ChatOrderedRequestHandler(dp, bot, workers=4, secret_token='s3cret')
+        runner, url = await serve(handler)
+
+        chats = [1001, 1002, 1003, 1004, 1005]
+        updates = [message_update(n * 10 + i, chat, str(i)) for n, chat in enumerate(chats) for i in range(5)]
+        headers = {'X-Telegram-Bot-Api-Secret-Token': 's3cret'}
+        async with ClientSession() as session:
+            async with session.post(url, json=updates[0]) as resp:
+                assert resp.status == 401  # без секрета обновление не принимается
+            for update in updates:
+                async with session.post(url, json=update, headers=headers) as resp:
+                    assert resp.status == 200
+
+        await handler.drain()
+        await runner.cleanup()
+
+    asyncio.run(main())
+    assert dict(handled) == {chat: [0, 1, 2, 3, 4] for chat in [1001, 1002, 1003, 1004, 1005]}
+    # Обновления одного чата не обрабатываются одновременно, а разные чаты — параллельно:
+    # ни одному первому сообщению не пришлось ждать до таймаута
+    assert same_chat_overlaps == [] and timeouts == []
+
+
+def test_full_queue_rejects_update_instead_of_delaying_ack():
+    release = asyncio.Event()
+    handled = []
+    dp = Dispatcher()
+
+    @dp.message()
+    async def blocked(message: Message):
+        await release.wait()
+        handled.append(message.message_id)
+
+    async def main():
+        bot = Bot('123456:TEST')
+        handler = ChatOrderedRequestHandler(dp, bot, workers=1, queue_size=1)
+        runner, url = await serve(handler)
+        statuses = []
+        async with ClientSession() as session:
+            for update_id in (1, 2, 3):
+                async with session.post(url, json=message_update(update_id, 77, 'x')) as resp:
+                    statuses.append(resp.status)
+                await asyncio.sleep(0.05)  # воркер забирает первое обновление и занят им
+        release.set()
+        await handler.drain()
+        await runner.cleanup()
+        return statuses
+
+    # Третье не помещается в очередь: 503 сразу, Telegram пришлёт его позже
+    assert asyncio.run(main()) == [200, 200, 503]
+    assert handled == [1, 2]
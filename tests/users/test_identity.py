@@ -0,0 +1,85 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../telegram_bot')))
+
+import json
+import pytest
+from django.contrib.auth.models import User
+from users import identity
+from users.models import UserProfile, TelegramLinkToken
+
+
+@pytest.mark.django_db
+def test_identity_cached_after_first_lookup(django_assert_num_queries):
+    from utils.django_utils import get_user_by_telegram_id
+    user = get_user_by_telegram_id(31001)
+    assert user.username == 'telegram_31001'
+
+    with django_assert_num_queries(0):
+        cached = get_user_by_telegram_id(31001)
+    assert (cached.id, cached.username, cached.email) == (user.id, user.username, user.email)
+
+    # Сохранение пользователя из кэша записывает только загруженные поля
+    cached.email = 'new@example.com'
+    cached.save()
+    stored = User.objects.get(id=user.id)
+    assert stored.email == 'new@example.com'
+    assert stored.check_password('telegram_31001_password')
+
+
+@pytest.mark.django_db
+def test_identity_invalidated_on_relink(client):
+    from utils.django_utils import link_telegram_to_existing_user
+    user = User.objects.create_user(username='relinker', password='123')
+    UserProfile.objects.create(user=user, telegram_id=32001)
+    assert identity.get_user(32001).id == user.id
+
+    link_telegram_to_existing_user(32002, 'tg', 'relinker')
+    assert identity.get_user(32001) is None
+    assert identity.get_user(32002).id == user.id
+
+    token = TelegramLinkToken.generate_token(user, 'link')
+    response = client.post('/users/api/v1/telegram-link-callback/',
+                           json.dumps({'token': token.token, 'telegram_id': 32003}),
+                           content_type='application/json')
+    assert response.json()['success'], response.json()
+    assert identity.get_user(32002) is None
+    assert identity.get_user(32003).id == user.id
+
+
+@pytest.mark.django_db
+def test_identity_invalidated_on_user_change_and_delete():
+    user = User.objects.create_user(username='webuser', password='123', email='old@example.com')
+    UserProfile.objects.create(user=user, telegram_id=34001)
+    assert identity.get_user(34001).email == 'old@example.com'
+
+    # Email изменён на сайте — бот сразу видит новый
+    user.email = 'new@example.com'
+    user.save()
+    assert identity.get_user(34001).email == 'new@example.com'
+
+    user.delete()
+    assert identity.get_user(34001) is None
+
+
+@pytest.mark.django_db
+def test_relink_in_other_process_reaches_local_tier(monkeypatch):
+    import time
+    from django.core.cache import cache
+    from lingua_track import cache as shared_cache
+
+    first = User.objects.create_user(username='first_owner', password='123')
+    second = User.objects.create_user(username='second_owner', password='123')
+    profile = UserProfile.objects.create(user=first, telegram_id=35001)
+    assert identity.get_user(35001).id == first.id
+
+    # Сайт (другой процесс) перепривязал Telegram: меняется только версия в общем кэше
+    UserProfile.objects.filter(pk=profile.pk).update(telegram_id=None)
+    UserProfile.objects.bulk_create([UserProfile(user=second, telegram_id=35001)])
+    cache.incr('tg_identity_ver:35001')
+    assert identity.get_user(35001).id == first.id  # LRU процесса ещё помнит прежнюю версию
+
+    # Не дольше VERSION_LOCAL_TTL, а не LOCAL_TTL записи (30 с)
+    later = time.monotonic() + shared_cache.VERSION_LOCAL_TTL + 1
+    monkeypatch.setattr(shared_cache.user_versions.local, '_clock', lambda: later)
+    assert identity.get_user(35001).id == second.id
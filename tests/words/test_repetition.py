@@ -16,4 +16,24 @@ def test_repetition_created_on_card_add():
     card.user = user
     card.save()
     # Проверяем, что Repetition создан
-    assert Repetition.objects.filter(card=card, user=user).exists() 
\ No newline at end of file
+    assert Repetition.objects.filter(card=card, user=user).exists() 
+
+@pytest.mark.django_db
+def test_repetition_unique_per_user_card():
+    from django.db import IntegrityError, transaction
+    user = User.objects.create_user(username='uniqrep', password='123')
+    card = Card.objects.create(user=user, word='pear', translation='груша', level='beginner')
+    with pytest.raises(IntegrityError), transaction.atomic():
+        Repetition.objects.create(card=card, user=user)
+
+
+@pytest.mark.django_db
+def test_review_today_lists_due_cards(client):
+    from django.utils import timezone
+    user = User.objects.create_user(username='duerep', password='123')
+    due = Card.objects.create(user=user, word='due', translation='пора', level='beginner')
+    later = Card.objects.create(user=user, word='later', translation='позже', level='beginner')
+    Repetition.objects.filter(card=later).update(next_review=timezone.now().date() + timezone.timedelta(days=3))
+    client.force_login(user)
+    response = client.get('/review/')
+    assert list(response.context['cards']) == [due]
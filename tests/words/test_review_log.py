@@ -0,0 +1,39 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.utils import timezone
+from words.models import Card, Repetition, ReviewLog
+from words.utils import update_sm2, update_sm2_batch
+
+
+@pytest.mark.django_db
+def test_review_log_written_with_sm2():
+    user = User.objects.create_user(username='loguser', password='123')
+    card = Card.objects.create(user=user, word='cat', translation='кот', level='beginner')
+    rep = Repetition.objects.get(user=user, card=card)
+
+    update_sm2(rep, 5)
+    rep.last_reviewed = timezone.now().date() - timezone.timedelta(days=3)
+    update_sm2_batch([(rep, 4), (rep, 1)])
+
+    logs = list(ReviewLog.objects.filter(user=user).order_by('id'))
+    assert [log.quality for log in logs] == [5, 4, 1]
+    assert logs[0].elapsed_days is None
+    assert logs[1].elapsed_days == 3
+    assert (logs[1].previous_interval, logs[1].new_interval) == (1, 6)
+    assert (logs[2].previous_interval, logs[2].new_interval) == (6, 1)
+
+
+@pytest.mark.django_db
+def test_prune_review_log():
+    user = User.objects.create_user(username='pruneuser', password='123')
+    card = Card.objects.create(user=user, word='dog', translation='собака', level='beginner')
+    now = timezone.now()
+    for days in (1, 100, 800):
+        ReviewLog.objects.create(user=user, card=card, reviewed_at=now - timezone.timedelta(days=days),
+                                 quality=4, previous_interval=1, new_interval=6)
+
+    call_command('prune_review_log', verbosity=0)
+    assert ReviewLog.objects.count() == 2
+    call_command('prune_review_log', days=30, batch_size=1, verbosity=0)
+    assert ReviewLog.objects.count() == 1
@@ -0,0 +1,50 @@
+import json
+import pytest
+from django.contrib.auth.models import User
+from django.utils import timezone
+from words.models import Card, Repetition
+
+
+@pytest.fixture
+def session_user(client):
+    user = User.objects.create_user(username='sessionuser', password='123')
+    for i in range(5):
+        Card.objects.create(user=user, word=f'w{i}', translation=f't{i}', level='beginner')
+    client.force_login(user)
+    return user
+
+
+@pytest.mark.django_db
+def test_review_session_returns_due_cards(client, session_user):
+    response = client.get('/review/session/?limit=3')
+    data = response.json()
+    assert data['success'] is True
+    assert data['due_total'] == 5
+    assert len(data['cards']) == 3
+    assert {'id', 'word', 'translation', 'level', 'next_review', 'interval'} <= set(data['cards'][0])
+
+
+@pytest.mark.django_db
+def test_review_session_submit_applies_all_grades(client, session_user):
+    cards = list(Card.objects.filter(user=session_user))
+    grades = [{'card_id': card.id, 'quality': 5} for card in cards]
+    response = client.post('/review/session/', json.dumps({'grades': grades}), content_type='application/json')
+    assert response.json()['updated'] == 5
+
+    tomorrow = timezone.now().date() + timezone.timedelta(days=1)
+    assert set(Repetition.objects.filter(user=session_user).values_list('next_review', flat=True)) == {tomorrow}
+
+
+@pytest.mark.django_db
+def test_review_session_submit_is_atomic(client, session_user):
+    other = User.objects.create_user(username='other', password='123')
+    foreign = Card.objects.create(user=other, word='x', translation='y', level='beginner')
+    own = Card.objects.filter(user=session_user).first()
+    grades = [{'card_id': own.id, 'quality': 4}, {'card_id': foreign.id, 'quality': 4}]
+    response = client.post('/review/session/', json.dumps({'grades': grades}), content_type='application/json')
+    assert response.status_code == 404
+    assert Repetition.objects.get(card=own).total_reviews == 0
+
+    grades = [{'card_id': own.id, 'quality': 7}]
+    response = client.post('/review/session/', json.dumps({'grades': grades}), content_type='application/json')
+    assert response.status_code == 400
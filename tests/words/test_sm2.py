@@ -0,0 +1,81 @@
+import pytest
+from django.contrib.auth.models import User
+from django.utils import timezone
+from words.models import Card, Repetition
+from words.utils import update_sm2, update_sm2_batch, SM2_FIELDS
+
+
+def make_cards(user, count):
+    cards = []
+    for i in range(count):
+        cards.append(Card.objects.create(user=user, word=f'w{i}', translation=f't{i}', level='beginner'))
+    return cards
+
+
+def reference_sm2(repetition, quality):
+    # Исходная реализация update_sm2 (до пакетного движка), без сохранения
+    repetition.update_stats(quality)
+    if quality < 3:
+        repetition.interval = 1
+        repetition.repetition_count = 0
+    else:
+        if repetition.repetition_count == 0:
+            repetition.interval = 1
+        elif repetition.repetition_count == 1:
+            repetition.interval = 6
+        else:
+            repetition.interval = int(repetition.interval * repetition.easiness)
+        repetition.repetition_count += 1
+    ef = repetition.easiness + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    repetition.easiness = max(1.3, ef)
+    repetition.last_reviewed = timezone.now().date()
+    repetition.next_review = repetition.last_reviewed + timezone.timedelta(days=repetition.interval)
+
+
+@pytest.mark.django_db
+def test_batch_matches_reference():
+    user = User.objects.create_user(username='sm2user', password='123')
+    cards = make_cards(user, 6)
+    qualities = [5, 4, 3, 2, 1, 0]
+
+    expected = []
+    for card, quality in zip(cards, qualities):
+        rep = Repetition.objects.get(card=card, user=user)
+        for q in (5, 5, quality):
+            reference_sm2(rep, q)
+        expected.append({f: getattr(rep, f) for f in SM2_FIELDS})
+
+    reps = list(Repetition.objects.filter(user=user).order_by('card_id'))
+    update_sm2_batch([(rep, 5) for rep in reps])
+    update_sm2_batch([(rep, 5) for rep in reps])
+    update_sm2_batch(list(zip(reps, qualities)))
+
+    stored = Repetition.objects.filter(user=user).order_by('card_id')
+    for rep, exp in zip(stored, expected):
+        assert {f: getattr(rep, f) for f in SM2_FIELDS} == exp
+
+
+@pytest.mark.django_db
+def test_batch_is_single_update():
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    user = User.objects.create_user(username='sm2bulk', password='123')
+    make_cards(user, 20)
+    reps = list(Repetition.objects.filter(user=user))
+    with CaptureQueriesContext(connection) as queries:
+        update_sm2_batch([(rep, 4) for rep in reps])
+    repetition_writes = [q for q in queries.captured_queries if 'words_repetition' in q['sql']]
+    assert len(repetition_writes) == 1
+
+
+@pytest.mark.django_db
+def test_update_sm2_single():
+    user = User.objects.create_user(username='sm2single', password='123')
+    card = make_cards(user, 1)[0]
+    rep = Repetition.objects.get(card=card, user=user)
+    update_sm2(rep, 2)
+    rep.refresh_from_db()
+    assert rep.total_reviews == 1
+    assert rep.failed_reviews == 1
+    assert rep.interval == 1
+    assert rep.next_review == timezone.now().date() + timezone.timedelta(days=1)
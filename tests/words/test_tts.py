@@ -0,0 +1,119 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+from django.urls import reverse
+
+from words import tts
+from words.tts import TTSPool, TTSQueueFull, TTSTimeout
+
+
+class FakeBackend:
+    """Локальная замена gTTS: пишет mp3-заглушку, считает вызовы, может ждать разрешения"""
+
+    def __init__(self, delay=0.0, blocked=False, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+        self.release = threading.Event()
+        if not blocked:
+            self.release.set()
+
+    def __call__(self, word, lang, path, timeout=None):
+        self.calls.append((word, lang))
+        self.release.wait(5)
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError('tts backend down')
+        with open(path, 'wb') as f:
+            f.write(f'{word}:{lang}'.encode())
+
+
+def run_threads(count, target):
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def worker(n):
+        barrier.wait()
+        results[n] = target()
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_requests_share_one_synthesis(tmp_path):
+    backend = FakeBackend(delay=0.2)
+    pool = TTSPool(backend=backend, workers=2, queue_size=2, media_root=str(tmp_path))
+
+    results = run_threads(20, lambda: pool.generate('hello', 'en'))
+    pool.shutdown()
+
+    assert backend.calls == [('hello', 'en')]
+    assert set(results) == {os.path.join('tts', 'hello_en.mp3')}
+    assert os.listdir(tmp_path / 'tts') == ['hello_en.mp3']  # временных файлов не осталось
+    assert (tmp_path / 'tts' / 'hello_en.mp3').read_bytes() == b'hello:en'
+    # Готовый файл больше не синтезируется
+    assert pool.generate('hello', 'en') == os.path.join('tts', 'hello_en.mp3')
+    assert len(backend.calls) == 1
+
+
+def test_queue_is_bounded_and_timeouts_do_not_cancel_synthesis(tmp_path):
+    backend = FakeBackend(blocked=True)
+    pool = TTSPool(backend=backend, workers=1, queue_size=1, media_root=str(tmp_path))
+
+    first = pool.submit('one')
+    pool.submit('two')
+    with pytest.raises(TTSQueueFull):
+        pool.submit('three')
+    # Повторный запрос того же слова места в очереди не занимает
+    assert pool.submit('one') is first
+
+    with pytest.raises(TTSTimeout):
+        pool.generate('one', timeout=0.05)
+    with pytest.raises(TTSTimeout):
+        asyncio.run(pool.generate_async('two', timeout=0.05))
+
+    backend.release.set()
+    assert pool.generate('one') == os.path.join('tts', 'one_en.mp3')
+    assert pool.generate('two') == os.path.join('tts', 'two_en.mp3')
+    assert pool.generate('three') == os.path.join('tts', 'three_en.mp3')
+    pool.shutdown()
+    assert backend.calls == [('one', 'en'), ('two', 'en'), ('three', 'en')]
+
+
+def test_failed_synthesis_leaves_no_file_and_is_retried(tmp_path):
+    backend = FakeBackend(fail=True)
+    pool = TTSPool(backend=backend, workers=1, queue_size=1, media_root=str(tmp_path))
+
+    with pytest.raises(RuntimeError):
+        pool.generate('broken')
+    assert os.listdir(tmp_path / 'tts') == []
+
+    backend.fail = False
+    assert asyncio.run(pool.generate_async('broken')) == os.path.join('tts', 'broken_en.mp3')
+    pool.shutdown()
+    assert len(backend.calls) == 2
+
+
+def test_view_serves_audio_and_reports_busy_queue(client, settings, tmp_path, monkeypatch):
+    backend = FakeBackend(blocked=True)
+    pool = TTSPool(backend=backend, workers=1, queue_size=0, media_root=str(tmp_path))
+    monkeypatch.setattr(tts, '_pool', pool)
+    settings.MEDIA_ROOT = str(tmp_path)
+
+    pool.submit('busy')
+    response = client.get(reverse('words:tts_audio', args=['word']))
+    assert response.status_code == 503 and response['Retry-After'] == '5'
+
+    backend.release.set()
+    pool.generate('busy')
+    response = client.get(reverse('words:tts_audio', args=['word']))
+    assert response.status_code == 200
+    assert b''.join(response.streaming_content) == b'word:en'
+    pool.shutdown()
@@ -15,7 +15,7 @@ def test_create_card():
 def test_card_appears_in_repetition():
     user = User.objects.create_user(username='testuser2', password='123')
     card = Card.objects.create(user=user, word='orange', translation='апельсин', level='beginner')
-    rep = Repetition.objects.create(card=card, user=user)
+    rep, _ = Repetition.objects.get_or_create(card=card, user=user)
     assert rep.card == card
     assert rep.user == user
     assert rep.next_review is not None 
\ No newline at end of file
@@ -0,0 +1,60 @@
+"""
+Кэш соответствия telegram_id → пользователь
+
+Бот определяет пользователя на каждое сообщение и нажатие кнопки.
+Запись о пользователе — компактный кортеж (id, username, email) — хранится
+в общем кэше Django, а перед ним стоит небольшой LRU в памяти процесса
+(lingua_track.cache.TwoTierCache).
+Из записи собирается экземпляр User с отложенными остальными полями,
+поэтому user.save() после изменения email сохраняет только загруженные поля.
+
+После привязки/перепривязки аккаунта нужно вызвать invalidate(telegram_id).
+Ключ записи содержит версию telegram_id (lingua_track.cache.cache_version):
+invalidate меняет её, и прежняя запись не читается ни в этом процессе,
+ни в других — там не позже чем через VERSION_LOCAL_TTL секунд.
+"""
+
+from django.contrib.auth.models import User
+
+from lingua_track.cache import TwoTierCache, bump_versions, cache_version
+
+IDENTITY_FIELDS = ['id', 'username', 'email']
+SHARED_TTL = 3600  # 1 час в общем кэше
+LOCAL_TTL = 30  # 30 секунд в памяти процесса
+LOCAL_MAX_SIZE = 10000
+
+_cache = TwoTierCache(local_size=LOCAL_MAX_SIZE, local_ttl=LOCAL_TTL)
+
+
+def _version_key(telegram_id):
+    return f"tg_identity_ver:{telegram_id}"
+
+
+def _key(telegram_id):
+    return f"tg_identity:{telegram_id}:v{cache_version(_version_key(telegram_id))}"
+
+
+def _build_user(record):
+    return User.from_db('default', IDENTITY_FIELDS, record)
+
+
+def get_user(telegram_id):
+    """Пользователь по telegram_id или None, если Telegram не привязан"""
+    key = _key(telegram_id)
+    record = _cache.get(key)
+    if record is None:
+        record = User.objects.filter(profile__telegram_id=telegram_id).values_list(*IDENTITY_FIELDS).first()
+        if record is None:
+            return None
+        _cache.set(key, tuple(record), SHARED_TTL)
+    return _build_user(record)
+
+
+def remember(telegram_id, user):
+    """Кладёт в кэш только что созданного или привязанного пользователя"""
+    _cache.set(_key(telegram_id), (user.id, user.username, user.email), SHARED_TTL)
+
+
+def invalidate(*telegram_ids):
+    """Сбрасывает кэш для telegram_id (None пропускаются)"""
+    bump_versions(*(_version_key(telegram_id) for telegram_id in telegram_ids if telegram_id is not None))
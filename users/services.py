@@ -0,0 +1,76 @@
+"""
+Операции привязки Telegram и автовхода
+
+Общий код для API сайта (users/views.py) и бота: бот, работающий рядом
+с сайтом на той же базе, вызывает эти функции напрямую, без HTTP-запроса
+к собственному API (см. telegram_bot/services/site_gateway.py).
+Результат — словарь того же вида, что и JSON-ответ API; ошибка — ServiceError.
+"""
+
+from django.db import transaction
+
+from .models import UserProfile, TelegramLinkToken
+from . import identity
+
+
+class ServiceError(Exception):
+    """Ошибка операции: текст для ответа API и HTTP-статус"""
+
+    def __init__(self, error, status=400):
+        super().__init__(error)
+        self.error = error
+        self.status = status
+
+
+def link_telegram(token, telegram_id, telegram_username=None):
+    """Привязывает Telegram к пользователю по одноразовому токену со страницы сайта"""
+    if not token or not telegram_id:
+        raise ServiceError('Missing token or telegram_id')
+
+    with transaction.atomic():
+        # Блокируем токен: два одновременных /start с одним токеном не привяжут его дважды
+        token_obj = (
+            TelegramLinkToken.objects.select_for_update().select_related('user')
+            .filter(token=token, token_type='link', is_used=False).first()
+        )
+        if token_obj is None:
+            raise ServiceError('Invalid or expired token')
+        if not token_obj.is_valid():
+            raise ServiceError('Token expired')
+
+        profile, created = UserProfile.objects.get_or_create(user=token_obj.user)
+        previous_telegram_id = profile.telegram_id
+        profile.telegram_id = telegram_id
+        profile.telegram_username = telegram_username or ''
+        profile.is_telegram_user = True
+        profile.save()
+        token_obj.mark_as_used()
+
+    # Бот должен увидеть новую привязку сразу, а не по истечении кэша
+    identity.invalidate(telegram_id, previous_telegram_id)
+    return {
+        'success': True,
+        'user_id': token_obj.user.id,
+        'username': token_obj.user.username
+    }
+
+
+def issue_auth_token(telegram_id, site_url):
+    """Создаёт токен автовхода для пользователя с привязанным Telegram; site_url — адрес сайта"""
+    if not telegram_id:
+        raise ServiceError('Missing telegram_id')
+
+    profile = UserProfile.objects.select_related('user').filter(telegram_id=telegram_id).first()
+    if profile is None:
+        raise ServiceError('User not found', status=404)
+    user = profile.user
+
+    token_obj = TelegramLinkToken.generate_token(user=user, token_type='auth')
+    return {
+        'success': True,
+        'token': token_obj.token,
+        'auth_url': f"{site_url.rstrip('/')}/users/telegram-auth/?token={token_obj.token}",
+        'expires_at': token_obj.expires_at.strftime('%H:%M:%S'),
+        'user_id': user.id,
+        'username': user.username
+    }
@@ -0,0 +1,30 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import identity
+from .models import UserProfile
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def forget_telegram_identity(sender, instance, **kwargs):
+    """
+    Профиль создан, изменён или удалён — telegram_id может указывать на
+    другого пользователя. Прежний telegram_id при перепривязке сбрасывают
+    link_telegram_to_existing_user и telegram_link_callback
+    """
+    identity.invalidate(instance.telegram_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user_identity(sender, instance, created=False, update_fields=None, **kwargs):
+    """
+    В кэше лежит запись (id, username, email): после её изменения или удаления
+    пользователя запись устарела. При удалении профиль удаляется каскадом
+    раньше пользователя, и telegram_id сбрасывает forget_telegram_identity
+    """
+    if created or (update_fields is not None and not set(update_fields) & set(identity.IDENTITY_FIELDS)):
+        return  # например, обновление last_login при входе
+    identity.invalidate(*UserProfile.objects.filter(user_id=instance.id).values_list('telegram_id', flat=True))
@@ -7,6 +7,7 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from .forms import UserRegistrationForm
 from .models import UserProfile, TelegramLinkToken
+from . import services
 from telegram_bot.config import Config
 import json
 import urllib.parse
@@ -95,42 +96,15 @@ def generate_auth_token(request):
     """API для генерации токена автовхода"""
     try:
         data = json.loads(request.body)
-        telegram_id = data.get('telegram_id')
-        
-        if not telegram_id:
-            return JsonResponse({
-                'success': False,
-                'error': 'Missing telegram_id'
-            }, status=400)
-        
-        # Находим пользователя по Telegram ID
-        try:
-            profile = UserProfile.objects.get(telegram_id=telegram_id)
-            user = profile.user
-        except UserProfile.DoesNotExist:
-            return JsonResponse({
-                'success': False,
-                'error': 'User not found'
-            }, status=404)
-        
-        # Генерируем токен автовхода
-        token_obj = TelegramLinkToken.generate_token(
-            user=user,
-            token_type='auth'
-        )
-        
-        # Формируем ссылку для автовхода
-        auth_url = f"{request.build_absolute_uri('/').rstrip('/')}/users/telegram-auth/?token={token_obj.token}"
-        
+        return JsonResponse(services.issue_auth_token(
+            data.get('telegram_id'),
+            request.build_absolute_uri('/'),
+        ))
+    except services.ServiceError as e:
         return JsonResponse({
-            'success': True,
-            'token': token_obj.token,
-            'auth_url': auth_url,
-            'expires_at': token_obj.expires_at.strftime('%H:%M:%S'),
-            'user_id': user.id,
-            'username': user.username
-        })
-        
+            'success': False,
+            'error': e.error
+        }, status=e.status)
     except json.JSONDecodeError:
         return JsonResponse({
             'success': False,
@@ -148,52 +122,16 @@ def telegram_link_callback(request):
     """API для обработки привязки от бота"""
     try:
         data = json.loads(request.body)
-        token = data.get('token')
-        telegram_id = data.get('telegram_id')
-        telegram_username = data.get('telegram_username')
-        
-        if not token or not telegram_id:
-            return JsonResponse({
-                'success': False,
-                'error': 'Missing token or telegram_id'
-            }, status=400)
-        
-        # Находим токен
-        try:
-            token_obj = TelegramLinkToken.objects.get(
-                token=token,
-                token_type='link',
-                is_used=False
-            )
-        except TelegramLinkToken.DoesNotExist:
-            return JsonResponse({
-                'success': False,
-                'error': 'Invalid or expired token'
-            }, status=400)
-        
-        # Проверяем срок действия
-        if not token_obj.is_valid():
-            return JsonResponse({
-                'success': False,
-                'error': 'Token expired'
-            }, status=400)
-        
-        # Привязываем Telegram к пользователю
-        profile, created = UserProfile.objects.get_or_create(user=token_obj.user)
-        profile.telegram_id = telegram_id
-        profile.telegram_username = telegram_username
-        profile.is_telegram_user = True
-        profile.save()
-        
-        # Помечаем токен как использованный
-        token_obj.mark_as_used()
-        
+        return JsonResponse(services.link_telegram(
+            data.get('token'),
+            data.get('telegram_id'),
+            data.get('telegram_username'),
+        ))
+    except services.ServiceError as e:
         return JsonResponse({
-            'success': True,
-            'user_id': token_obj.user.id,
-            'username': token_obj.user.username
-        })
-        
+            'success': False,
+            'error': e.error
+        }, status=e.status)
     except json.JSONDecodeError:
         return JsonResponse({
             'success': False,
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Card, Repetition
+from .models import Card, Repetition, ReviewLog
 
 # Register your models here.
 
@@ -16,3 +16,11 @@ class RepetitionAdmin(admin.ModelAdmin):
     list_filter = ['next_review', 'interval', 'user']
     search_fields = ['card__word', 'user__username']
     readonly_fields = ['last_reviewed', 'total_reviews', 'successful_reviews', 'failed_reviews']
+
+@admin.register(ReviewLog)
+class ReviewLogAdmin(admin.ModelAdmin):
+    list_display = ['card', 'user', 'reviewed_at', 'quality', 'previous_interval', 'new_interval', 'elapsed_days']
+    list_filter = ['quality', 'reviewed_at']
+    search_fields = ['card__word', 'user__username']
+    raw_id_fields = ['card', 'user']
+    date_hierarchy = 'reviewed_at'
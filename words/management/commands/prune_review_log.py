@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from words.models import ReviewLog
+
+
+class Command(BaseCommand):
+    help = "Удаляет записи журнала повторений старше срока хранения (REVIEW_LOG_RETENTION_DAYS)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="срок хранения в днях; по умолчанию — из настроек")
+        parser.add_argument('--batch-size', type=int, default=10000, help="сколько строк удалять за один запрос")
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.REVIEW_LOG_RETENTION_DAYS
+        if days < 1:
+            raise CommandError("Срок хранения должен быть не меньше одного дня")
+        cutoff = timezone.now() - timezone.timedelta(days=days)
+
+        # Удаляем пачками по индексу reviewed_at, чтобы не держать долгую блокировку
+        deleted = 0
+        while True:
+            ids = list(
+                ReviewLog.objects.filter(reviewed_at__lt=cutoff)
+                .order_by('reviewed_at')
+                .values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            deleted += ReviewLog.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Удалено записей журнала: {deleted} (старше {days} дн.)"))
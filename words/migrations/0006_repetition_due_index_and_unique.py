@@ -0,0 +1,53 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:23
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def fold_duplicate_repetitions(apps, schema_editor):
+    """
+    Сливает дубликаты Repetition (user, card) в одну запись перед
+    добавлением уникального ограничения. Остаётся запись с самым свежим
+    состоянием SM-2, счётчики повторений суммируются, дата следующего
+    повторения берётся самая ранняя, чтобы слово не выпало из очереди.
+    """
+    Repetition = apps.get_model('words', 'Repetition')
+    duplicates = (
+        Repetition.objects.values('user_id', 'card_id')
+        .annotate(n=Count('id'))
+        .filter(n__gt=1)
+    )
+    for group in duplicates.iterator():
+        reps = list(
+            Repetition.objects.filter(user_id=group['user_id'], card_id=group['card_id'])
+            .order_by(F('last_reviewed').desc(nulls_last=True), '-total_reviews', '-id')
+        )
+        keep, extra = reps[0], reps[1:]
+        for rep in extra:
+            keep.total_reviews += rep.total_reviews
+            keep.successful_reviews += rep.successful_reviews
+            keep.failed_reviews += rep.failed_reviews
+            keep.next_review = min(keep.next_review, rep.next_review)
+        keep.save()
+        Repetition.objects.filter(id__in=[rep.id for rep in extra]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('words', '0005_alter_card_level_delete_userprofile'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(fold_duplicate_repetitions, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='repetition',
+            index=models.Index(fields=['user', 'next_review'], name='repetition_due_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='repetition',
+            constraint=models.UniqueConstraint(fields=('user', 'card'), name='unique_repetition_user_card'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:41
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('words', '0006_repetition_due_index_and_unique'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reviewed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('quality', models.PositiveSmallIntegerField()),
+                ('previous_interval', models.IntegerField()),
+                ('new_interval', models.IntegerField()),
+                ('elapsed_days', models.IntegerField(blank=True, null=True)),
+                ('card', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_logs', to='words.card')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_logs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'reviewed_at'], name='reviewlog_user_time_idx'), models.Index(fields=['reviewed_at'], name='reviewlog_time_idx')],
+            },
+        ),
+    ]
@@ -18,6 +18,11 @@ class Card(models.Model):
     level = models.CharField("Уровень", max_length=20, choices=LEVEL_CHOICES, default="beginner")
     created_at = models.DateTimeField(auto_now_add=True)  # Дата создания карточки
 
+    class Meta:
+        indexes = [
+            # Случайная выборка карточек для тестов: WHERE user_id = ? AND id = ? / id >= ? ORDER BY id
+            models.Index(fields=['user', 'id'], name='card_user_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.word} → {self.translation}"
@@ -40,6 +45,16 @@ class Repetition(models.Model):
     consecutive_successes = models.IntegerField(default=0)  # Подряд успешных повторений
     consecutive_failures = models.IntegerField(default=0)  # Подряд неуспешных повторений
 
+    class Meta:
+        constraints = [
+            # Одна запись повторения на карточку у пользователя
+            models.UniqueConstraint(fields=['user', 'card'], name='unique_repetition_user_card'),
+        ]
+        indexes = [
+            # Очередь на повторение: WHERE user_id = ? AND next_review <= ?
+            models.Index(fields=['user', 'next_review'], name='repetition_due_idx'),
+        ]
+
     def __str__(self):
         return f"{self.card.word} — повтор через {self.interval} дн."
 
@@ -63,4 +78,26 @@ class Repetition(models.Model):
         """Возвращает процент успешных повторений"""
         if self.total_reviews == 0:
             return 0
-        return round((self.successful_reviews / self.total_reviews) * 100, 1)
\ No newline at end of file
+        return round((self.successful_reviews / self.total_reviews) * 100, 1)
+
+# Журнал повторений: одна строка на каждую оценку, только добавление.
+# Аналитика (история, кривые забывания) читает его, не трогая Repetition
+class ReviewLog(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="review_logs")
+    card = models.ForeignKey(Card, on_delete=models.CASCADE, related_name="review_logs")
+    reviewed_at = models.DateTimeField(default=timezone.now)
+    quality = models.PositiveSmallIntegerField()  # оценка (0–5)
+    previous_interval = models.IntegerField()  # интервал до повторения, дней
+    new_interval = models.IntegerField()  # интервал после повторения, дней
+    elapsed_days = models.IntegerField(null=True, blank=True)  # дней с прошлого повторения (None — первое)
+
+    class Meta:
+        indexes = [
+            # История пользователя за период: WHERE user_id = ? AND reviewed_at BETWEEN ...
+            models.Index(fields=['user', 'reviewed_at'], name='reviewlog_user_time_idx'),
+            # Очистка по сроку хранения: WHERE reviewed_at < ?
+            models.Index(fields=['reviewed_at'], name='reviewlog_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.card_id}: {self.quality} ({self.reviewed_at:%d.%m.%Y})"
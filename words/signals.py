@@ -1,23 +1,34 @@
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+from lingua_track.cache import bump_user_cache
 from .models import Card, Repetition
 
+# Отправляется после пакетного применения SM-2.
+# reviews — список пар (repetition, quality)
+repetitions_reviewed = Signal()
+
 @receiver(post_save, sender=Card)
 def create_repetition_for_card(sender, instance, created, **kwargs):
     """
     Автоматически создаёт Repetition при создании новой карточки
     """
     if created:
-        # Проверяем, не существует ли уже Repetition для этой карточки
-        if not Repetition.objects.filter(card=instance, user=instance.user).exists():
-            Repetition.objects.create(
-                card=instance,
-                user=instance.user,
-                next_review=instance.created_at.date(),
-                interval=1,
-                easiness=2.5,
-                total_reviews=0,
-                successful_reviews=0,
-                failed_reviews=0,
-                consecutive_failures=0,
-            ) 
\ No newline at end of file
+        Repetition.objects.get_or_create(
+            card=instance,
+            user=instance.user,
+            defaults={'next_review': instance.created_at.date()},
+        )
+
+
+@receiver(post_save, sender=Card)
+@receiver(post_delete, sender=Card)
+@receiver(post_save, sender=Repetition)
+@receiver(post_delete, sender=Repetition)
+def bump_cache_on_card_change(sender, instance, **kwargs):
+    """Закэшированные выборки пользователя (слова на сегодня, статистика) устарели"""
+    bump_user_cache(instance.user_id)
+
+
+@receiver(repetitions_reviewed)
+def bump_cache_on_reviews(sender, reviews, **kwargs):
+    bump_user_cache(*(repetition.user_id for repetition, _ in reviews))
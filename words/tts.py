@@ -0,0 +1,143 @@
+"""
+Озвучка слов в отдельном пуле потоков
+
+Синтез (gTTS — запрос к Google) идёт в TTSPool, а не в потоке запроса
+или в цикле событий бота:
+
+    * одновременные запросы одного (word, lang) ждут один и тот же синтез
+      (single-flight), файл пишется один раз;
+    * очередь ограничена: если в работе и в очереди уже TTS_WORKERS + TTS_QUEUE_SIZE
+      слов, новый запрос сразу получает TTSQueueFull;
+    * вызывающий ждёт не дольше TTS_TIMEOUT секунд (TTSTimeout), синтез при этом
+      не прерывается и его результат достанется следующему запросу;
+    * файл сначала пишется во временный и затем атомарно переименовывается,
+      поэтому недописанный mp3 никогда не отдаётся.
+
+Бэкенд — функция backend(word, lang, path, timeout), которая пишет mp3 в path
+(по умолчанию gtts_backend, настройка TTS_BACKEND).
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class TTSUnavailable(Exception):
+    """Озвучка сейчас недоступна; запрос можно повторить позже"""
+
+
+class TTSQueueFull(TTSUnavailable):
+    pass
+
+
+class TTSTimeout(TTSUnavailable):
+    pass
+
+
+def gtts_backend(word, lang, path, timeout=None):
+    from gtts import gTTS
+    gTTS(text=word, lang=lang, timeout=timeout).save(path)
+
+
+def tts_relative_path(word, lang):
+    return os.path.join('tts', f"{word}_{lang}.mp3")
+
+
+class TTSPool:
+    """Пул синтеза речи с дедупликацией по (word, lang), ограниченной очередью и таймаутами"""
+
+    def __init__(self, backend=gtts_backend, workers=2, queue_size=50, timeout=15, media_root=None):
+        self.backend = backend
+        self.timeout = timeout
+        self.media_root = media_root or settings.MEDIA_ROOT
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tts')
+        # Места в пуле: выполняемые плюс ожидающие синтезы
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._inflight = {}  # (word, lang) -> Future
+        self._lock = threading.Lock()
+
+    def submit(self, word, lang='en') -> Future:
+        """Future с относительным путём к mp3; готовый файл не синтезируется повторно"""
+        relative_path = tts_relative_path(word, lang)
+        path = os.path.join(self.media_root, relative_path)
+        key = (word, lang)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            if os.path.exists(path):
+                future = Future()
+                future.set_result(relative_path)
+                return future
+            if not self._slots.acquire(blocking=False):
+                raise TTSQueueFull(f"Очередь озвучки заполнена, слово '{word}' не принято")
+            future = self._executor.submit(self._synthesize, word, lang, path, relative_path)
+            self._inflight[key] = future
+        future.add_done_callback(lambda _: self._done(key))
+        return future
+
+    def _done(self, key):
+        with self._lock:
+            del self._inflight[key]
+        self._slots.release()
+
+    def _synthesize(self, word, lang, path, relative_path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            self.backend(word, lang, tmp_path, self.timeout)
+            os.replace(tmp_path, path)
+        except Exception:
+            logger.exception(f"Ошибка синтеза '{word}' ({lang})")
+            raise
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return relative_path
+
+    def generate(self, word, lang='en', timeout=None):
+        """Относительный путь к mp3 (для веб-запросов: блокирует не дольше timeout секунд)"""
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return self.submit(word, lang).result(timeout)
+        except FutureTimeoutError:
+            raise TTSTimeout(f"Озвучка '{word}' не готова за {timeout} с") from None
+
+    async def generate_async(self, word, lang='en', timeout=None):
+        """То же для цикла событий бота: ожидание не занимает поток"""
+        timeout = self.timeout if timeout is None else timeout
+        future = asyncio.wrap_future(self.submit(word, lang))
+        try:
+            # shield: отмена ожидания не отменяет синтез, который ждут и другие
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            raise TTSTimeout(f"Озвучка '{word}' не готова за {timeout} с") from None
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_tts_pool() -> TTSPool:
+    """Общий пул процесса, создаётся при первом обращении по настройкам TTS_*"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = TTSPool(
+                backend=import_string(settings.TTS_BACKEND),
+                workers=settings.TTS_WORKERS,
+                queue_size=settings.TTS_QUEUE_SIZE,
+                timeout=settings.TTS_TIMEOUT,
+            )
+        return _pool
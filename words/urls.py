@@ -15,6 +15,7 @@ urlpatterns = [
     # --- Повторение слов (интервальный тренажёр) ---
     path('review/', views.review_today, name='review_today'),  # слова на повторение
     path('review/<int:pk>/', views.review_card, name='review_card'),  # конкретное слово
+    path('review/session/', views.review_session, name='review_session'),  # JSON: пачка карточек и оценки одним POST
     path('add_to_repetition/', views.add_to_repetition, name='add_to_repetition'),  # AJAX: добавить в повторения
 
     # --- Озвучка ---
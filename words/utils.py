@@ -1,18 +1,33 @@
 from django.utils import timezone
 import os
-from gtts import gTTS
+import random
 from django.conf import settings
+from django.db import transaction
+
+from .models import Card, Repetition, ReviewLog
+from .signals import repetitions_reviewed
 
 
 # Алгоритм интервального повторения SM-2.
 # repetition — объект модели Repetition
 # quality — оценка (0–5)
 
+# Поля Repetition, которые меняет один шаг SM-2 (для bulk_update)
+SM2_FIELDS = [
+    'interval', 'repetition_count', 'easiness', 'last_reviewed', 'next_review',
+    'total_reviews', 'successful_reviews', 'failed_reviews', 'last_quality',
+    'consecutive_successes', 'consecutive_failures',
+]
+
+
+def apply_sm2(repetition, quality, today=None):
+    """Применяет один шаг SM-2 к объекту в памяти, не сохраняя его"""
+    if today is None:
+        today = timezone.now().date()
 
-def update_sm2(repetition, quality):
     # Обновляем статистику повторения
     repetition.update_stats(quality)
-    
+
     # Алгоритм интервального повторения SM-2
     if quality < 3:
         repetition.interval = 1
@@ -33,22 +48,132 @@ def update_sm2(repetition, quality):
     repetition.easiness = max(1.3, ef)
 
     # Обновляем даты
-    repetition.last_reviewed = timezone.now().date()
+    repetition.last_reviewed = today
     repetition.next_review = repetition.last_reviewed + timezone.timedelta(days=repetition.interval)
+    return repetition
+
+
+def update_sm2_batch(reviews):
+    """
+    Пакетно применяет SM-2 к парам (repetition, quality).
+    Все новые значения считаются за один проход в памяти и записываются
+    одним bulk_update, а каждая оценка добавляется в ReviewLog в той же
+    транзакции. Если один и тот же объект встречается несколько раз,
+    оценки применяются последовательно, как при отдельных вызовах update_sm2.
+    """
+    reviews = list(reviews)
+    now = timezone.now()
+    today = now.date()
+    changed = {}
+    logs = []
+    for repetition, quality in reviews:
+        previous_interval = repetition.interval
+        last_reviewed = repetition.last_reviewed
+        apply_sm2(repetition, quality, today)
+        changed[id(repetition)] = repetition
+        logs.append(ReviewLog(
+            user_id=repetition.user_id,
+            card_id=repetition.card_id,
+            reviewed_at=now,
+            quality=quality,
+            previous_interval=previous_interval,
+            new_interval=repetition.interval,
+            elapsed_days=(today - last_reviewed).days if last_reviewed else None,
+        ))
+
+    repetitions = list(changed.values())
+    if repetitions:
+        # Состояние и журнал пишутся вместе: либо оба, либо ничего
+        with transaction.atomic():
+            Repetition.objects.bulk_update(repetitions, SM2_FIELDS)
+            ReviewLog.objects.bulk_create(logs)
+        repetitions_reviewed.send(sender=Repetition, reviews=reviews)
+    return repetitions
+
+
+def update_sm2(repetition, quality):
+    update_sm2_batch([(repetition, quality)])
+
+
+def apply_reviews(user, reviews):
+    """
+    Применяет оценки пользователя к его карточкам одной транзакцией.
+    reviews — список пар (card_id, quality). Оценки для чужих или
+    несуществующих карточек пропускаются. Возвращает обновлённые Repetition.
+    """
+    card_ids = {card_id for card_id, _ in reviews}
+    with transaction.atomic():
+        repetitions = {
+            rep.card_id: rep
+            for rep in Repetition.objects.select_for_update().filter(user=user, card_id__in=card_ids)
+        }
+        # Создаём недостающие записи повторений (только для своих карточек)
+        missing = Card.objects.filter(user=user, id__in=card_ids - repetitions.keys()).values_list('id', flat=True)
+        for card_id in missing:
+            repetitions[card_id], _ = Repetition.objects.get_or_create(user=user, card_id=card_id)
+
+        return update_sm2_batch([
+            (repetitions[card_id], quality)
+            for card_id, quality in reviews
+            if card_id in repetitions
+        ])
+
+
+# Случайная выборка карточек для тестов.
+# Стоимость не зависит от размера колоды. Небольшую колоду читаем целиком
+# (только id). У большой берём границы id пользователя и случайные точки
+# между ними; точка засчитывается, только если это id карточки из queryset.
+# Так каждая карточка выбирается с равной вероятностью, как бы ни перемежались
+# id разных пользователей, а каждая попытка — поиск по индексу (user, id).
+# Если карточки пользователя разбросаны редко (меньше одной на
+# SAMPLE_ATTEMPTS_PER_CARD id), попыток не хватает, и остаток добирается
+# ближайшими карточками после случайных точек — с перекосом к карточкам после «дыр».
+
+# Во сколько раз больше нужного количества id можно прочитать целиком
+SAMPLE_SCAN_FACTOR = 4
+# Сколько случайных точек проверяется на одну карточку выборки
+SAMPLE_ATTEMPTS_PER_CARD = 32
+
+
+def sample_card_ids(queryset, count):
+    """
+    Возвращает до count случайных различных id карточек из queryset
+    (в случайном порядке). Если карточек меньше count, возвращает все.
+    Не больше 3 + (SAMPLE_ATTEMPTS_PER_CARD + 1) * count запросов при любом размере колоды
+    """
+    if count <= 0:
+        return []
+
+    limit = count * SAMPLE_SCAN_FACTOR
+    ids = list(queryset.order_by().values_list('id', flat=True)[:limit + 1])
+    if len(ids) <= limit:
+        return random.sample(ids, min(count, len(ids)))
 
-    repetition.save()
+    ordered = queryset.order_by('id').values_list('id', flat=True)
+    lo, hi = ordered.first(), ordered.last()
+    chosen = []
+    for _ in range(count * SAMPLE_ATTEMPTS_PER_CARD):
+        if len(chosen) == count:
+            return chosen
+        pivot = random.randint(lo, hi)
+        if pivot not in chosen and ordered.filter(id=pivot).exists():
+            chosen.append(pivot)
 
+    # Редкая колода: ближайшие карточки после случайных точек, затем уже прочитанные id
+    for _ in range(count - len(chosen)):
+        card_id = ordered.filter(id__gte=random.randint(lo, hi)).first()
+        if card_id is not None and card_id not in chosen:
+            chosen.append(card_id)
+    if len(chosen) < count:
+        rest = [i for i in ids if i not in chosen]
+        chosen += random.sample(rest, min(count - len(chosen), len(rest)))
+    return chosen
 
 
 # Генерирует mp3-файл с озвучкой слова и возвращает путь к файлу.
+# Синтез идёт в общем пуле (words.tts): одновременные запросы одного слова
+# ждут один синтез; при переполнении очереди или таймауте — TTSUnavailable.
 
 def generate_tts(word, lang='en'):
-   
-    tts_dir = os.path.join(settings.MEDIA_ROOT, 'tts')
-    os.makedirs(tts_dir, exist_ok=True)
-    filename = f"{word}_{lang}.mp3"
-    filepath = os.path.join(tts_dir, filename)
-    if not os.path.exists(filepath):
-        tts = gTTS(text=word, lang=lang)
-        tts.save(filepath)
-    return os.path.join('tts', filename)
+    from .tts import get_tts_pool
+    return get_tts_pool().generate(word, lang)
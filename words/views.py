@@ -1,15 +1,17 @@
 from django.contrib.auth.decorators import login_required
-from django.http import request, FileResponse, Http404, JsonResponse
+from django.http import request, FileResponse, Http404, HttpResponse, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.utils import timezone
 from django.utils.encoding import iri_to_uri
 import os
+import json
 from django.conf import settings
 from django.views.decorators.http import require_POST
 
 from .forms import CardForm
 from .models import Card, Repetition
-from .utils import update_sm2, generate_tts
+from .utils import update_sm2_batch, apply_reviews, generate_tts
+from .tts import TTSUnavailable
 
 
 # Главная страница списка карточек
@@ -133,15 +135,12 @@ def card_mode(request):
 @login_required
 def review_today(request):
     today = timezone.now().date()
-    # Выбираем только карточки, у которых есть повторение на сегодня или раньше
-    # Получаем уникальные card_id для избежания дублирования
-    card_ids = Repetition.objects.filter(
-        user=request.user, 
-        next_review__lte=today
-    ).values_list('card_id', flat=True).distinct()
-    
-    # Получаем карточки по уникальным ID
-    cards = Card.objects.filter(id__in=card_ids)
+    # Одно соединение по индексу (user, next_review); дубликатов нет
+    # благодаря уникальному ограничению (user, card) на Repetition
+    cards = Card.objects.filter(
+        repetition__user=request.user,
+        repetition__next_review__lte=today
+    ).order_by('repetition__next_review', 'id')
     
     return render(request, 'words/review_today.html', {'cards': cards})
 
@@ -151,28 +150,97 @@ def review_card(request, pk):
     card = get_object_or_404(Card, pk=pk, user=request.user)
     
     # Получаем существующую запись Repetition или создаём новую
-    try:
-        repetition = Repetition.objects.get(card=card, user=request.user)
-    except Repetition.DoesNotExist:
-        # Создаём новую запись только если её нет
-        repetition = Repetition.objects.create(
-            card=card, 
-            user=request.user,
-            next_review=timezone.now().date()
-        )
+    repetition, _ = Repetition.objects.get_or_create(
+        card=card,
+        user=request.user,
+        defaults={'next_review': timezone.now().date()}
+    )
 
     if request.method == 'POST':
-        quality = int(request.POST.get('quality', 0))
-        update_sm2(repetition, quality)
+        # Шаблон отправляет оценку в поле grade, старые клиенты — в quality
+        quality = int(request.POST.get('grade', request.POST.get('quality', 0)))
+        update_sm2_batch([(repetition, quality)])
         return redirect('words:review_today')
 
     return render(request, 'words/review_card.html', {'card': card})
 
+# Сессия повторения: выдача пачки карточек и приём всех оценок одним запросом
+REVIEW_SESSION_DEFAULT_LIMIT = 20
+REVIEW_SESSION_MAX_LIMIT = 100
+
+
+@login_required
+def review_session(request):
+    """
+    GET — следующие N карточек на повторение вместе с данными повторения.
+    POST — JSON {"grades": [{"card_id": 1, "quality": 4}, ...]}; все оценки
+    применяются атомарно, при ошибке в любой из них не применяется ни одна.
+    """
+    if request.method == 'POST':
+        return _submit_review_session(request)
+
+    try:
+        limit = int(request.GET.get('limit', REVIEW_SESSION_DEFAULT_LIMIT))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'invalid_limit'}, status=400)
+    limit = max(1, min(limit, REVIEW_SESSION_MAX_LIMIT))
+
+    today = timezone.now().date()
+    due = Repetition.objects.filter(user=request.user, next_review__lte=today)
+    repetitions = due.select_related('card').order_by('next_review', 'card_id')[:limit]
+
+    cards = [
+        {
+            'id': rep.card.id,
+            'word': rep.card.word,
+            'translation': rep.card.translation,
+            'example': rep.card.example,
+            'note': rep.card.note,
+            'level': rep.card.level,
+            'next_review': rep.next_review.isoformat(),
+            'interval': rep.interval,
+            'repetition_count': rep.repetition_count,
+            'success_rate': rep.success_rate,
+        }
+        for rep in repetitions
+    ]
+    return JsonResponse({'success': True, 'cards': cards, 'due_total': due.count()})
+
+
+def _submit_review_session(request):
+    try:
+        grades = json.loads(request.body).get('grades')
+        reviews = [(int(g['card_id']), int(g['quality'])) for g in grades]
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'invalid_payload'}, status=400)
+
+    if not reviews or any(not 0 <= quality <= 5 for _, quality in reviews):
+        return JsonResponse({'success': False, 'error': 'invalid_quality'}, status=400)
+
+    card_ids = {card_id for card_id, _ in reviews}
+    if Card.objects.filter(user=request.user, id__in=card_ids).count() != len(card_ids):
+        return JsonResponse({'success': False, 'error': 'not_found'}, status=404)
+
+    repetitions = apply_reviews(request.user, reviews)
+    return JsonResponse({
+        'success': True,
+        'updated': len(repetitions),
+        'cards': [
+            {'id': rep.card_id, 'next_review': rep.next_review.isoformat(), 'interval': rep.interval}
+            for rep in repetitions
+        ],
+    })
+
 # Озвучка слова
 def tts_audio(request, word):
 
     lang = request.GET.get('lang', 'en')
-    rel_path = generate_tts(word, lang)
+    try:
+        rel_path = generate_tts(word, lang)
+    except TTSUnavailable:
+        response = HttpResponse("Озвучка временно недоступна", status=503)
+        response['Retry-After'] = '5'
+        return response
     abs_path = os.path.join(settings.MEDIA_ROOT, rel_path)
     if not os.path.exists(abs_path):
         raise Http404("Файл не найден")